@@ -0,0 +1,75 @@
+"""Benchmark build_dependency_graph against the previous per-edge implementation.
+
+Run from the repository root with `src` on the path:
+
+    PYTHONPATH=src python benchmarks/bench_build_graph.py --packages 40000
+"""
+import time
+import argparse
+
+import networkx as nx
+
+from data.graph import (
+    add_node_with_metadata,
+    build_dependency_graph,
+    dependency_edges,
+    get_metadata,
+)
+from data.name_similarity import set_typosquat_features
+
+from synthetic import make_metadata
+
+def legacy_build_dependency_graph(metadata_dict: dict) -> nx.DiGraph:
+    """The original implementation, which re-adds a dependency node for every edge."""
+    G = nx.DiGraph()
+    all_data = metadata_dict.copy()
+    core_packages = set(metadata_dict.keys())
+    repo_url_count = {}
+
+    for pkg_name, meta in metadata_dict.items():
+        add_node_with_metadata(G, pkg_name, meta, is_core=True, repo_url_count=repo_url_count)
+
+    for pkg_name, meta in metadata_dict.items():
+        for dep_name, kind, optional in dependency_edges(meta):
+            dep_meta = get_metadata(dep_name, all_data)
+            add_node_with_metadata(
+                G, dep_name, dep_meta, is_core=(dep_name in core_packages))
+            G.add_edge(pkg_name, dep_name, kind=kind, optional=optional)
+
+    for pkg_name in G.nodes:
+        repo_url = G.nodes[pkg_name]["repo_url"]
+        if repo_url != "Unknown" and repo_url_count.get(repo_url, 0) > 1:
+            G.nodes[pkg_name]["is_copycat"] = True
+
+    G.graph["num_core_packages"] = len(core_packages)
+    set_typosquat_features(G)
+    return G
+
+def best_of(fn, repeat: int) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dependency graph construction.")
+    parser.add_argument("--packages", type=int, default=40000, help="Number of core packages")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per implementation (best is kept)")
+    args = parser.parse_args()
+
+    metadata = make_metadata(args.packages)
+
+    t_legacy, G_legacy = best_of(lambda: legacy_build_dependency_graph(metadata), args.repeat)
+    t_bulk, G_bulk = best_of(lambda: build_dependency_graph(metadata), args.repeat)
+
+    assert dict(G_legacy.nodes(data=True)) == dict(G_bulk.nodes(data=True))
+    assert set(G_legacy.edges) == set(G_bulk.edges)
+
+    print(f"{G_bulk.number_of_nodes():,} nodes, {G_bulk.number_of_edges():,} edges")
+    print(f"  legacy: {t_legacy:.2f}s")
+    print(f"  bulk:   {t_bulk:.2f}s ({t_legacy / t_bulk:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
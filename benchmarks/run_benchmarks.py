@@ -0,0 +1,226 @@
+"""Time every pipeline stage on synthetic data and write the results as JSON.
+
+Run from the repository root with `src` on the path:
+
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --sizes 1000,10000
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --sizes 100000 --compare benchmarks/results/old.json
+
+Each stage reports wall time and the process peak RSS after it ran. With
+`--tracemalloc`, the peak of Python allocations during the stage is recorded too
+(this slows the stages down, so timings from such runs are not comparable).
+"""
+import gc
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import resource
+import tempfile
+import tracemalloc
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+import data.graph
+from data.graph import load_metadata, build_dependency_graph
+from data.load import merge_top_and_recent_graphs, merge_graph_snapshots
+from data.fetch import client
+from data.fetch import pypi, librariesio
+from data.fetch.crawler import DependencyCrawler
+from data.fetch.ratelimit import set_rate_limit
+from feature_engineering import add_structural_features
+from feature_matrix import build_feature_matrix
+from anomaly import AnomalyScorer
+import metrics
+
+from synthetic import make_records, merge_records, write_raw_records, package_names
+from stub_server import StubServer
+
+RESULTS_DIR = Path(__file__).parent / "results"
+STAGES = [
+    "generate", "write_raw", "load_metadata", "build_graph", "merge_snapshots",
+    "structural_features", "feature_matrix", "anomaly_fit", "fetch",
+]
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+def measure(name: str, size: int, fn, use_tracemalloc: bool = False) -> tuple[dict, object]:
+    gc.collect()
+    if use_tracemalloc:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    record = {"stage": name, "size": size, "seconds": round(seconds, 4), "peak_rss_bytes": peak_rss_bytes()}
+    if use_tracemalloc:
+        record["peak_alloc_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    print(f"  {name:<20} {seconds:9.3f}s  peak RSS {record['peak_rss_bytes'] / 2**20:8.1f} MiB")
+    return record, result
+
+def fetch_stage(packages: dict, sourcerank: dict, args) -> dict:
+    """Crawl `--fetch-packages` seeds one level deep against the stub server."""
+    with StubServer(packages, sourcerank, latency=args.latency, error_rate=args.error_rate,
+                    retry_after=args.retry_after) as stub:
+        pypi.PYPI_URL = stub.url
+        librariesio.LIBRARIESIO_API_URL = f"{stub.url}/api"
+        client.set_client(client.HttpClient(backoff_base=0.01, backoff_max=1.0))
+        if args.rate:
+            set_rate_limit("127.0.0.1", args.rate, args.rate)
+
+        def fetch(name):
+            meta = librariesio.fetch_metadata_librariesio(name, "benchmark")
+            librariesio.fetch_sourcerank_info_librariesio(name, "benchmark")
+            return [dep["name"] for dep in meta.get("dependencies", [])]
+
+        rng = random.Random(0)
+        seeds = rng.sample(list(packages), min(args.fetch_packages, len(packages)))
+        crawler = DependencyCrawler(fetch, max_depth=args.fetch_depth, workers=args.workers)
+        metrics.enable()
+        crawled = crawler.crawl(seeds)
+        snapshot = metrics.snapshot()
+        metrics.disable()
+        client.get_client().close()
+        client.set_client(None)
+    return {
+        "packages": len(crawled),
+        "server": {str(k): v for k, v in stub.stats.items()},
+        "client": {k: snapshot[k] for k in ("counters", "histograms")},
+    }
+
+def run_size(size: int, args, workdir: Path) -> list[dict]:
+    print(f"\n{size:,} packages")
+    results = []
+    selected = set(args.stages)
+
+    def stage(name, fn):
+        record, result = measure(name, size, fn, args.tracemalloc)
+        results.append(record)
+        return record, result
+
+    _, (packages, sourcerank) = stage("generate", lambda: make_records(size, seed=args.seed))
+    names = package_names(size)
+
+    if selected & {"write_raw", "load_metadata"}:
+        root = workdir / f"raw_{size}"
+        stage("write_raw", lambda: write_raw_records(root, packages, sourcerank))
+        data.graph.RAW_DATA_DIR = root / "packages"
+        data.graph.SOURCERANK_DIR = root / "sourcerank"
+
+    if "load_metadata" in selected:
+        _, metadata = stage("load_metadata", lambda: load_metadata(names))
+    else:
+        metadata = merge_records(packages, sourcerank)
+
+    record, G = stage("build_graph", lambda: build_dependency_graph(metadata))
+    record.update(nodes=G.number_of_nodes(), edges=G.number_of_edges())
+
+    if "merge_snapshots" in selected:
+        # Two overlapping snapshots, like the top and recent package lists
+        top = {n: metadata[n] for n in names[:int(size * 0.6)]}
+        recent = {n: metadata[n] for n in names[int(size * 0.4):]}
+        G_top, G_recent = build_dependency_graph(top), build_dependency_graph(recent)
+        stage("merge_snapshots", lambda: merge_top_and_recent_graphs(G_top, G_recent))
+        stage("merge_snapshots_nway", lambda: merge_graph_snapshots(
+            {f"snapshot{i}": g for i, g in enumerate([G_top, G_recent, G])}))
+        del G_top, G_recent
+
+    if "structural_features" in selected:
+        k = min(args.pivots, G.number_of_nodes()) if args.pivots else None
+        record, G = stage("structural_features", lambda: add_structural_features(
+            G, k=k, n_jobs=args.jobs, seed=args.seed, community_method=args.community))
+        record.update(pivots=k, community_method=args.community, n_jobs=args.jobs)
+
+    if "feature_matrix" in selected:
+        stage("feature_matrix", lambda: build_feature_matrix(G, with_structural="structural_features" in selected))
+
+    if "anomaly_fit" in selected:
+        stage("anomaly_fit", lambda: AnomalyScorer(
+            with_structural="structural_features" in selected, community_method=args.community,
+            seed=args.seed).fit(G))
+
+    if "fetch" in selected:
+        record, summary = stage("fetch", lambda: fetch_stage(packages, sourcerank, args))
+        record.update(summary, latency=args.latency, error_rate=args.error_rate, workers=args.workers)
+
+    return results
+
+def compare(results: list[dict], baseline_path: Path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["size"], r["stage"]): r for r in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path} (ratio > 1 = slower now):")
+    for r in results:
+        old = baseline.get((r["size"], r["stage"]))
+        if old and old["seconds"] > 0:
+            print(f"  {r['size']:>8,} {r['stage']:<20} {old['seconds']:9.3f}s -> {r['seconds']:9.3f}s"
+                  f"  x{r['seconds'] / old['seconds']:.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data.")
+    parser.add_argument("--sizes", type=str, default="1000,10000",
+                        help="Comma-separated package counts (e.g. 1000,10000,100000,500000)")
+    parser.add_argument("--stages", type=str, default=",".join(STAGES),
+                        help=f"Comma-separated stages to run, from: {', '.join(STAGES)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pivots", type=int, default=256,
+                        help="Pivots for sampled centralities (0 = exact, slow on large graphs)")
+    parser.add_argument("--jobs", type=int, default=1, help="Processes for centralities")
+    parser.add_argument("--community", type=str, default="label_propagation",
+                        help="Community detection method for inter/intra ratios")
+    parser.add_argument("--fetch-packages", type=int, default=100, help="Seed packages for the fetch stage")
+    parser.add_argument("--fetch-depth", type=int, default=1, help="Crawl depth for the fetch stage")
+    parser.add_argument("--workers", type=int, default=8, help="Crawler worker threads")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub server latency per request (s)")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Share of stub responses that are 429")
+    parser.add_argument("--retry-after", type=float, default=0.0, help="Retry-After sent with 429s (s)")
+    parser.add_argument("--rate", type=float, default=0.0, help="Client rate limit for the stub host (req/s, 0 = none)")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also record peak Python allocations per stage")
+    parser.add_argument("--out", type=str, default=None, help="Output JSON (default benchmarks/results/bench_<time>.json)")
+    parser.add_argument("--compare", type=str, default=None, help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    args.stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    started = datetime.now(timezone.utc)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="pypi_bench_") as tmp:
+        for size in sizes:
+            results.extend(run_size(size, args, Path(tmp)))
+
+    output = {
+        "meta": {
+            "started": started.isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    out = Path(args.out) if args.out else RESULTS_DIR / f"bench_{started:%Y%m%d_%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print(f"\nWrote {out}")
+
+    if args.compare:
+        compare(results, Path(args.compare))
+
+if __name__ == "__main__":
+    main()
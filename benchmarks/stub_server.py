@@ -0,0 +1,150 @@
+"""Local HTTP server standing in for PyPI and Libraries.io in fetch benchmarks.
+
+Serves `/pypi/<name>/json`, `/api/pypi/<name>/latest/dependencies` and
+`/api/pypi/<name>/sourcerank` from synthetic records, and the XML-RPC
+`changelog_since_serial` call on `/pypi` from `changelog` events, with a fixed per-request
+latency and a share of 429 responses carrying Retry-After. Tests can queue exact
+responses with `script` and read the peak number of concurrent requests from
+`stats["max_in_flight"]`.
+"""
+import json
+import time
+import random
+import threading
+import xmlrpc.client
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+from synthetic import requires_dist, librariesio_dependencies
+
+class StubServer:
+    """Threaded stub server; use as a context manager and point fetchers at `url`."""
+
+    def __init__(self, packages: dict, sourcerank: dict, latency: float = 0.0,
+                 error_rate: float = 0.0, retry_after: float = 0.0, seed: int = 0, script=(),
+                 changelog=(), changelog_page=1000):
+        self.packages = packages
+        self.sourcerank = sourcerank
+        # `(name, version, timestamp, action, serial)` events, served `changelog_page` at a time
+        self.changelog = sorted(changelog, key=lambda e: e[4])
+        self.changelog_page = changelog_page
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        # `(status, headers)` responses served, in order, before any routing
+        self.script = list(script)
+        self.in_flight = 0
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def route(self, path: str) -> tuple[int, dict | None]:
+        parts = urlsplit(path).path.strip("/").split("/")
+        if len(parts) == 3 and parts[0] == "pypi" and parts[2] == "json":
+            record = self.packages.get(parts[1])
+            if record is not None:
+                return 200, {"info": {"name": parts[1], "requires_dist": requires_dist(record)}}
+        elif len(parts) == 5 and parts[:2] == ["api", "pypi"] and parts[3:] == ["latest", "dependencies"]:
+            record = self.packages.get(parts[2])
+            if record is not None:
+                return 200, librariesio_dependencies(record)
+        elif len(parts) == 4 and parts[:2] == ["api", "pypi"] and parts[3] == "sourcerank":
+            info = self.sourcerank.get(parts[2])
+            if info is not None:
+                return 200, info
+        return 404, None
+
+    def call(self, path: str, body: bytes) -> tuple[int, bytes]:
+        """Answer an XML-RPC request to `/pypi`."""
+        if urlsplit(path).path.rstrip("/") != "/pypi":
+            return 404, b""
+        params, method = xmlrpc.client.loads(body)
+        if method != "changelog_since_serial":
+            fault = xmlrpc.client.Fault(1, f"Unknown method {method}")
+            return 200, xmlrpc.client.dumps(fault, methodresponse=True).encode()
+        events = [list(e) for e in self.changelog if e[4] > params[0]][:self.changelog_page]
+        return 200, xmlrpc.client.dumps((events,), methodresponse=True, allow_none=True).encode()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for key, value in headers:
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._track(self._respond)
+
+            def do_POST(self):
+                self._track(self._respond)
+
+            def _track(self, respond):
+                with stub.lock:
+                    stub.in_flight += 1
+                    stub.stats["max_in_flight"] = max(stub.stats["max_in_flight"], stub.in_flight)
+                try:
+                    respond()
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+            def _respond(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if stub.latency:
+                    time.sleep(stub.latency)
+                with stub.lock:
+                    throttled = stub.rng.random() < stub.error_rate
+                    scripted = stub.script.pop(0) if stub.script else None
+                    stub.stats["requests"] += 1
+                if scripted is not None:
+                    status, headers = scripted
+                    with stub.lock:
+                        stub.stats[status] += 1
+                    self._send(status, headers=list(headers.items()))
+                    return
+                if throttled:
+                    with stub.lock:
+                        stub.stats[429] += 1
+                    self._send(429, headers=[("Retry-After", str(stub.retry_after))])
+                    return
+
+                if self.command == "POST":
+                    status, body = stub.call(self.path, body)
+                    content_type = "text/xml"
+                else:
+                    status, payload = stub.route(self.path)
+                    body = json.dumps(payload).encode() if payload is not None else b""
+                    content_type = "application/json"
+                with stub.lock:
+                    stub.stats[status] += 1
+                self._send(status, body, [("Content-Type", content_type)])
+
+        return Handler
@@ -0,0 +1,152 @@
+"""Synthetic PyPI-shaped records for benchmarks.
+
+Dependency popularity follows a power law (a few packages like numpy or requests
+are depended on by most of the graph), so graph in-degrees are heavy tailed like
+the real dependency graph.
+"""
+import json
+import random
+from pathlib import Path
+
+EXTRAS = ["test", "dev", "docs", "all", "cli"]
+LICENSES = ["MIT", "Apache-2.0", "BSD-3-Clause", "GPL-3.0", "MPL-2.0"]
+
+SOURCERANK_FLAGS = [
+    "basic_info_present", "repository_present", "readme_present", "license_present",
+    "versions_present", "follows_semver", "recent_release", "not_brand_new", "one_point_oh",
+]
+
+NAME_PARTS = [
+    "py", "data", "flask", "django", "lib", "net", "io", "ml", "web", "auth", "tool",
+    "json", "http", "graph", "test", "cloud", "log", "config", "util", "core",
+]
+CONSONANTS = "bcdfghjklmnprstvwz"
+VOWELS = "aeiou"
+
+def package_names(n_packages: int) -> list[str]:
+    """Deterministic unique names made of common name parts and a pronounceable word.
+
+    A `pkg0..pkgN` sequence would put every name within two edits of hundreds of
+    others, which is nothing like PyPI and makes name-similarity search degenerate.
+    """
+    rng = random.Random(0)
+    names = {}
+    while len(names) < n_packages:
+        word = "".join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(rng.randint(2, 4)))
+        parts = [rng.choice(NAME_PARTS) for _ in range(rng.randint(0, 2))] + [word]
+        rng.shuffle(parts)
+        names[rng.choice(["-", ""]).join(parts)] = None
+    return list(names)
+
+def make_records(n_packages: int, seed: int = 0, sourcerank_coverage: float = 0.9) -> tuple[dict, dict]:
+    """Return `(packages, sourcerank)` records keyed by name, shaped like data/raw files.
+
+    Package records look like cleaned Libraries.io metadata; about
+    `sourcerank_coverage` of the packages get a SourceRank breakdown.
+    """
+    rng = random.Random(seed)
+    names = package_names(n_packages)
+    packages, sourcerank = {}, {}
+
+    for i, name in enumerate(names):
+        # Low indices are picked far more often, like numpy or requests
+        deps = {names[min(n_packages, int(rng.paretovariate(1.1))) - 1] for _ in range(rng.randint(0, 8))}
+        deps.discard(name)
+        extras = {
+            f"{rng.choice(EXTRAS)}:{names[min(n_packages, int(rng.paretovariate(1.3))) - 1]}"
+            for _ in range(rng.randint(0, 3))
+        }
+        stars = int(rng.paretovariate(0.8)) - 1
+        record = {
+            "name": name,
+            "platform": "Pypi",
+            "description": f"Synthetic package {i}",
+            "homepage": f"https://example.org/{name}" if rng.random() < 0.6 else None,
+            "keywords": rng.sample(["python", "web", "data", "cli", "ml", "async"], rng.randint(0, 4)),
+            "language": "Python",
+            "latest_release_number": f"{rng.randint(0, 5)}.{rng.randint(0, 20)}.{rng.randint(0, 9)}",
+            "latest_release_published_at": f"20{rng.randint(15, 25)}-{rng.randint(1, 12):02d}-01T00:00:00.000Z",
+            "licenses": rng.choice(LICENSES),
+            "normalized_licenses": [rng.choice(LICENSES)] if rng.random() < 0.9 else None,
+            "rank": rng.randint(0, 30),
+            "stars": stars,
+            "forks": stars // rng.randint(2, 20),
+            "repository_url": f"https://github.com/org{i % (n_packages // 2 or 1)}/{name}" if rng.random() < 0.8 else "",
+            "status": rng.choice([None] * 20 + ["Deprecated", "Unmaintained", "Removed"]),
+            "funding_urls": [f"https://github.com/sponsors/{name}"] if rng.random() < 0.05 else [],
+            "runtime_dependencies": sorted(deps),
+            "optional_dependencies": sorted(extras),
+        }
+        if rng.random() < 0.05:
+            del record["rank"]
+        packages[name] = record
+
+        if rng.random() < sourcerank_coverage:
+            info = {flag: int(rng.random() < 0.7) for flag in SOURCERANK_FLAGS}
+            info.update(
+                stars=rng.randint(0, 10),
+                contributors=rng.randint(0, 6),
+                subscribers=rng.randint(0, 5),
+                dependent_projects=rng.randint(0, 6),
+                dependent_repositories=rng.randint(0, 6),
+                all_prereleases=int(rng.random() < 0.05),
+                any_outdated_dependencies=int(rng.random() < 0.3),
+                is_deprecated=int(record["status"] == "Deprecated"),
+                is_unmaintained=int(record["status"] == "Unmaintained"),
+                is_removed=int(record["status"] == "Removed"),
+            )
+            sourcerank[name] = info
+
+    return packages, sourcerank
+
+def merge_records(packages: dict, sourcerank: dict) -> dict:
+    """Merge records the way data.graph.load_metadata does."""
+    metadata = {}
+    for name, record in packages.items():
+        data = dict(record)
+        info = dict(sourcerank.get(name, {}))
+        if "stars" in info:
+            info["stars_sr"] = info.pop("stars")
+        data.update(info)
+        data["sourcerank_missing"] = name not in sourcerank
+        metadata[name] = data
+    return metadata
+
+def make_metadata(n_packages: int, seed: int = 0) -> dict:
+    """Synthetic merged metadata, as returned by data.graph.load_metadata."""
+    return merge_records(*make_records(n_packages, seed))
+
+def write_raw_records(root: Path, packages: dict, sourcerank: dict) -> tuple[Path, Path]:
+    """Write records as `<root>/packages/<name>.json` and `<root>/sourcerank/<name>_sourcerank.json`."""
+    pkg_dir = Path(root) / "packages"
+    sr_dir = Path(root) / "sourcerank"
+    pkg_dir.mkdir(parents=True, exist_ok=True)
+    sr_dir.mkdir(parents=True, exist_ok=True)
+    for name, record in packages.items():
+        with open(pkg_dir / f"{name}.json", "w", encoding="utf-8") as f:
+            json.dump(record, f)
+    for name, info in sourcerank.items():
+        with open(sr_dir / f"{name}_sourcerank.json", "w", encoding="utf-8") as f:
+            json.dump(info, f)
+    return pkg_dir, sr_dir
+
+def requires_dist(record: dict) -> list[str]:
+    """PEP 508 `requires_dist` strings for a package record, as served by the PyPI JSON API."""
+    reqs = [f"{dep}>=1.0" for dep in record.get("runtime_dependencies", [])]
+    for entry in record.get("optional_dependencies", []):
+        extra, dep = entry.split(":", 1)
+        reqs.append(f'{dep}; extra == "{extra}"')
+    return reqs
+
+def librariesio_dependencies(record: dict) -> dict:
+    """A Libraries.io `latest/dependencies` response for a package record."""
+    response = {k: v for k, v in record.items() if k not in ("runtime_dependencies", "optional_dependencies")}
+    response["dependencies"] = [
+        {"name": dep, "kind": "runtime", "optional": False, "requirements": ">=1.0"}
+        for dep in record.get("runtime_dependencies", [])
+    ] + [
+        {"name": entry.split(":", 1)[1], "kind": f'extra == "{entry.split(":", 1)[0]}"',
+         "optional": True, "requirements": "*"}
+        for entry in record.get("optional_dependencies", [])
+    ]
+    return response
@@ -1,5 +1,3 @@
-import os
-import json
 import pickle
 import argparse
 from pathlib import Path
@@ -7,207 +5,161 @@ from datetime import datetime, timezone
 
 import networkx as nx
 
-RAW_DATA_DIR = Path("data/raw/packages")
+from data.store import PackageStore
+from data.requirements import normalize_name
+from data.snapshot import save_snapshot, load_snapshot, snapshot_path
+from data.temporal import TemporalGraphStore
+from data.graph import (
+    load_json_file,
+    load_metadata,
+    load_metadata_from_store,
+    build_dependency_graph,
+    build_dependency_graph_parallel,
+)
+from data.incremental import (
+    make_manifest,
+    load_manifest,
+    save_manifest,
+    update_dependency_graph,
+)
+import metrics
+
 GRAPH_DIR = Path("data/graph")
 
-def load_json_file(file_path: Path) -> dict:
-    """Load a JSON file and handle errors."""
-    if not file_path.exists():
-        print(f"Warning: Missing file {file_path}")
-        return {}
-    try:
-        with open(file_path, encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        print(f"Warning: Failed to decode {file_path}")
-        return {}
-
-def load_sourcerank_data(package_name: str) -> dict:
-    """Load the SourceRank JSON for a given package."""
-    file_path = Path(f"data/raw/sourcerank/{package_name}_sourcerank.json")
-    return load_json_file(file_path)
-
-def load_metadata(package_names: list[str] = None) -> dict:
-    """Load package metadata JSONs, optionally for a subset of projects."""
-    all_data = {}
-    files = RAW_DATA_DIR.glob("*.json") if package_names is None else [
-        RAW_DATA_DIR / f"{name}.json" for name in package_names]
-
-    for file_path in files:
-        data = load_json_file(file_path)
-        if data:
-            name = data.get("name", "").lower()
-            sourcerank_data = load_sourcerank_data(name)
-            if "stars" in sourcerank_data:
-                sourcerank_data["stars_sr"] = sourcerank_data.pop("stars")
-            data.update(sourcerank_data)
-            data["sourcerank_missing"] = (sourcerank_data == {})
-            all_data[name] = data
-
-    return all_data
-
-def add_node_with_metadata(G: nx.DiGraph, pkg_name: str, meta: dict, is_core: bool = False, repo_url_count: dict = None):
-    """Helper function to add a node with metadata to the graph."""
-    license = meta.get("normalized_licenses", ["Unknown"])[0] if meta.get("normalized_licenses") else "Unknown"
-    missing_metadata = (
-        meta.get("rank") is None or
-        meta.get("stars") is None or
-        meta.get("forks") is None or
-        meta.get("normalized_licenses") is None
-    )
-
-    repo_url = meta.get("repository_url", "Unknown")
-    if not repo_url:  # Check for empty string
-        repo_url = "Unknown"
-
-    # Count occurrences of each repo_url only for core nodes
-    if is_core and repo_url_count is not None:
-        repo_url_count[repo_url] = repo_url_count.get(repo_url, 0) + 1
-
-    G.add_node(pkg_name,
-               SourceRank=meta.get("rank", 0),
-               stars=meta.get("stars", 0),
-               forks=meta.get("forks", 0),
-               license=license,
-               latest_release=meta.get("latest_release_published_at", "Unknown"),
-               num_optional_deps=len(meta.get("optional_dependencies", [])),
-               repo_url=repo_url,
-               has_repo=bool(repo_url and repo_url != "Unknown"),
-               has_funding=bool(meta.get("funding_urls")),
-               num_keywords=len(meta.get("keywords", [])),
-               missing_metadata=missing_metadata,
-               is_core=is_core,
-               sourcerank_missing=meta.get('sourcerank_missing', True),
-               # Add SourceRank data
-               basic_info_present=meta.get("basic_info_present", 0),
-               repository_present=meta.get("repository_present", 0),
-               readme_present=meta.get("readme_present", 0),
-               license_present=meta.get("license_present", 0),
-               versions_present=meta.get("versions_present", 0),
-               follows_semver=meta.get("follows_semver", 0),
-               recent_release=meta.get("recent_release", 0),
-               not_brand_new=meta.get("not_brand_new", 0),
-               one_point_oh=meta.get("one_point_oh", 0),
-               dependent_projects=meta.get("dependent_projects", 0),
-               dependent_repositories=meta.get("dependent_repositories", 0),
-               contributors=meta.get("contributors", 0),
-               subscribers=meta.get("subscribers", 0),
-               all_prereleases=meta.get("all_prereleases", 0),
-               any_outdated_dependencies=meta.get("any_outdated_dependencies", 0),
-               is_deprecated=meta.get("is_deprecated", 0),
-               is_unmaintained=meta.get("is_unmaintained", 0),
-               is_removed=meta.get("is_removed", 0),
-               is_copycat=False  # Default to False
-               )
-
-def get_metadata(name: str, all_data: dict) -> dict:
-    """Retrieve metadata for a package, loading it if necessary."""
-    if name not in all_data:
-        file_path = RAW_DATA_DIR / f"{name}.json"
-        if file_path.exists():
-            try:
-                with open(file_path, encoding="utf-8") as f:
-                    data = json.load(f)
-                    all_data[name] = data
-            except json.JSONDecodeError:
-                print(f"Warning: Failed to decode {file_path}")
-    return all_data.get(name, {})
-
-def build_dependency_graph(metadata_dict: dict) -> nx.DiGraph:
-    """Build a dependency graph from metadata."""
-    G = nx.DiGraph()
-    all_data = metadata_dict.copy()
-    core_packages = set(metadata_dict.keys())
-    repo_url_count = {}
-
-    # First pass to add core nodes and count repo_url occurrences
-    for pkg_name, meta in metadata_dict.items():
-        add_node_with_metadata(G, pkg_name, meta, is_core=True, repo_url_count=repo_url_count)
-
-    # Second pass to add dependencies
-    for pkg_name, meta in metadata_dict.items():
-        # Add edges for runtime dependencies
-        for dep_name in meta.get("runtime_dependencies", []):
-            dep_name = dep_name.lower()
-            if dep_name:
-                dep_meta = get_metadata(dep_name, all_data)
-                add_node_with_metadata(
-                    G, dep_name, dep_meta, is_core=(dep_name in core_packages))
-                G.add_edge(pkg_name, dep_name, kind="runtime", optional=False)
-
-        # Add edges for optional dependencies
-        for dep_entry in meta.get("optional_dependencies", []):
-            kind = "unspecified"
-            if ":" in dep_entry:
-                kind, dep_name = dep_entry.split(":", 1)
-            else:
-                dep_name = dep_entry
-            dep_name = dep_name.lower().strip()
-            if dep_name:
-                dep_meta = get_metadata(dep_name, all_data)
-                add_node_with_metadata(
-                    G, dep_name, dep_meta, is_core=(dep_name in core_packages))
-                G.add_edge(pkg_name, dep_name, kind=kind, optional=True)
-
-    # Set is_copycat attribute
-    for pkg_name in G.nodes:
-        repo_url = G.nodes[pkg_name]["repo_url"]
-        if repo_url != "Unknown" and repo_url_count.get(repo_url, 0) > 1:
-            G.nodes[pkg_name]["is_copycat"] = True
-
-    G.graph["num_core_packages"] = len(core_packages)
-    return G
+def snapshot_date(meta: dict | None) -> str:
+    """The `YYYYMMDD` date of a package list (today if it has none)."""
+    date = (meta or {}).get("date", datetime.now(timezone.utc).isoformat())
+    return datetime.fromisoformat(date.rstrip("Z")).strftime("%Y%m%d")
 
 def make_output_name(meta: dict | None) -> str:
     """Generate a name for the output graph file."""
-    now = datetime.now(timezone.utc).strftime("%Y%m%d")
     if meta is None:
-        return f"graph_all_{now}"
+        return f"graph_all_{snapshot_date(None)}"
 
     mode = meta.get("mode", "unknown")
     n = meta.get("num_packages", len(meta.get("packages", [])))
-    date = meta.get("date", datetime.now(timezone.utc).isoformat())
-    date_short = datetime.fromisoformat(date.rstrip("Z")).strftime("%Y%m%d")
 
-    return f"graph_{mode}_n{n}_{date_short}"
+    return f"graph_{mode}_n{n}_{snapshot_date(meta)}"
 
 def save_graph(G: nx.DiGraph, name: str):
-    """Save the graph to a file."""
-    os.makedirs(GRAPH_DIR, exist_ok=True)
-    graph_file = GRAPH_DIR / f"{name}.gpickle"
-    edges_file = GRAPH_DIR / f"{name}_edges.csv"
+    """Save the graph as a binary snapshot (see data.snapshot)."""
+    path = save_snapshot(G, snapshot_path(GRAPH_DIR, name))
+    print(f"Graph saved to {path}")
 
-    with open(graph_file, "wb") as f:
-        pickle.dump(G, f)
+def manifest_path(name: str) -> Path:
+    return GRAPH_DIR / f"{name}_manifest.json"
 
-    df_edges = nx.to_pandas_edgelist(G)
-    df_edges.to_csv(edges_file, index=False)
-    print(f"Graph saved to {graph_file} and {edges_file}")
+def load_graph(name: str) -> nx.DiGraph | None:
+    path = snapshot_path(GRAPH_DIR, name)
+    if path.exists():
+        return load_snapshot(path)
+
+    # Graphs saved before snapshots were pickled
+    graph_file = GRAPH_DIR / f"{name}.gpickle"
+    if not graph_file.exists():
+        return None
+    with open(graph_file, "rb") as f:
+        return pickle.load(f)
 
 def main():
     parser = argparse.ArgumentParser(
         description="Build a PyPI dependency graph.")
     parser.add_argument("--infile", type=str,
                         help="Path to JSON file with package names")
+    parser.add_argument("--store", type=str,
+                        help="Read from this package store instead of the raw JSON files")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Update an existing graph using its manifest instead of rebuilding")
+    parser.add_argument("--base", type=str,
+                        help="Name of the graph to update with --incremental (default: the output name)")
+    parser.add_argument("--popular", type=str,
+                        help="JSON file with the popular package names typosquats are matched against "
+                             "(default: the most depended-on packages in the graph)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Processes for loading raw JSON records and building the graph")
+    parser.add_argument("--history", type=str,
+                        help="Also record the graph under its date in this temporal snapshot store")
+    parser.add_argument("--metrics", type=str,
+                        help="Write per-stage timings as JSON to this path")
 
     args = parser.parse_args()
-
+    if args.metrics:
+        metrics.enable()
+    try:
+        build(args)
+    finally:
+        if args.metrics:
+            metrics.write_snapshot(args.metrics)
+
+def build(args):
+    """Build (or incrementally update) and save the graph described by the arguments."""
+    package_names = None
+    package_list = None
     if args.infile:
         meta_file = Path(args.infile)
         package_list = load_json_file(meta_file)
-        package_names = set(package_list.get("packages", []))
-        metadata = load_metadata(package_names)
-        graph_name = make_output_name(package_list)
+        package_names = {normalize_name(n) for n in package_list.get("packages", [])}
+    graph_name = make_output_name(package_list)
+
+    popular = None
+    if args.popular:
+        popular = load_json_file(Path(args.popular)).get("packages", [])
+
+    store = PackageStore(args.store) if args.store else None
+    G, manifest = build_graph(args, graph_name, package_names, store, popular)
+
+    with metrics.stage("save_graph"):
+        save_graph(G, graph_name)
+    with metrics.stage("save_manifest"):
+        save_manifest(manifest, manifest_path(graph_name))
+
+    if args.history:
+        with metrics.stage("save_history"):
+            date = snapshot_date(package_list)
+            summary = TemporalGraphStore(args.history).add(date, G)
+        print(f"Recorded {date} in {args.history}: {summary}")
+
+def build_graph(args, graph_name, package_names, store, popular) -> tuple[nx.DiGraph, dict]:
+    """Build (or incrementally update) the graph and return it with its manifest."""
+    if args.incremental:
+        base_name = args.base or graph_name
+        with metrics.stage("load_base_graph"):
+            G = load_graph(base_name)
+            manifest = load_manifest(manifest_path(base_name))
+        source = "store" if store is not None else "json"
+        if G is None or manifest is None or manifest["source"] != source:
+            print(f"No usable base graph '{base_name}' with a {source} manifest; rebuilding.")
+        else:
+            with metrics.stage("update_graph"):
+                G, manifest, summary = update_dependency_graph(G, manifest, package_names, store, popular)
+            print(f"Updated '{base_name}': {summary}")
+            print(
+                f"Graph has {G.number_of_nodes()} nodes and {G.number_of_edges()} edges.")
+            return G, manifest
+
+    if args.jobs > 1 and store is None:
+        print(f"Building graph from raw records with {args.jobs} processes...")
+        with metrics.stage("build_graph_parallel"):
+            G = build_dependency_graph_parallel(package_names, n_jobs=args.jobs, popular=popular)
+        core = {name for name, is_core in G.nodes(data="is_core") if is_core}
     else:
-        metadata = load_metadata()
-        graph_name = make_output_name(None)
+        dependency_metadata = None
+        with metrics.stage("load_metadata"):
+            if store is not None:
+                metadata, dependency_metadata = load_metadata_from_store(store, package_names)
+            else:
+                metadata = load_metadata(package_names)
 
-    print(f"Building graph with {len(metadata)} packages...")
-    G = build_dependency_graph(metadata)
+        print(f"Building graph with {len(metadata)} packages...")
+        with metrics.stage("build_graph"):
+            G = build_dependency_graph(metadata, dependency_metadata, popular)
+        core = set(metadata)
     print(
         f"Graph has {G.number_of_nodes()} nodes and {G.number_of_edges()} edges.")
 
-    save_graph(G, graph_name)
+    with metrics.stage("make_manifest"):
+        manifest = make_manifest(G, core, store)
+    return G, manifest
 
 if __name__ == "__main__":
     main()
@@ -4,7 +4,11 @@ import argparse
 from dotenv import load_dotenv
 
 from data.fetch.librariesio import fetch_metadata_librariesio
+from data.fetch.cache import DEFAULT_CACHE_PATH
+from data.fetch import client
 from data.cleaning import clean_metadata
+from data.store import PackageStore
+from data.graph import package_file
 
 load_dotenv()
 
@@ -14,9 +18,11 @@ if not API_KEY:
 
 DATA_DIR = "data/raw/packages"
 
-def main(package_list):
+def main(package_list, store_path=None):
     """Download metadata for each package, using PyPI as fallback if specified."""
-    os.makedirs(DATA_DIR, exist_ok=True)
+    store = PackageStore(store_path) if store_path else None
+    if store is None:
+        os.makedirs(DATA_DIR, exist_ok=True)
 
     for pkg in package_list:
         print(f"Fetching {pkg}...")
@@ -24,7 +30,10 @@ def main(package_list):
 
         if data:
             data = clean_metadata(data)
-            out_path = os.path.join(DATA_DIR, f"{pkg}.json")
+            if store is not None:
+                store.upsert_packages([data])
+                continue
+            out_path = package_file(pkg)
             with open(out_path, "w", encoding="utf-8") as f:
                 json.dump(data, f, indent=2)
         else:
@@ -34,6 +43,13 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Download PyPI package metadata.")
     parser.add_argument("--packages", nargs="+", required=True,
                         help="List of package names")
+    parser.add_argument("--store", type=str,
+                        help="Write to this package store instead of JSON files")
+    parser.add_argument("--cache", type=str, default=str(DEFAULT_CACHE_PATH),
+                        help="Path of the HTTP response cache")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Disable the HTTP response cache")
 
     args = parser.parse_args()
-    main(args.packages)
+    client.configure(cache_path=None if args.no_cache else args.cache)
+    main(args.packages, args.store)
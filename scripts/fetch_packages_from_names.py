@@ -1,6 +1,5 @@
 import os
 import json
-import time
 import argparse
 from pathlib import Path
 from tqdm import tqdm
@@ -8,7 +7,15 @@ from dotenv import load_dotenv
 
 from data.fetch.librariesio import fetch_metadata_librariesio, fetch_sourcerank_info_librariesio
 from data.fetch.pypi import fetch_dependencies_pypi
-from data.cleaning import clean_metadata
+from data.fetch.ratelimit import set_rate_limit
+from data.fetch.cache import DEFAULT_CACHE_PATH
+from data.fetch import client
+from data.fetch.crawler import DependencyCrawler, DEFAULT_WORKERS
+from data.cleaning import clean_metadata, dependency_names
+from data.requirements import normalize_name
+from data.graph import package_file, sourcerank_file
+from data.store import PackageStore
+import metrics
 
 load_dotenv()
 
@@ -18,48 +25,36 @@ if not API_KEY:
 
 DATA_DIR_PKG = Path("data/raw/packages")
 DATA_DIR_SR = Path("data/raw/sourcerank")
+CRAWL_STATE_FILE = Path("data/raw/crawl_state.json")
+
+# When set (--store), records are written to the package store instead of JSON files
+STORE: PackageStore | None = None
 
 def save_json(data, path):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
 
+def load_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
 def load_package_names(path):
     with open(path, "r", encoding="utf-8") as f:
         content = json.load(f)
-        return content.get("packages", [])
-
-def collect_dependency_names(metadata_dir: Path, core_packages: list[str]) -> set[str]:
-    deps = set()
-
-    for name in core_packages:
-        file_path = metadata_dir / f"{name}.json"
-        if not file_path.exists():
-            continue
-        try:
-            with open(file_path, encoding="utf-8") as f:
-                data = json.load(f)
-        except json.JSONDecodeError:
-            continue
-
-        for dep in data.get("runtime_dependencies", []):
-            deps.add(dep.lower())
-
-        for entry in data.get("optional_dependencies", []):
-            if ":" in entry:
-                _, dep = entry.split(":", 1)
-            else:
-                dep = entry
-            deps.add(dep.lower().strip())
-
-    return deps - set(core_packages)
-
-def fetch_and_save_metadata(pkg_name, overwrite=False, sleep_time=1.5):
+        return list(dict.fromkeys(normalize_name(n) for n in content.get("packages", [])))
+
+def fetch_and_save_metadata(pkg_name, overwrite=False):
     print(f"Fetching {pkg_name}...")
-    if not overwrite and (DATA_DIR_PKG / f"{pkg_name}.json").exists():
+    if STORE is not None:
+        collected = STORE.has(pkg_name)
+    else:
+        collected = package_file(pkg_name).exists()
+    if not overwrite and collected:
         print(f"Skipping {pkg_name} (already collected)")
-        return
-
-    time.sleep(sleep_time)
+        return None
 
     meta = fetch_metadata_librariesio(pkg_name, API_KEY)
     if not meta:
@@ -70,27 +65,37 @@ def fetch_and_save_metadata(pkg_name, overwrite=False, sleep_time=1.5):
 
     if not meta:
         print(f"Failed to fetch {pkg_name}")
-        return
+        return None
 
     try:
         clean = clean_metadata(meta)
-        save_json(clean, DATA_DIR_PKG / f"{pkg_name}.json")
+        if STORE is not None:
+            STORE.upsert_packages([clean])
+        else:
+            save_json(clean, package_file(pkg_name))
         print(f"Saved {pkg_name}")
+        return clean
     except Exception as e:
         print(f"Cleaning failed for {pkg_name}: {e}")
+        return None
 
-def fetch_and_save_sourcerank(pkg_name, overwrite=False, sleep_time=1.5):
+def fetch_and_save_sourcerank(pkg_name, overwrite=False):
     print(f"Fetching SourceRank for {pkg_name}...")
-    sourcerank_path = DATA_DIR_SR / f"{pkg_name}_sourcerank.json"
-    if not overwrite and sourcerank_path.exists():
+    sourcerank_path = sourcerank_file(pkg_name)
+    if STORE is not None:
+        collected = STORE.has(pkg_name, table="sourcerank")
+    else:
+        collected = sourcerank_path.exists()
+    if not overwrite and collected:
         print(f"Skipping SourceRank for {pkg_name} (already collected)")
         return
 
-    time.sleep(sleep_time)
-
     try:
         sourcerank_info = fetch_sourcerank_info_librariesio(pkg_name, API_KEY)
-        if sourcerank_info:
+        if sourcerank_info and STORE is not None:
+            STORE.upsert_sourcerank({pkg_name: sourcerank_info})
+            print(f"Saved SourceRank for {pkg_name}")
+        elif sourcerank_info:
             save_json(sourcerank_info, sourcerank_path)
             print(f"Saved SourceRank for {pkg_name}")
         else:
@@ -98,7 +103,23 @@ def fetch_and_save_sourcerank(pkg_name, overwrite=False, sleep_time=1.5):
     except Exception as e:
         print(f"Error fetching SourceRank for {pkg_name}: {e}")
 
+def fetch_and_save_package(pkg_name, overwrite=False) -> set[str]:
+    """Fetch one package and its SourceRank, returning its dependency names."""
+    meta = fetch_and_save_metadata(pkg_name, overwrite)
+    fetch_and_save_sourcerank(pkg_name, overwrite)
+    if meta is None:
+        # Already collected (or failed): fall back to whatever is on disk
+        if STORE is not None:
+            meta = STORE.read_packages(
+                [pkg_name], columns=["runtime_dependencies", "optional_dependencies"]
+            ).get(normalize_name(pkg_name), {})
+        else:
+            meta = load_json(package_file(pkg_name))
+    return dependency_names(meta)
+
 def main():
+    global STORE
+
     parser = argparse.ArgumentParser(
         description="Fetch metadata for a list of packages.")
     parser.add_argument(
@@ -115,33 +136,106 @@ def main():
     parser.add_argument(
         "--skip-dependencies",
         action="store_true",
-        help="Do not fetch metadata for direct dependencies."
+        help="Do not fetch metadata for direct dependencies (same as --depth 0)."
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=1,
+        help="Number of dependency hops to crawl from the listed packages."
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=f"Resume an interrupted crawl from {CRAWL_STATE_FILE}."
+    )
+    parser.add_argument(
+        "--store",
+        type=str,
+        help="Write records to this package store (e.g. data/raw/packages.sqlite) instead of JSON files."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Number of packages fetched concurrently."
+    )
+    parser.add_argument(
+        "--librariesio-rate",
+        type=float,
+        default=1.0,
+        help="Maximum Libraries.io requests per second (the API allows 60 per minute)."
+    )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        default=str(DEFAULT_CACHE_PATH),
+        help="Path of the HTTP response cache (conditional requests on re-fetch)."
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=0,
+        help="Hours a cached response is reused without revalidation."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the HTTP response cache."
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        help="Record request, rate-limit and cache metrics and write JSON snapshots to this path."
     )
     args = parser.parse_args()
+    if args.metrics:
+        metrics.enable()
+    set_rate_limit("libraries.io", args.librariesio_rate)
+    http = client.configure(
+        cache_path=None if args.no_cache else args.cache,
+        cache_ttl=args.cache_ttl * 3600)
 
     list_path = Path(args.filepath)
     if not list_path.exists():
         raise FileNotFoundError(f"{list_path} does not exist")
 
-    os.makedirs(DATA_DIR_PKG, exist_ok=True)
-    os.makedirs(DATA_DIR_SR, exist_ok=True)
+    if args.store:
+        STORE = PackageStore(args.store)
+    else:
+        os.makedirs(DATA_DIR_PKG, exist_ok=True)
+        os.makedirs(DATA_DIR_SR, exist_ok=True)
     package_names = load_package_names(list_path)
 
-    # Fetch core package metadata and SourceRank info
-    for pkg in tqdm(package_names, desc="Core", ncols=80):
-        fetch_and_save_metadata(pkg, args.overwrite)
-        fetch_and_save_sourcerank(pkg, args.overwrite)
-
-    if not args.skip_dependencies:
-        # Collect dependency names
-        dependency_names = collect_dependency_names(DATA_DIR_PKG, package_names)
-        print(
-            f"\nFound {len(dependency_names)} unique direct dependencies to fetch...")
-
-        # Fetch dependency metadata
-        for dep in tqdm(sorted(dependency_names), desc="Dependencies", ncols=80):
-            fetch_and_save_metadata(dep, args.overwrite)
-            fetch_and_save_sourcerank(dep, args.overwrite)
+    # Crawl core packages (depth 0) and their dependencies breadth-first
+    depth = 0 if args.skip_dependencies else args.depth
+    crawler = DependencyCrawler(
+        lambda pkg: fetch_and_save_package(pkg, args.overwrite),
+        max_depth=depth, workers=args.workers, state_path=CRAWL_STATE_FILE)
+    if args.resume and crawler.load_state():
+        print(f"Resuming crawl with {len(crawler.visited)} packages already fetched")
+
+    with tqdm(desc="Packages", ncols=80) as pbar:
+        def progress(pkg, deps, error):
+            if error is not None:
+                print(f"Failed to fetch {pkg}: {error}")
+            pbar.total = len(crawler.visited) + len(crawler.running) + len(crawler.depth)
+            pbar.update()
+            if args.metrics and pbar.n % crawler.save_every == 0:
+                metrics.write_snapshot(args.metrics)
+
+        with metrics.stage("crawl"):
+            visited = crawler.crawl(package_names, progress=progress)
+
+    print(f"\nCrawled {len(visited)} packages up to depth {depth}")
+
+    if http.cache is not None:
+        print(f"HTTP cache: {http.cache.stats} (hit ratio {http.cache.hit_ratio():.1%})")
+        metrics.gauge("http_cache.hit_ratio", http.cache.hit_ratio())
+
+    if args.metrics:
+        metrics.write_snapshot(args.metrics)
+        print(f"Metrics written to {args.metrics}")
 
 if __name__ == "__main__":
     main()
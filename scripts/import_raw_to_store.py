@@ -0,0 +1,60 @@
+import json
+import argparse
+from pathlib import Path
+
+from tqdm import tqdm
+
+from data.store import PackageStore, DEFAULT_STORE_PATH
+
+DATA_DIR_PKG = Path("data/raw/packages")
+DATA_DIR_SR = Path("data/raw/sourcerank")
+
+BATCH_SIZE = 1000
+
+def load_json_dir(directory: Path, suffix: str = ""):
+    """Yield `(package_name, record)` for every JSON file in a raw data directory."""
+    for file_path in directory.glob(f"*{suffix}.json"):
+        try:
+            with open(file_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            print(f"Warning: Failed to decode {file_path}")
+            continue
+        name = file_path.name[:-len(f"{suffix}.json")]
+        yield name, data
+
+def import_dir(store: PackageStore, directory: Path, table: str, suffix: str = ""):
+    files = list(directory.glob(f"*{suffix}.json"))
+    batch = {}
+    for name, data in tqdm(load_json_dir(directory, suffix), total=len(files), desc=table, ncols=80):
+        if table == "packages":
+            name = data.get("name") or name
+            batch[name] = {**data, "name": name}
+        else:
+            batch[name] = data
+        if len(batch) >= BATCH_SIZE:
+            write_batch(store, table, batch)
+            batch = {}
+    write_batch(store, table, batch)
+    return len(files)
+
+def write_batch(store: PackageStore, table: str, batch: dict):
+    if table == "packages":
+        store.upsert_packages(list(batch.values()))
+    else:
+        store.upsert_sourcerank(batch)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import the per-package raw JSON files into a package store.")
+    parser.add_argument("--store", type=str, default=str(DEFAULT_STORE_PATH),
+                        help="Path of the package store to create or update")
+    args = parser.parse_args()
+
+    store = PackageStore(args.store)
+    n_pkg = import_dir(store, DATA_DIR_PKG, "packages")
+    n_sr = import_dir(store, DATA_DIR_SR, "sourcerank", suffix="_sourcerank")
+    print(f"Imported {n_pkg} package and {n_sr} SourceRank records into {args.store}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import json
+import argparse
+from pathlib import Path
+
+from tqdm import tqdm
+
+from data.store import PackageStore, DEFAULT_STORE_PATH
+from data.ingest import (
+    BATCH_SIZE,
+    ingest_distributions,
+    query_distributions,
+    read_distribution_export,
+)
+import metrics
+
+def load_package_names(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("packages", [])
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bulk-load release and dependency data from PyPI's distribution_metadata into a package store.")
+    parser.add_argument("--store", type=str, default=str(DEFAULT_STORE_PATH),
+                        help="Path of the package store to create or update")
+    parser.add_argument("--export", type=str,
+                        help="Read a local Parquet/CSV/JSON Lines export of distribution_metadata instead of querying BigQuery")
+    parser.add_argument("--filepath", type=str,
+                        help="JSON package list (e.g. data/top_package_names.json) to restrict ingestion to")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="Records written to the store per transaction")
+    parser.add_argument("--replace", action="store_true",
+                        help="Replace existing records instead of merging the new fields into them")
+    parser.add_argument("--metrics", type=str,
+                        help="Write stage timings as JSON to this path")
+    args = parser.parse_args()
+    if args.metrics:
+        metrics.enable()
+
+    names = load_package_names(args.filepath) if args.filepath else None
+    store = PackageStore(args.store)
+
+    with metrics.stage("read_distributions"):
+        if args.export:
+            rows = read_distribution_export(Path(args.export))
+        else:
+            # Requires GOOGLE_APPLICATION_CREDENTIALS, as for fetch_package_names.py
+            rows = query_distributions(names)
+
+    with tqdm(desc="Packages", ncols=80) as pbar, metrics.stage("ingest"):
+        written = ingest_distributions(
+            store, rows, names=names, merge=not args.replace,
+            batch_size=args.batch_size, progress=pbar.update)
+    store.close()
+    print(f"Ingested {written} packages into {args.store}")
+
+    if args.metrics:
+        metrics.write_snapshot(args.metrics)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import argparse
+from pathlib import Path
+
+import data.graph as graph
+
+def main(args):
+    graph.RAW_DATA_DIR = Path(args.packages_dir)
+    graph.SOURCERANK_DIR = Path(args.sourcerank_dir)
+    renamed = graph.rename_raw_files()
+    print(f"Renamed {renamed} raw files to their normalized package names")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rename raw package and SourceRank files to PEP 503 normalized names (e.g. thds.core -> thds-core).")
+    parser.add_argument("--packages-dir", type=str, default=str(graph.RAW_DATA_DIR),
+                        help="Directory of raw package JSON files")
+    parser.add_argument("--sourcerank-dir", type=str, default=str(graph.SOURCERANK_DIR),
+                        help="Directory of raw SourceRank JSON files")
+
+    main(parser.parse_args())
@@ -1,8 +1,11 @@
 import json
+import argparse
 from pathlib import Path
 
 from tqdm import tqdm
 
+from data.store import PackageStore
+
 DATA_DIR = Path("data/raw/packages")
 OUTPUT_FILE = Path("data/missing_package_names.json")
 
@@ -14,7 +17,12 @@ def has_missing_metadata(meta):
         meta.get("normalized_licenses") is None
     )
 
-def main():
+def find_missing_in_store(store_path):
+    store = PackageStore(store_path)
+    records = store.read_packages(columns=["rank", "stars", "forks", "normalized_licenses"])
+    return [name for name, meta in records.items() if has_missing_metadata(meta)]
+
+def find_missing_in_files():
     missing_names = []
     files = list(DATA_DIR.glob("*.json"))
     for file in tqdm(files, desc="Checking packages for missing metadata", ncols=80):
@@ -27,6 +35,13 @@ def main():
                     missing_names.append(name)
         except Exception as e:
             print(f"Error reading {file}: {e}")
+    return missing_names
+
+def main(store_path=None):
+    if store_path:
+        missing_names = find_missing_in_store(store_path)
+    else:
+        missing_names = find_missing_in_files()
 
     # Save the missing names to the output file in the format: {"packages": [...]}
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
@@ -34,4 +49,8 @@ def main():
     print(f"Found {len(missing_names)} packages with missing metadata. Saved to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="List packages with incomplete metadata.")
+    parser.add_argument("--store", type=str,
+                        help="Read from this package store instead of the JSON files")
+    args = parser.parse_args()
+    main(args.store)
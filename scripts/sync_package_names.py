@@ -0,0 +1,29 @@
+import time
+import argparse
+from pathlib import Path
+
+from data.name_index import NAMES_FILE, sync_package_names
+
+def main(args):
+    start = time.perf_counter()
+    state = sync_package_names(
+        Path(args.filepath),
+        full=args.full,
+        index_fixture=args.index_fixture,
+        changelog_fixture=args.changelog_fixture,
+        timeout=args.timeout,
+    )
+    print(f"{state['mode'].capitalize()} sync: {state['count']:,} names at serial {state['serial']} "
+          f"in {time.perf_counter() - start:.1f}s -> {args.filepath}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync the full list of PyPI package names.")
+    parser.add_argument("--filepath", type=str, default=str(NAMES_FILE), help="Names file (one per line)")
+    parser.add_argument("--full", action="store_true", help="Ignore the stored serial and list everything")
+    parser.add_argument("--index-fixture", type=str, default=None,
+                        help="Offline PEP 691 JSON listing to read instead of PyPI")
+    parser.add_argument("--changelog-fixture", type=str, default=None,
+                        help="Offline JSON list of changelog events to read instead of PyPI")
+    parser.add_argument("--timeout", type=int, default=60, help="Request timeout (s)")
+
+    main(parser.parse_args())
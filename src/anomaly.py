@@ -0,0 +1,244 @@
+import pickle
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+from sklearn.ensemble import IsolationForest
+
+from feature_engineering import detect_communities, node_closeness, node_inter_intra_ratio
+from feature_matrix import (
+    FEATURES,
+    POSITIVE_FEATURES,
+    NEGATIVE_FEATURES,
+    BINARY_POSITIVE_FEATURES,
+    STRUCTURAL_FEATURES,
+    FeatureMatrix,
+    build_feature_matrix,
+)
+
+DEFAULT_MODEL_PATH = Path("data/models/anomaly_scorer.pkl")
+
+# Largest number of nodes reaching a new package for which its closeness is computed
+# on the spot; beyond this it is left stale for the next full feature pass
+CLOSENESS_LIMIT = 10000
+
+def prepare_feature_matrix(G, features=FEATURES, with_structural=False, return_metadata=False,
+                           nodes=None):
+    """Prepare input features for anomaly detection models.
+
+    Applies transformations so that well-established repositories are less likely to
+    be flagged as anomalies, and log-transforms structural features if
+    `with_structural`. Only `nodes` are included when given. Features missing from
+    every node are filled with 0 like missing values. With `return_metadata`, also
+    returns a DataFrame of all original node metadata for explainability.
+    """
+    if nodes is None:
+        node_items = list(G.nodes(data=True))
+    else:
+        node_items = [(node, G.nodes[node]) for node in nodes]
+    node_ids = [node for node, _ in node_items]
+    node_data = [data for _, data in node_items]
+    df = pd.DataFrame(node_data).reindex(columns=features).fillna(0)
+
+    for col in POSITIVE_FEATURES:
+        if col in df.columns:
+            df[f"{col}_log"] = np.log1p(df[col])
+
+    for col in NEGATIVE_FEATURES:
+        if col in df.columns:
+            df[f"{col}_invert"] = 1 - df[col]
+
+    for col in BINARY_POSITIVE_FEATURES:
+        if col in df.columns:
+            df[col] = df[col].fillna(0).astype(int)
+
+    # Interpretable ratios that are HIGH for well-established repos
+    if "forks" in df.columns and "stars" in df.columns:
+        df["engagement_ratio"] = np.log1p(df["forks"]) / (np.log1p(df["stars"]) + 0.1)
+    if "contributors" in df.columns and "dependent_projects" in df.columns:
+        df["maintenance_ratio"] = np.log1p(df["contributors"]) / (np.log1p(df["dependent_projects"]) + 0.1)
+
+    structural_cols = []
+    if with_structural:
+        for col in STRUCTURAL_FEATURES:
+            if col in df.columns:
+                df[f"{col}_log"] = np.log1p(df[col])
+                structural_cols.append(f"{col}_log")
+
+    # Keep only the transformed features
+    transformed_cols = [
+        col for col in df.columns
+        if col.endswith("_log") or col.endswith("_invert")
+        or col in ["engagement_ratio", "maintenance_ratio"]
+        or col in BINARY_POSITIVE_FEATURES
+    ]
+    for col in structural_cols:
+        if col not in transformed_cols:
+            transformed_cols.append(col)
+
+    feature_df = df[transformed_cols]
+    feature_df.index = node_ids
+
+    if return_metadata:
+        metadata_df = pd.DataFrame(node_data)
+        metadata_df.index = node_ids
+        return feature_df, metadata_df
+    return feature_df
+
+def anomaly_scores(model, feature_matrix):
+    """Score and label samples with a fitted model (lower score = more anomalous)."""
+    # Some models use decision_function, some use score_samples
+    if hasattr(model, "decision_function"):
+        scores = model.decision_function(feature_matrix)
+    elif hasattr(model, "score_samples"):
+        scores = model.score_samples(feature_matrix)
+    else:
+        raise AttributeError("Model does not have decision_function or score_samples.")
+
+    if not hasattr(model, "predict"):
+        raise AttributeError("Model does not have predict method.")
+
+    # -1 == anomaly for sklearn models
+    is_anomaly = model.predict(feature_matrix) == -1
+    return scores, is_anomaly
+
+def run_anomaly_model(model_cls, model_params, feature_matrix):
+    """Fit a model on the feature matrix and score every row."""
+    model = model_cls(**model_params)
+    model.fit(feature_matrix)
+    return anomaly_scores(model, feature_matrix)
+
+class AnomalyScorer:
+    """Anomaly model fitted once on a graph and reused to score new packages.
+
+    `fit` builds the feature matrix for the whole graph, fits the model and keeps the
+    matrix columns and (with structural features) the community of every node. Once
+    saved, `score_new` scores packages added to the graph afterwards by recomputing
+    structural features only for them and their direct neighbors. Centralities that
+    would need a graph-wide pass to update are tracked in `stale` instead.
+    """
+
+    def __init__(self, model_cls=IsolationForest, model_params=None, features=FEATURES,
+                 with_structural=False, community_method="greedy_modularity", seed=None):
+        self.model_cls = model_cls
+        self.model_params = dict(model_params or {"contamination": 0.02, "random_state": 42})
+        self.features = list(features)
+        self.with_structural = with_structural
+        self.community_method = community_method
+        self.seed = seed
+        self.model = None
+        self.columns = None
+        self.communities = {}
+        self.stale = set()
+
+    def fit(self, G, communities=None) -> "AnomalyScorer":
+        """Fit the model on every node of G.
+
+        `communities` is the partition G's `inter_intra_ratio` was computed from, as a
+        list of node sets or a `{node: label}` mapping. By default it is read from the
+        `community` node attribute set by compute_inter_intra_ratios, and only
+        detected again (with `community_method` and `seed`) if no node has one.
+        """
+        X = build_feature_matrix(G, self.features, with_structural=self.with_structural)
+        self.columns = X.columns
+        self.model = self.model_cls(**self.model_params)
+        self.model.fit(X.values)
+        self.stale = set()
+
+        if self.with_structural and "inter_intra_ratio" in self.features:
+            if communities is None:
+                communities = {node: label for node, label in G.nodes(data="community") if label is not None}
+            if not communities:
+                communities = detect_communities(G, self.community_method, seed=self.seed)
+            if not isinstance(communities, dict):
+                communities = {node: i for i, comm in enumerate(communities) for node in comm}
+            self.communities = dict(communities)
+        return self
+
+    def transform(self, G, nodes=None) -> FeatureMatrix:
+        """Feature matrix for `nodes` (in the given order) as the model was fitted on."""
+        if self.model is None:
+            raise RuntimeError("AnomalyScorer must be fitted before scoring")
+        return build_feature_matrix(G, self.features, with_structural=self.with_structural,
+                                    nodes=nodes, core_first=False)
+
+    def score(self, G, nodes=None) -> pd.DataFrame:
+        """Return a DataFrame of `score` and `label` (1 = anomaly) indexed by node."""
+        X = self.transform(G, nodes)
+        scores, is_anomaly = anomaly_scores(self.model, X.values)
+        return pd.DataFrame({"score": scores, "label": is_anomaly.astype(int)}, index=X.nodes)
+
+    def update_local_features(self, G, nodes) -> set:
+        """Recompute structural features of `nodes` and their direct neighbors in place.
+
+        Degree, clustering and the inter/intra ratio are exact for the affected nodes.
+        Closeness of the new nodes is computed from the nodes reaching them (bounded
+        by CLOSENESS_LIMIT), and new packages nothing depends on have zero
+        betweenness. The neighbors' centralities, and those of new nodes over the
+        bound, keep their value and are added to `stale`; refresh them with a full
+        add_structural_features pass and refit. Communities are extended by giving a
+        new node the most common community among its successors. Returns the set of
+        nodes whose features were updated.
+        """
+        if not self.with_structural:
+            return set()
+
+        nodes = [node for node in nodes if node in G]
+        affected = set(nodes)
+        for node in nodes:
+            affected.update(G.successors(node))
+            affected.update(G.predecessors(node))
+
+        for node in nodes:
+            if node not in self.communities:
+                labels = Counter(self.communities[s] for s in G.successors(node) if s in self.communities)
+                if labels:
+                    self.communities[node] = labels.most_common(1)[0][0]
+                    G.nodes[node]["community"] = self.communities[node]
+
+        scale = 1 / (len(G) - 1) if len(G) > 1 else 1
+        clustering = nx.clustering(G, affected)
+        for node in affected:
+            data = G.nodes[node]
+            data["degree_centrality"] = G.degree(node) * scale
+            data["clustering_coefficient"] = clustering[node]
+            data["inter_intra_ratio"] = node_inter_intra_ratio(G, node, self.communities)
+
+        # Paths through the new nodes change the centralities of their neighbors
+        self.stale.update(affected.difference(nodes))
+        reverse = G.reverse(copy=False)
+        for node in nodes:
+            data = G.nodes[node]
+            closeness = node_closeness(reverse, node, len(G), limit=CLOSENESS_LIMIT)
+            if closeness is None:
+                self.stale.add(node)
+            else:
+                data["closeness_centrality"] = closeness
+            if "betweenness_centrality" not in data:
+                if G.in_degree(node) == 0:
+                    data["betweenness_centrality"] = 0.0
+                else:
+                    self.stale.add(node)
+        return affected
+
+    def score_new(self, G, nodes) -> pd.DataFrame:
+        """Update local features for newly added `nodes` and score them."""
+        nodes = list(nodes)
+        self.update_local_features(G, nodes)
+        return self.score(G, nodes)
+
+    def save(self, path=DEFAULT_MODEL_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path=DEFAULT_MODEL_PATH) -> "AnomalyScorer":
+        with open(path, "rb") as f:
+            scorer = pickle.load(f)
+        # Scorers saved before staleness was tracked
+        scorer.__dict__.setdefault("stale", set())
+        return scorer
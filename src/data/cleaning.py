@@ -1,31 +1,41 @@
-import re
+from data.requirements import normalize_name, parse_extra, requirement_attributes
+
+def dependency_key(name: str, kind: str, optional: bool) -> str | None:
+    """Key of a raw dependency in `runtime_dependencies`/`optional_dependencies` form.
+
+    Runtime dependencies are keyed by name and optional ones as `extra:name`
+    (`unspecified:name` when no extra is given). Returns None for dependencies that
+    are in neither list.
+    """
+    extra = parse_extra(kind)
+    if extra:
+        return f"{extra}:{name}"
+    if optional:
+        return f"unspecified:{name}"
+    if kind == "runtime":
+        return name
+    return None
 
 def clean_metadata(meta: dict) -> dict:
-    def extract_runtime_dependencies(raw_deps):
-        # Consolidate raw dependencies into a list of unique, required package names
-        return sorted(set(
-            dep["name"].lower()
-            for dep in raw_deps
-            if dep.get("kind") == "runtime" and not dep.get("optional", False)
-        ))
-
-    def extract_optional_dependencies(raw_deps):
-        deps = set()
-
-        for dep in raw_deps:
-            name = dep.get("name", "").lower()
-            kind = dep.get("kind", "")
-            is_optional = dep.get("optional", False)
-
-            # Match extras like 'extra == "test"'
-            match = re.match(r'extra\s*==\s*"([^"]+)"', kind)
-            if match:
-                extra = match.group(1).lower()
-                deps.add(f"{extra}:{name}")
-            elif is_optional:
-                deps.add(f"unspecified:{name}")
-
-        return sorted(deps)
+    # Consolidate raw dependencies into required package names, optional
+    # "extra:name" entries and the version constraints and markers of both
+    runtime, optional, requirements = set(), set(), {}
+    for dep in meta.get("dependencies", []):
+        name = dep.get("name", "")
+        if not name:
+            continue
+        name = normalize_name(name)
+        key = dependency_key(name, dep.get("kind", ""), dep.get("optional", False))
+        if key is None:
+            continue
+        (runtime if key == name else optional).add(key)
+
+        # A name can be listed more than once, e.g. under different markers, so
+        # each dependency keeps every distinct (specifier, marker) pair
+        entries = requirements.setdefault(key, [])
+        attrs = requirement_attributes(dep.get("requirements"), dep.get("marker"))
+        if attrs not in entries:
+            entries.append(attrs)
 
     # Clean licenses
     licenses = meta.get("licenses", [])
@@ -40,10 +50,28 @@ def clean_metadata(meta: dict) -> dict:
     # Remove versions if present (using latest only)
     meta.pop("versions", None)
 
-    # Extract set of dependencies
-    raw_deps = meta.get("dependencies", [])
-    meta["runtime_dependencies"] = extract_runtime_dependencies(raw_deps)
-    meta["optional_dependencies"] = extract_optional_dependencies(raw_deps)
+    meta["runtime_dependencies"] = sorted(runtime)
+    meta["optional_dependencies"] = sorted(optional)
+    # Dependencies listed without any constraint or marker need no entry
+    meta["dependency_requirements"] = {
+        key: entries for key, entries in sorted(requirements.items()) if entries != [{}]}
     meta.pop("dependencies", None)
 
     return meta
+
+def dependency_names(meta: dict) -> set[str]:
+    """Return the names of all runtime and optional dependencies of cleaned metadata."""
+    deps = set()
+
+    for dep in meta.get("runtime_dependencies", []):
+        deps.add(normalize_name(dep.strip()))
+
+    for entry in meta.get("optional_dependencies", []):
+        if ":" in entry:
+            _, dep = entry.split(":", 1)
+        else:
+            dep = entry
+        deps.add(normalize_name(dep.strip()))
+
+    deps.discard("")
+    return deps
@@ -0,0 +1,198 @@
+import numpy as np
+import networkx as nx
+
+# Placeholder for "attribute not set" in encoded columns
+ABSENT = object()
+# Largest integer magnitude a float64 column holds exactly
+EXACT_FLOAT_INT = 2 ** 53
+
+class Column:
+    """A node or edge attribute stored as one typed NumPy array.
+
+    Booleans, integers and floats are stored natively and strings are dictionary
+    encoded (`values` holds int32 codes into `categories`). Columns mixing ints and
+    floats are stored as floats, with `ints` marking the elements that were ints.
+    Anything else falls back to an object array. `absent` marks elements that did
+    not have the attribute and `null` marks elements whose value was None; any mask
+    is None when unused.
+    """
+
+    def __init__(self, values, categories=None, absent=None, null=None, ints=None):
+        self.values = values
+        self.categories = categories
+        self.absent = absent
+        self.null = null
+        self.ints = ints
+
+    @classmethod
+    def encode(cls, items: list) -> "Column":
+        """Encode a list of Python values, where `ABSENT` marks elements without the attribute."""
+        n = len(items)
+        absent = np.fromiter((v is ABSENT for v in items), dtype=bool, count=n)
+        null = np.fromiter((v is None for v in items), dtype=bool, count=n)
+        skip = absent | null
+        present = [v for v, s in zip(items, skip) if not s]
+        types = {type(v) for v in present}
+        categories = None
+        ints = None
+
+        if types <= {str}:
+            categories = sorted(set(present))
+            lookup = {c: i for i, c in enumerate(categories)}
+            values = np.array([-1 if s else lookup[v] for v, s in zip(items, skip)], dtype=np.int32)
+        elif types <= {bool, np.bool_}:
+            values = np.array([False if s else v for v, s in zip(items, skip)], dtype=bool)
+        elif types <= {int, np.int64}:
+            values = np.array([0 if s else v for v, s in zip(items, skip)], dtype=np.int64)
+        elif types <= {int, float, np.int64, np.float64} and all(
+                abs(v) <= EXACT_FLOAT_INT for v in present if type(v) in (int, np.int64)):
+            values = np.array([0.0 if s else v for v, s in zip(items, skip)], dtype=np.float64)
+            ints = np.fromiter((type(v) in (int, np.int64) for v in items), dtype=bool, count=n)
+        else:
+            values = np.empty(n, dtype=object)
+            values[:] = [None if s else v for v, s in zip(items, skip)]
+
+        return cls(values, categories, absent if absent.any() else None, null if null.any() else None,
+                   ints if ints is not None and ints.any() else None)
+
+    def decode(self) -> list:
+        """Return the column as a list of Python values (absent elements as `ABSENT`)."""
+        if self.categories is not None:
+            out = [self.categories[c] if c >= 0 else None for c in self.values.tolist()]
+        else:
+            out = self.values.tolist()
+        if self.ints is not None:
+            for i in np.flatnonzero(self.ints).tolist():
+                out[i] = int(out[i])
+        if self.null is not None:
+            for i in np.flatnonzero(self.null).tolist():
+                out[i] = None
+        if self.absent is not None:
+            for i in np.flatnonzero(self.absent).tolist():
+                out[i] = ABSENT
+        return out
+
+    def take(self, idx) -> "Column":
+        """Return a new column with the elements at `idx`."""
+        return Column(
+            self.values[idx], self.categories,
+            None if self.absent is None else self.absent[idx],
+            None if self.null is None else self.null[idx],
+            None if self.ints is None else self.ints[idx])
+
+class CSRGraph:
+    """Compact directed graph with integer node ids and array attributes.
+
+    Node `i` is named `names[i]`. Out-edges of node `i` are `indices[indptr[i]:indptr[i+1]]`
+    (CSR) and in-edges are `in_indices[in_indptr[i]:in_indptr[i+1]]` (CSC), with
+    `in_edge_ids` mapping each CSC slot back to its CSR edge position. Node and edge
+    attributes are `Column`s aligned with node ids and CSR edge positions.
+
+    Converting from networkx keeps node order and per-node neighbor order, so
+    `CSRGraph.from_networkx(G).to_networkx()` reproduces `G` including iteration order.
+    """
+
+    def __init__(self, names, src, dst, node_attrs=None, edge_attrs=None, graph_attrs=None):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+
+        # Stable sort keeps the original per-source edge order
+        order = np.argsort(src, kind="stable")
+        self.src = src[order]
+        self.indices = dst[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.src, minlength=n), out=self.indptr[1:])
+
+        in_order = np.argsort(self.indices, kind="stable")
+        self.in_indices = self.src[in_order]
+        self.in_edge_ids = in_order
+        self.in_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=n), out=self.in_indptr[1:])
+
+        self.node_attrs = dict(node_attrs or {})
+        self.edge_attrs = {k: col.take(order) for k, col in (edge_attrs or {}).items()}
+        self.graph = dict(graph_attrs or {})
+
+    @classmethod
+    def from_parts(cls, names, src, indices, indptr, in_indices, in_indptr, in_edge_ids,
+                   node_attrs=None, edge_attrs=None, graph_attrs=None) -> "CSRGraph":
+        """Assemble a graph from already sorted CSR/CSC arrays (e.g. memory-mapped ones)."""
+        graph = cls.__new__(cls)
+        graph.names = list(names)
+        graph.index = {name: i for i, name in enumerate(graph.names)}
+        graph.src, graph.indices, graph.indptr = src, indices, indptr
+        graph.in_indices, graph.in_indptr, graph.in_edge_ids = in_indices, in_indptr, in_edge_ids
+        graph.node_attrs = dict(node_attrs or {})
+        graph.edge_attrs = dict(edge_attrs or {})
+        graph.graph = dict(graph_attrs or {})
+        return graph
+
+    @classmethod
+    def from_networkx(cls, G: nx.DiGraph) -> "CSRGraph":
+        names = list(G.nodes)
+        index = {name: i for i, name in enumerate(names)}
+
+        node_data = [data for _, data in G.nodes(data=True)]
+        node_keys = dict.fromkeys(k for data in node_data for k in data)
+        node_attrs = {
+            k: Column.encode([data.get(k, ABSENT) for data in node_data])
+            for k in node_keys
+        }
+
+        edges = list(G.edges(data=True))
+        src = np.fromiter((index[u] for u, _, _ in edges), dtype=np.int64, count=len(edges))
+        dst = np.fromiter((index[v] for _, v, _ in edges), dtype=np.int64, count=len(edges))
+        edge_keys = dict.fromkeys(k for _, _, data in edges for k in data)
+        edge_attrs = {
+            k: Column.encode([data.get(k, ABSENT) for _, _, data in edges])
+            for k in edge_keys
+        }
+
+        return cls(names, src, dst, node_attrs, edge_attrs, G.graph)
+
+    def to_networkx(self) -> nx.DiGraph:
+        G = nx.DiGraph()
+        G.graph.update(self.graph)
+
+        node_cols = {k: col.decode() for k, col in self.node_attrs.items()}
+        G.add_nodes_from(
+            (name, {k: vals[i] for k, vals in node_cols.items() if vals[i] is not ABSENT})
+            for i, name in enumerate(self.names))
+
+        edge_cols = {k: col.decode() for k, col in self.edge_attrs.items()}
+        names = self.names
+        G.add_edges_from(
+            (names[u], names[v], {k: vals[e] for k, vals in edge_cols.items() if vals[e] is not ABSENT})
+            for e, (u, v) in enumerate(zip(self.src.tolist(), self.indices.tolist())))
+        return G
+
+    def number_of_nodes(self) -> int:
+        return len(self.names)
+
+    def number_of_edges(self) -> int:
+        return len(self.indices)
+
+    def out_degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def in_degree(self) -> np.ndarray:
+        return np.diff(self.in_indptr)
+
+    def successors(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def predecessors(self, i: int) -> np.ndarray:
+        return self.in_indices[self.in_indptr[i]:self.in_indptr[i + 1]]
+
+    def node_values(self, attr: str, decode: bool = False):
+        """Return a node attribute array (or, with `decode`, a list of Python values)."""
+        col = self.node_attrs[attr]
+        return col.decode() if decode else col.values
+
+    def edge_values(self, attr: str, decode: bool = False):
+        """Return an edge attribute array in CSR edge order."""
+        col = self.edge_attrs[attr]
+        return col.decode() if decode else col.values
@@ -3,6 +3,8 @@ import json
 from datetime import datetime, timezone
 from google.cloud import bigquery
 
+from data.requirements import normalize_name
+
 def get_top_pypi_packages(n=200, days=7):
     client = bigquery.Client()
     query = f"""
@@ -24,6 +26,33 @@ def get_recent_pypi_packages(n=200):
     """
     return [row.name for row in client.query(query).result()]
 
+def iter_latest_distributions(names=None, page_size=10000):
+    """Yield the newest distribution of each project as `{name, version, upload_time, requires_dist}`.
+
+    One query covers every project (or only `names`, matched after PEP 503
+    normalization); rows are streamed page by page.
+    """
+    client = bigquery.Client()
+    normalized = r"REGEXP_REPLACE(LOWER(name), r'[-_.]+', '-')"
+    name_filter = f"WHERE {normalized} IN UNNEST(@names)" if names is not None else ""
+    query = f"""
+        SELECT name, version, upload_time, requires_dist
+        FROM `bigquery-public-data.pypi.distribution_metadata`
+        {name_filter}
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY {normalized} ORDER BY upload_time DESC) = 1
+    """
+    params = []
+    if names is not None:
+        params.append(bigquery.ArrayQueryParameter("names", "STRING", sorted({normalize_name(n) for n in names})))
+    job = client.query(query, job_config=bigquery.QueryJobConfig(query_parameters=params))
+    for row in job.result(page_size=page_size):
+        yield {
+            "name": row.name,
+            "version": row.version,
+            "upload_time": row.upload_time,
+            "requires_dist": list(row.requires_dist or []),
+        }
+
 def save_package_list(packages, path, mode, n, days):
     os.makedirs(os.path.dirname(path), exist_ok=True)
     output = {
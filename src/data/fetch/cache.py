@@ -0,0 +1,159 @@
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import metrics
+
+DEFAULT_CACHE_PATH = Path("data/cache/http_cache.sqlite")
+
+# Query parameters that identify the caller rather than the resource
+IGNORED_PARAMS = {"api_key"}
+
+# Response headers worth keeping alongside the body
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control", "Date")
+
+def cache_key(url: str, params: dict | None = None) -> str:
+    """Normalize a URL and its query parameters into a cache key, dropping API keys."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query) + list((params or {}).items())
+    query = sorted((k, str(v)) for k, v in query if k not in IGNORED_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, urlencode(query), ""))
+
+class ResponseCache:
+    """Persistent HTTP response cache stored in a single SQLite file.
+
+    Successful GET responses are stored with their ETag and Last-Modified headers.
+    Entries younger than `ttl` seconds are served without touching the network; older
+    ones are revalidated with If-None-Match/If-Modified-Since so an unchanged resource
+    costs a 304. The total body size is kept under `max_bytes` by evicting the least
+    recently used entries.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=0, max_bytes=1 << 30):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses (last_access)")
+        self.conn.commit()
+        # Running total of body sizes, so stores do not scan the table to check the budget
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def lookup(self, key: str) -> dict | None:
+        """Return the stored entry for `key` with a `fresh` flag, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT headers, body, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+        headers, body, stored_at = row
+        return {
+            "headers": json.loads(headers),
+            "body": body,
+            "fresh": now - stored_at < self.ttl,
+        }
+
+    def conditional_headers(self, entry: dict) -> dict:
+        """Build the revalidation headers for a stored entry."""
+        headers = {}
+        if entry["headers"].get("ETag"):
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+        if entry["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        return headers
+
+    def store(self, key: str, res: requests.Response):
+        """Store a 200 response and evict old entries if the cache is over budget."""
+        headers = {h: res.headers[h] for h in STORED_HEADERS if h in res.headers}
+        body = res.content
+        now = time.time()
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(headers), body, len(body), now, now))
+            self.total_bytes += len(body) - (old[0] if old else 0)
+            self.stats["stores"] += 1
+            self._evict()
+            self.conn.commit()
+
+    def refresh(self, key: str, res: requests.Response):
+        """Mark an entry as revalidated after a 304, picking up any new validators."""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT headers FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            headers = json.loads(row[0])
+            headers.update({h: res.headers[h] for h in ("ETag", "Last-Modified") if h in res.headers})
+            self.conn.execute(
+                "UPDATE responses SET headers = ?, stored_at = ?, last_access = ? WHERE key = ?",
+                (json.dumps(headers), now, now, key))
+            self.conn.commit()
+
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        # Walk the last_access index only as far as needed to get back under budget
+        evicted = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if self.total_bytes <= self.max_bytes:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.stats["evictions"] += len(evicted)
+
+    def record(self, outcome: str):
+        with self.lock:
+            self.stats[outcome] += 1
+        metrics.incr("http_cache.lookups", outcome=outcome)
+
+    def hit_ratio(self) -> float:
+        """Fraction of lookups answered from the cache, counting 304 revalidations."""
+        served = self.stats["hits"] + self.stats["revalidated"]
+        total = served + self.stats["misses"]
+        return served / total if total else 0.0
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+            self.total_bytes = 0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def cached_response(url: str, entry: dict) -> requests.Response:
+    """Rebuild a `requests.Response` from a stored entry."""
+    res = requests.Response()
+    res.status_code = 200
+    res.url = url
+    res.headers = CaseInsensitiveDict(entry["headers"])
+    res._content = entry["body"]
+    res.from_cache = True
+    return res
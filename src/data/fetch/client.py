@@ -0,0 +1,177 @@
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from data.fetch.ratelimit import acquire, host_of
+from data.fetch.cache import ResponseCache, cache_key, cached_response
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Maximum number of in-flight requests per host. Hosts not listed use `pool_size`.
+DEFAULT_HOST_CONCURRENCY = {
+    "libraries.io": 4,
+    "pypi.org": 16,
+}
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Return the delay in seconds requested by a Retry-After header, if any."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+class HttpClient:
+    """HTTP client shared by the fetch modules.
+
+    A single `requests.Session` keeps one keep-alive connection pool per host. Each
+    request waits for the host's token bucket, holds one of the host's concurrency
+    slots while on the wire, and is retried with exponential backoff and full jitter
+    on connection errors and 429/5xx responses, honoring Retry-After when present.
+    GETs are answered from (and revalidated against) `cache` when one is given.
+    """
+
+    def __init__(self, max_retries=4, backoff_base=0.5, backoff_max=60.0, pool_size=16,
+                 host_concurrency=None, cache: ResponseCache = None):
+        self.cache = cache
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size
+        self.host_concurrency = dict(DEFAULT_HOST_CONCURRENCY)
+        self.host_concurrency.update(host_concurrency or {})
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._slots = {}
+        self._slots_lock = threading.Lock()
+
+    def _slot(self, host: str) -> threading.Semaphore:
+        with self._slots_lock:
+            if host not in self._slots:
+                limit = self.host_concurrency.get(host, self.pool_size)
+                self._slots[host] = threading.BoundedSemaphore(limit)
+            return self._slots[host]
+
+    def _backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def _sleep(self, host: str, delay: float):
+        metrics.incr("http.retries", host=host)
+        metrics.incr("http.backoff_seconds", delay, host=host)
+        time.sleep(delay)
+
+    def request(self, method: str, url: str, timeout=20, **kwargs) -> requests.Response:
+        """Send a request, retrying transient failures.
+
+        Returns the last response received, which may still have an error status once
+        retries are exhausted. Raises `requests.RequestException` if every attempt
+        failed without a response.
+        """
+        host = host_of(url)
+        slot = self._slot(host)
+
+        for attempt in range(self.max_retries + 1):
+            waited = acquire(host)
+            metrics.observe("ratelimit.wait_seconds", waited, host=host)
+            try:
+                with slot:
+                    start = time.perf_counter()
+                    res = self.session.request(method, url, timeout=timeout, **kwargs)
+                    metrics.observe("http.latency_seconds", time.perf_counter() - start, host=host)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.incr("http.errors", host=host, error=type(e).__name__)
+                if attempt == self.max_retries:
+                    raise
+                self._sleep(host, self._backoff(attempt))
+                continue
+
+            metrics.incr("http.responses", host=host, status=res.status_code)
+            if res.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return res
+
+            retry_after = parse_retry_after(res.headers.get("Retry-After"))
+            res.close()
+            self._sleep(host, self._backoff(attempt, retry_after))
+
+        return res
+
+    def get(self, url: str, timeout=20, params=None, headers=None, **kwargs) -> requests.Response:
+        if self.cache is None:
+            return self.request("GET", url, timeout=timeout, params=params, headers=headers, **kwargs)
+
+        key = cache_key(url, params)
+        entry = self.cache.lookup(key)
+        if entry is not None and entry["fresh"]:
+            self.cache.record("hits")
+            return cached_response(url, entry)
+
+        headers = dict(headers or {})
+        if entry is not None:
+            headers.update(self.cache.conditional_headers(entry))
+
+        res = self.request("GET", url, timeout=timeout, params=params, headers=headers, **kwargs)
+        if res.status_code == 304 and entry is not None:
+            self.cache.record("revalidated")
+            self.cache.refresh(key, res)
+            return cached_response(url, entry)
+
+        self.cache.record("misses")
+        if res.status_code == 200:
+            self.cache.store(key, res)
+        return res
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client() -> HttpClient:
+    """Return the process-wide client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+def set_client(client: HttpClient | None):
+    """Replace the process-wide client (e.g. one pointed at a stub server in tests)."""
+    global _client
+    with _client_lock:
+        _client = client
+
+def configure(cache_path=None, cache_ttl=0, cache_max_bytes=1 << 30, **client_kwargs) -> HttpClient:
+    """Install a new shared client, with an on-disk response cache if `cache_path` is set."""
+    cache = None
+    if cache_path is not None:
+        cache = ResponseCache(cache_path, ttl=cache_ttl, max_bytes=cache_max_bytes)
+    client = HttpClient(cache=cache, **client_kwargs)
+    set_client(client)
+    return client
+
+def get(url: str, timeout=20, **kwargs) -> requests.Response:
+    """GET `url` through the shared client."""
+    return get_client().get(url, timeout=timeout, **kwargs)
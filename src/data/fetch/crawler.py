@@ -0,0 +1,144 @@
+import os
+import json
+import heapq
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+
+DEFAULT_WORKERS = 8
+
+class DependencyCrawler:
+    """Breadth-first crawl of the dependency graph with a deduplicated, prioritized frontier.
+
+    `fetch_fn(name)` fetches (and saves) one package and returns the names of its
+    dependencies, or None if nothing could be fetched. Packages are expanded level by
+    level up to `max_depth` hops from the seeds; within a level the packages depended
+    on by the most already-crawled packages go first. Progress is written to
+    `state_path` every `save_every` packages so an interrupted crawl can be resumed
+    (with the same `max_depth`).
+    """
+
+    def __init__(self, fetch_fn, max_depth=1, workers=DEFAULT_WORKERS, state_path=None,
+                 save_every=100):
+        self.fetch_fn = fetch_fn
+        self.max_depth = max_depth
+        self.workers = workers
+        self.state_path = Path(state_path) if state_path is not None else None
+        self.save_every = save_every
+
+        self.visited = {}       # name -> depth, for completed packages
+        self.depth = {}         # name -> shallowest depth seen, for queued packages
+        self.running = {}       # name -> depth, for packages being fetched
+        self.dependents = Counter()
+        self.heap = []
+
+    def push(self, name: str, depth: int):
+        """Queue `name` at `depth` unless it is already crawled, in flight or too deep."""
+        if name in self.visited or name in self.running:
+            return
+        if depth > self.max_depth and name not in self.depth:
+            return
+        # Re-pushing an already queued name refreshes its priority; the older heap
+        # entries are skipped when popped
+        self.depth[name] = min(depth, self.depth.get(name, depth))
+        heapq.heappush(self.heap, (self.depth[name], -self.dependents[name], name))
+
+    def pop(self, max_depth=None) -> tuple[str, int] | None:
+        """Take the highest-priority queued package and mark it as in flight.
+
+        Returns None if nothing is queued at `max_depth` or shallower.
+        """
+        while self.heap:
+            depth, neg_count, name = self.heap[0]
+            if self.depth.get(name) != depth or -neg_count != self.dependents[name]:
+                heapq.heappop(self.heap)
+                continue
+            if max_depth is not None and depth > max_depth:
+                return None
+            heapq.heappop(self.heap)
+            del self.depth[name]
+            self.running[name] = depth
+            return name, depth
+        return None
+
+    def save_state(self):
+        if self.state_path is None:
+            return
+        frontier = dict(self.depth)
+        frontier.update(self.running)
+        state = {
+            "max_depth": self.max_depth,
+            "visited": self.visited,
+            "frontier": frontier,
+            "dependents": dict(self.dependents),
+        }
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def load_state(self) -> bool:
+        """Restore a previous crawl from `state_path`. Returns False if there is none."""
+        if self.state_path is None or not self.state_path.exists():
+            return False
+        with open(self.state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state["max_depth"] != self.max_depth:
+            # Packages past the saved depth were never queued, so keep the saved one
+            print(f"Resuming with the saved max_depth={state['max_depth']} (not {self.max_depth})")
+            self.max_depth = state["max_depth"]
+        self.visited = state["visited"]
+        self.dependents = Counter(state["dependents"])
+        for name, depth in state["frontier"].items():
+            self.push(name, depth)
+        return True
+
+    def crawl(self, seeds=(), progress=None) -> dict:
+        """Crawl from `seeds` (plus any restored frontier) and return `{name: depth}`.
+
+        `progress(name, deps, error)` is called after each package completes. Levels are
+        crawled one at a time: deeper packages are only fetched once the current level
+        has finished, so every package is reached at its shallowest depth.
+        """
+        for name in seeds:
+            self.push(name, 0)
+
+        completed = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {}
+            while self.heap or futures:
+                while len(futures) < self.workers:
+                    item = self.pop(min(self.running.values(), default=None))
+                    if item is None:
+                        break
+                    futures[pool.submit(self.fetch_fn, item[0])] = item
+
+                if not futures:
+                    break
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, depth = futures.pop(future)
+                    del self.running[name]
+                    try:
+                        deps, error = future.result(), None
+                    except Exception as e:
+                        deps, error = None, e
+
+                    self.visited[name] = depth
+                    metrics.incr("crawler.packages", depth=depth, outcome="ok" if error is None else "error")
+                    metrics.gauge("crawler.frontier", len(self.depth))
+                    for dep in deps or ():
+                        self.dependents[dep] += 1
+                        self.push(dep, depth + 1)
+
+                    if progress is not None:
+                        progress(name, deps, error)
+                    completed += 1
+                    if completed % self.save_every == 0:
+                        self.save_state()
+
+        self.save_state()
+        return self.visited
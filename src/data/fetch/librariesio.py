@@ -1,18 +1,21 @@
-import requests
+from data.fetch import client
 from data.fetch.pypi import fetch_dependencies_pypi
 
+# Overridable so the fetchers can be pointed at a local stub server.
+LIBRARIESIO_API_URL = "https://libraries.io/api"
+
 def fetch_metadata_librariesio(package_name, api_key, timeout=20):
     """Fetch metadata for a PyPI package from Libraries.io."""
-    BASE_URL = "https://libraries.io/api/pypi/{}/latest/dependencies?api_key={}"
-    url = BASE_URL.format(package_name, api_key)
+    url = f"{LIBRARIESIO_API_URL}/pypi/{package_name}/latest/dependencies"
 
     dependencies = fetch_dependencies_pypi(package_name)
 
     try:
-        res = requests.get(url, timeout=timeout)
+        res = client.get(url, params={"api_key": api_key}, timeout=timeout)
         if res.status_code == 200:
             meta = res.json()
         else:
+            print(f"Failed to fetch metadata for {package_name}: status {res.status_code}")
             meta = {}
     except Exception as e:
         print(f"Error fetching from Libraries.io for {package_name}: {e}")
@@ -25,11 +28,10 @@ def fetch_metadata_librariesio(package_name, api_key, timeout=20):
 
 def fetch_sourcerank_info_librariesio(package_name, api_key, timeout=20):
     """Fetch the SourceRank breakdown for a PyPI package from Libraries.io."""
-    BASE_URL = "https://libraries.io/api/pypi/{}/sourcerank?api_key={}"
-    url = BASE_URL.format(package_name, api_key)
+    url = f"{LIBRARIESIO_API_URL}/pypi/{package_name}/sourcerank"
 
     try:
-        res = requests.get(url, timeout=timeout)
+        res = client.get(url, params={"api_key": api_key}, timeout=timeout)
         if res.status_code == 200:
             info = res.json()
         else:
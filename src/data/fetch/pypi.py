@@ -1,50 +1,154 @@
-import re
-import requests
-from bs4 import BeautifulSoup
+import json
+import codecs
+import xmlrpc.client
 
-def fetch_package_names_pypi(timeout=20):
-    """Returns a list of ALL package names from the PyPI simple list."""
-    resp = requests.get("https://pypi.org/simple/", timeout=timeout)
-    soup = BeautifulSoup(resp.text, "html.parser")
-    return [a.text for a in soup.find_all("a")]
+from data.fetch import client
+from data.requirements import parse_requirements
 
-def fetch_dependencies_pypi(pkg_name) -> list[dict]:
+# Overridable so the fetchers can be pointed at a local stub server.
+PYPI_URL = "https://pypi.org"
+
+SIMPLE_JSON_TYPE = "application/vnd.pypi.simple.v1+json"
+
+def iter_json_array(chunks, key: str):
+    """Yield the items of the top-level array `key` from a JSON document given in chunks.
+
+    Only the current item and one chunk are held in memory, so arbitrarily large
+    documents such as the PEP 691 project list are parsed in constant memory.
+    """
+    decoder = json.JSONDecoder()
+    text = _decode_chunks(chunks)
+    marker = f'"{key}"'
+
+    buf = ""
+    for chunk in text:
+        buf += chunk
+        start = buf.find(marker)
+        if start < 0:
+            buf = buf[-len(marker):]
+            continue
+        bracket = buf.find("[", start + len(marker))
+        if bracket >= 0:
+            buf = buf[bracket + 1:]
+            break
+    else:
+        return
+
+    pos = 0
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        try:
+            item, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            chunk = next(text, None)
+            if chunk is None:
+                raise ValueError(f"Truncated JSON array '{key}'")
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+
+def _decode_chunks(chunks):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        if chunk:
+            yield chunk
+
+def iter_file_chunks(path, chunk_size=1 << 16):
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+def stream_package_index(timeout=60, fixture=None) -> tuple[int | None, object]:
+    """Stream the full PyPI project list from the PEP 691 JSON simple index.
+
+    Returns `(serial, projects)` where `projects` yields `(name, last_serial)` and
+    `serial` is the index serial from the X-PyPI-Last-Serial header (None when
+    reading a `fixture` file; use the largest project serial instead).
+    """
+    if fixture is not None:
+        chunks, serial = iter_file_chunks(fixture), None
+    else:
+        # Bypasses the response cache: the listing is far too large to store
+        res = client.get_client().request(
+            "GET", f"{PYPI_URL}/simple/", timeout=timeout, stream=True,
+            headers={"Accept": SIMPLE_JSON_TYPE})
+        res.raise_for_status()
+        serial = res.headers.get("X-PyPI-Last-Serial")
+        serial = int(serial) if serial else None
+        chunks = res.iter_content(chunk_size=1 << 16)
+
+    projects = ((p["name"], p.get("_last-serial")) for p in iter_json_array(chunks, "projects"))
+    return serial, projects
+
+def fetch_package_names_pypi(timeout=60):
+    """Returns a list of ALL package names from the PyPI simple index (PEP 691 JSON)."""
+    _, projects = stream_package_index(timeout=timeout)
+    return [name for name, _ in projects]
+
+def xmlrpc_call(method: str, *params, timeout=60):
+    """Call a PyPI XML-RPC `method`, raising `xmlrpc.client.Fault` on a fault response."""
+    res = client.get_client().request(
+        "POST", f"{PYPI_URL}/pypi", timeout=timeout,
+        data=xmlrpc.client.dumps(params, method).encode(), headers={"Content-Type": "text/xml"})
+    res.raise_for_status()
+    return xmlrpc.client.loads(res.content)[0][0]
+
+def fetch_changelog_since(serial: int, fixture=None) -> list[tuple]:
+    """Return PyPI changelog events `(name, version, timestamp, action, serial)` after `serial`.
+
+    Uses the XML-RPC `changelog_since_serial` call (the only API that lists changes
+    since a serial), paging until no newer events remain. Calls go through the shared
+    client, so they get the same rate limit and retries as every other request. A
+    `fixture` is a JSON file holding the event list.
+    """
+    if fixture is not None:
+        with open(fixture, encoding="utf-8") as f:
+            return [tuple(e) for e in json.load(f) if e[4] > serial]
+
+    events = []
+    while True:
+        page = xmlrpc_call("changelog_since_serial", serial)
+        if not page:
+            return events
+        events.extend(tuple(e) for e in page)
+        serial = max(e[4] for e in page)
+
+def requires_dist_dependencies(requires_dist) -> list[dict]:
+    """Convert `requires_dist` strings to dependency dicts in the Libraries.io format."""
+    return [
+        {
+            "name": req.name,
+            "kind": req.kind,
+            "optional": req.extra is not None,
+            "requirements": req.specifier_str or "*",
+            "marker": req.marker,
+        }
+        for req in parse_requirements(requires_dist)
+    ]
+
+def fetch_dependencies_pypi(pkg_name, timeout=5) -> list[dict]:
     """Returns list of dicts matching the format of the Libraries.io API response.
     
     When unreported in setup.py or pyproject.toml, some optional dependencies may be
     missing for project with extra configurations (such as the deprecated gym[atari]).
     """
     try:
-        res = requests.get(f"https://pypi.org/pypi/{pkg_name}/json", timeout=5)
+        res = client.get(f"{PYPI_URL}/pypi/{pkg_name}/json", timeout=timeout)
         if res.status_code != 200:
+            print(f"Failed to fetch {pkg_name} from PyPI: status {res.status_code}")
             return []
 
         raw_deps = res.json().get("info", {}).get("requires_dist", [])
         if raw_deps is None:
             return []
-        
-        deps = []
-
-        for dep in raw_deps:
-            if not dep:
-                continue
-
-            name_match = re.match(r"^([a-zA-Z0-9_.\-]+)", dep)
-            if not name_match:
-                continue
-
-            name = name_match.group(1).lower()
-            match = re.search(r'extra\s*==\s*"([^"]+)"', dep, re.IGNORECASE)
-            kind = f'extra == "{match.group(1)}"' if match else "runtime"
-            optional = bool(match)
-
-            deps.append({
-                "name": name,
-                "kind": kind,
-                "optional": optional
-            })
 
-        return deps
+        return requires_dist_dependencies(raw_deps)
 
     except Exception as e:
         print(f"PyPI fallback failed for {pkg_name}: {e}")
@@ -0,0 +1,67 @@
+import time
+import threading
+from urllib.parse import urlsplit
+
+# Requests per second and burst size per host. Libraries.io allows 60 requests
+# per minute per API key; PyPI has no published limit but asks clients to be polite.
+DEFAULT_RATES = {
+    "libraries.io": (1.0, 1),
+    "pypi.org": (20.0, 20),
+}
+
+class TokenBucket:
+    """Thread-safe token bucket refilling at `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> float:
+        """Take `tokens` from the bucket, sleeping until they are available.
+
+        Tokens are reserved under the lock (the balance may go negative), so concurrent
+        callers queue up behind each other instead of waking at the same time.
+        Returns the number of seconds spent waiting.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def host_of(url_or_host: str) -> str:
+    """Return the lowercase host for a URL, or the argument itself if it is already a host."""
+    if "://" in url_or_host:
+        return (urlsplit(url_or_host).hostname or "").lower()
+    return url_or_host.lower()
+
+def set_rate_limit(host: str, rate: float, capacity: float = None):
+    """Replace the token bucket used for `host`."""
+    with _buckets_lock:
+        _buckets[host_of(host)] = TokenBucket(rate, capacity)
+
+def get_bucket(host: str) -> TokenBucket | None:
+    """Return the bucket for `host`, creating it from DEFAULT_RATES on first use."""
+    host = host_of(host)
+    with _buckets_lock:
+        if host not in _buckets and host in DEFAULT_RATES:
+            _buckets[host] = TokenBucket(*DEFAULT_RATES[host])
+        return _buckets.get(host)
+
+def acquire(url_or_host: str) -> float:
+    """Wait for a request slot on the URL's host. Hosts without a limit return immediately."""
+    bucket = get_bucket(url_or_host)
+    return bucket.acquire() if bucket is not None else 0.0
@@ -0,0 +1,328 @@
+import os
+import json
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+
+from data.cleaning import dependency_names
+from data.requirements import normalize_name
+from data.store import PackageStore, GRAPH_PACKAGE_COLUMNS
+from data.name_similarity import set_typosquat_features
+
+RAW_DATA_DIR = Path("data/raw/packages")
+SOURCERANK_DIR = Path("data/raw/sourcerank")
+
+def load_json_file(file_path: Path) -> dict:
+    """Load a JSON file and handle errors."""
+    if not file_path.exists():
+        print(f"Warning: Missing file {file_path}")
+        return {}
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        print(f"Warning: Failed to decode {file_path}")
+        return {}
+
+def package_file(package_name: str) -> Path:
+    """Raw package JSON of a project, named by its PEP 503 normalized name."""
+    return RAW_DATA_DIR / f"{normalize_name(package_name)}.json"
+
+def sourcerank_file(package_name: str) -> Path:
+    return SOURCERANK_DIR / f"{normalize_name(package_name)}_sourcerank.json"
+
+def rename_raw_files() -> int:
+    """Rename raw files saved under unnormalized names (e.g. `thds.core.json`); return the count.
+
+    Files whose normalized name is already taken are left in place with a warning.
+    """
+    renamed = 0
+    for directory, suffix in ((RAW_DATA_DIR, ".json"), (SOURCERANK_DIR, "_sourcerank.json")):
+        for path in list(directory.glob(f"*{suffix}")):
+            target = directory / f"{normalize_name(path.name[:-len(suffix)])}{suffix}"
+            if target == path:
+                continue
+            if target.exists():
+                print(f"Warning: Not renaming {path}, {target.name} already exists")
+                continue
+            path.rename(target)
+            renamed += 1
+    return renamed
+
+def load_sourcerank_data(package_name: str) -> dict:
+    """Load the SourceRank JSON for a given package."""
+    return load_json_file(sourcerank_file(package_name))
+
+def metadata_files(package_names: list[str] = None) -> list[Path]:
+    """Raw package JSON files of `package_names`, or of every package in RAW_DATA_DIR."""
+    if package_names is None:
+        return list(RAW_DATA_DIR.glob("*.json"))
+    return list(dict.fromkeys(package_file(name) for name in package_names))
+
+def load_metadata(package_names: list[str] = None) -> dict:
+    """Load package metadata JSONs, optionally for a subset of projects."""
+    return load_metadata_files(metadata_files(package_names))
+
+def load_metadata_files(files) -> dict:
+    """Load package metadata JSONs and merge in their SourceRank data."""
+    all_data = {}
+    for file_path in files:
+        data = load_json_file(file_path)
+        if data:
+            name = normalize_name(data.get("name", ""))
+            sourcerank_data = load_sourcerank_data(name)
+            if "stars" in sourcerank_data:
+                sourcerank_data["stars_sr"] = sourcerank_data.pop("stars")
+            data.update(sourcerank_data)
+            data["sourcerank_missing"] = (sourcerank_data == {})
+            all_data[name] = data
+
+    return all_data
+
+def load_metadata_from_store(store: PackageStore, package_names: list[str] = None) -> tuple[dict, dict]:
+    """Bulk-read core metadata and their dependencies' metadata from the package store."""
+    metadata = store.read_metadata(package_names, columns=GRAPH_PACKAGE_COLUMNS)
+    deps = set()
+    for meta in metadata.values():
+        deps |= dependency_names(meta)
+    deps -= set(metadata)
+
+    # Dependencies without a record map to {} so they are not looked up on disk
+    found = store.read_packages(deps, columns=GRAPH_PACKAGE_COLUMNS)
+    dependency_metadata = {name: found.get(name, {}) for name in deps}
+    return metadata, dependency_metadata
+
+def node_attributes(meta: dict, is_core: bool = False) -> dict:
+    """Build the attribute record of a package node from its metadata."""
+    license = meta.get("normalized_licenses", ["Unknown"])[0] if meta.get("normalized_licenses") else "Unknown"
+    missing_metadata = (
+        meta.get("rank") is None or
+        meta.get("stars") is None or
+        meta.get("forks") is None or
+        meta.get("normalized_licenses") is None
+    )
+
+    repo_url = meta.get("repository_url", "Unknown")
+    if not repo_url:  # Check for empty string
+        repo_url = "Unknown"
+
+    return dict(SourceRank=meta.get("rank", 0),
+                stars=meta.get("stars", 0),
+                forks=meta.get("forks", 0),
+                license=license,
+                latest_release=meta.get("latest_release_published_at", "Unknown"),
+                num_optional_deps=len(meta.get("optional_dependencies", [])),
+                repo_url=repo_url,
+                has_repo=bool(repo_url and repo_url != "Unknown"),
+                has_funding=bool(meta.get("funding_urls")),
+                num_keywords=len(meta.get("keywords", [])),
+                missing_metadata=missing_metadata,
+                is_core=is_core,
+                sourcerank_missing=meta.get('sourcerank_missing', True),
+                # Add SourceRank data
+                basic_info_present=meta.get("basic_info_present", 0),
+                repository_present=meta.get("repository_present", 0),
+                readme_present=meta.get("readme_present", 0),
+                license_present=meta.get("license_present", 0),
+                versions_present=meta.get("versions_present", 0),
+                follows_semver=meta.get("follows_semver", 0),
+                recent_release=meta.get("recent_release", 0),
+                not_brand_new=meta.get("not_brand_new", 0),
+                one_point_oh=meta.get("one_point_oh", 0),
+                dependent_projects=meta.get("dependent_projects", 0),
+                dependent_repositories=meta.get("dependent_repositories", 0),
+                contributors=meta.get("contributors", 0),
+                subscribers=meta.get("subscribers", 0),
+                all_prereleases=meta.get("all_prereleases", 0),
+                any_outdated_dependencies=meta.get("any_outdated_dependencies", 0),
+                is_deprecated=meta.get("is_deprecated", 0),
+                is_unmaintained=meta.get("is_unmaintained", 0),
+                is_removed=meta.get("is_removed", 0),
+                is_copycat=False,  # Default to False
+                is_typosquat_candidate=False,  # Set by set_typosquat_features
+                )
+
+def add_node_with_metadata(G: nx.DiGraph, pkg_name: str, meta: dict, is_core: bool = False, repo_url_count: dict = None):
+    """Helper function to add a node with metadata to the graph."""
+    attrs = node_attributes(meta, is_core)
+
+    # Count occurrences of each repo_url only for core nodes
+    if is_core and repo_url_count is not None:
+        repo_url = attrs["repo_url"]
+        repo_url_count[repo_url] = repo_url_count.get(repo_url, 0) + 1
+
+    G.add_node(pkg_name, **attrs)
+
+def dependency_edges(meta: dict):
+    """Yield `(dep_name, kind, optional)` for each dependency edge of a package."""
+    # Runtime dependencies
+    for dep_name in meta.get("runtime_dependencies", []):
+        dep_name = normalize_name(dep_name.strip())
+        if dep_name:
+            yield dep_name, "runtime", False
+
+    # Optional dependencies, stored as "extra:name"
+    for dep_entry in meta.get("optional_dependencies", []):
+        kind = "unspecified"
+        if ":" in dep_entry:
+            kind, dep_name = dep_entry.split(":", 1)
+        else:
+            dep_name = dep_entry
+        dep_name = normalize_name(dep_name.strip())
+        if dep_name:
+            yield dep_name, kind, True
+
+def requirement_edge_attributes(entries) -> dict:
+    """Specifier and marker for an edge from a dependency's requirement entries.
+
+    clean_metadata keeps every `{specifier, marker}` pair a dependency is listed
+    with; an edge takes the pair without a marker when there is one (the
+    requirement that always applies), else the first. Records written before the
+    pairs were kept hold a single dict.
+    """
+    if isinstance(entries, dict):
+        return entries
+    if not entries:
+        return {}
+    return next((attrs for attrs in entries if "marker" not in attrs), entries[0])
+
+def dependency_edge_attributes(meta: dict):
+    """Yield `(dep_name, attrs)` for each dependency edge.
+
+    Besides `kind` and `optional`, edges get the requirement's `specifier` and
+    `marker` when clean_metadata recorded them (see requirement_edge_attributes).
+    """
+    requirements = meta.get("dependency_requirements") or {}
+    for dep_name, kind, optional in dependency_edges(meta):
+        attrs = {"kind": kind, "optional": optional}
+        if requirements:
+            attrs.update(requirement_edge_attributes(
+                requirements.get(f"{kind}:{dep_name}" if optional else dep_name)))
+        yield dep_name, attrs
+
+def set_copycat_flags(G: nx.DiGraph):
+    """Recompute `is_copycat` for every node from the repo URLs of the core nodes."""
+    repo_url_count = {}
+    for _, data in G.nodes(data=True):
+        if data.get("is_core"):
+            repo_url = data["repo_url"]
+            repo_url_count[repo_url] = repo_url_count.get(repo_url, 0) + 1
+
+    for _, data in G.nodes(data=True):
+        repo_url = data["repo_url"]
+        data["is_copycat"] = repo_url != "Unknown" and repo_url_count.get(repo_url, 0) > 1
+
+def get_metadata(name: str, all_data: dict) -> dict:
+    """Retrieve metadata for a package, loading it if necessary."""
+    if name not in all_data:
+        file_path = package_file(name)
+        if file_path.exists():
+            try:
+                with open(file_path, encoding="utf-8") as f:
+                    data = json.load(f)
+                    all_data[name] = data
+            except json.JSONDecodeError:
+                print(f"Warning: Failed to decode {file_path}")
+    return all_data.get(name, {})
+
+def build_dependency_graph(metadata_dict: dict, dependency_metadata: dict = None,
+                           popular: list[str] = None) -> nx.DiGraph:
+    """Build a dependency graph from metadata.
+
+    The unique node set is resolved first so every node's attribute record is built
+    exactly once, then nodes and edges are added in bulk. `dependency_metadata`
+    optionally supplies preloaded metadata for non-core dependencies; any others
+    are read from RAW_DATA_DIR on demand. Typosquat features are computed against
+    the `popular` package names (by default the most depended-on nodes).
+    """
+    all_data = {**(dependency_metadata or {}), **metadata_dict}
+    core_packages = set(metadata_dict.keys())
+
+    # Resolve all edges, then the nodes in first-seen order (core packages first)
+    edges = [
+        (pkg_name, dep_name, attrs)
+        for pkg_name, meta in metadata_dict.items()
+        for dep_name, attrs in dependency_edge_attributes(meta)
+    ]
+    node_names = dict.fromkeys(metadata_dict)
+    node_names.update(dict.fromkeys(dep_name for _, dep_name, _ in edges))
+
+    nodes = {
+        name: node_attributes(
+            metadata_dict[name] if name in core_packages else get_metadata(name, all_data),
+            is_core=name in core_packages)
+        for name in node_names
+    }
+    return _assemble_graph(nodes, edges, core_packages, popular)
+
+def _assemble_graph(nodes: dict, edges: list, core_packages: set, popular=None) -> nx.DiGraph:
+    """Create the graph from node attribute records and edges, then set the global flags."""
+    # Set is_copycat: repo URLs shared by more than one core package
+    repo_url_count = Counter(nodes[name]["repo_url"] for name in core_packages)
+    for attrs in nodes.values():
+        repo_url = attrs["repo_url"]
+        if repo_url != "Unknown" and repo_url_count[repo_url] > 1:
+            attrs["is_copycat"] = True
+
+    G = nx.DiGraph()
+    G.add_nodes_from(nodes.items())
+    G.add_edges_from(edges)
+    G.graph["num_core_packages"] = len(core_packages)
+    set_typosquat_features(G, popular)
+    return G
+
+def _set_raw_dirs(raw_data_dir, sourcerank_dir):
+    # Workers may be spawned rather than forked, so overridden directories are passed along
+    global RAW_DATA_DIR, SOURCERANK_DIR
+    RAW_DATA_DIR, SOURCERANK_DIR = raw_data_dir, sourcerank_dir
+
+def _core_shard(files: list[Path]) -> tuple[dict, list]:
+    """Parse a shard of core package files into node records and edges."""
+    metadata = load_metadata_files(files)
+    nodes = {name: node_attributes(meta, is_core=True) for name, meta in metadata.items()}
+    edges = [
+        (pkg_name, dep_name, attrs)
+        for pkg_name, meta in metadata.items()
+        for dep_name, attrs in dependency_edge_attributes(meta)
+    ]
+    return nodes, edges
+
+def _dependency_shard(names: list[str]) -> list[tuple[str, dict]]:
+    """Parse a shard of (non-core) dependency files into node records."""
+    return [(name, node_attributes(get_metadata(name, {}), is_core=False)) for name in names]
+
+def _shards(items: list, n_shards: int) -> list[list]:
+    """Split `items` into at most `n_shards` contiguous, order-preserving slices."""
+    size = -(-len(items) // max(n_shards, 1))
+    return [items[i:i + size] for i in range(0, len(items), size)] if items else []
+
+def build_dependency_graph_parallel(package_names: list[str] = None, n_jobs: int = None,
+                                    shards_per_job: int = 4, popular: list[str] = None) -> nx.DiGraph:
+    """Load the raw records and build the dependency graph in a process pool.
+
+    The package files are split into contiguous shards that workers parse into node
+    records and edges; the dependency nodes that are not core packages are then
+    loaded the same way. The parent merges the shards in order and resolves
+    `is_copycat` (and the typosquat features) globally, so the result equals
+    `build_dependency_graph(load_metadata(package_names))`.
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    files = metadata_files(package_names)
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_set_raw_dirs,
+                             initargs=(RAW_DATA_DIR, SOURCERANK_DIR)) as pool:
+        nodes = {}
+        edges = []
+        for shard_nodes, shard_edges in pool.map(_core_shard, _shards(files, n_jobs * shards_per_job)):
+            nodes.update(shard_nodes)
+            edges.extend(shard_edges)
+        core_packages = set(nodes)
+
+        # Dependencies in first-seen edge order, as build_dependency_graph adds them
+        dependencies = list(dict.fromkeys(dep for _, dep, _ in edges if dep not in core_packages))
+        for shard in pool.map(_dependency_shard, _shards(dependencies, n_jobs * shards_per_job)):
+            nodes.update(shard)
+
+    return _assemble_graph(nodes, edges, core_packages, popular)
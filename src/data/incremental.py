@@ -0,0 +1,181 @@
+import os
+import json
+from pathlib import Path
+
+import networkx as nx
+
+from data.store import PackageStore, GRAPH_PACKAGE_COLUMNS
+from data.graph import (
+    RAW_DATA_DIR,
+    package_file,
+    sourcerank_file,
+    load_metadata,
+    load_metadata_from_store,
+    node_attributes,
+    dependency_edge_attributes,
+    get_metadata,
+    set_copycat_flags,
+)
+from data.name_similarity import set_typosquat_features
+from data.requirements import normalize_name
+
+MANIFEST_VERSION = 1
+
+def file_signature(path: Path) -> list | None:
+    """Return `[mtime_ns, size]` for a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def record_signatures(names, store: PackageStore = None) -> dict[str, list]:
+    """Return `{name: [package_signature, sourcerank_signature]}` for the raw records of `names`.
+
+    For raw JSON files a signature is the file's mtime and size; for the package
+    store it is the record's last write time. Missing records have a None signature.
+    """
+    names = list(names)
+    if store is not None:
+        packages = store.updated_at(names, "packages")
+        sourcerank = store.updated_at(names, "sourcerank")
+        return {n: [packages.get(n), sourcerank.get(n)] for n in names}
+
+    return {
+        n: [file_signature(package_file(n)), file_signature(sourcerank_file(n))]
+        for n in names
+    }
+
+def list_core_names(store: PackageStore = None) -> list[str]:
+    """Return every package with a raw record (the core set when no list is given)."""
+    if store is not None:
+        return store.names()
+    return [normalize_name(p.stem) for p in RAW_DATA_DIR.glob("*.json")]
+
+def make_manifest(G: nx.DiGraph, core: set[str], store: PackageStore = None) -> dict:
+    """Describe the raw records a graph was built from."""
+    return {
+        "version": MANIFEST_VERSION,
+        "source": "store" if store is not None else "json",
+        "core": sorted(core),
+        "records": record_signatures(G.nodes, store),
+    }
+
+def load_manifest(path: Path) -> dict | None:
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        print(f"Warning: Ignoring manifest {path} with unsupported version")
+        return None
+    return manifest
+
+def save_manifest(manifest: dict, path: Path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+def _set_node(G: nx.DiGraph, name: str, attrs: dict):
+    if name in G:
+        data = G.nodes[name]
+        data.clear()
+        data.update(attrs)
+    else:
+        G.add_node(name, **attrs)
+
+def _dependency_metadata(names, store: PackageStore = None) -> dict:
+    """Metadata used for nodes that are only dependencies (no SourceRank merge)."""
+    if store is not None:
+        found = store.read_packages(names, columns=GRAPH_PACKAGE_COLUMNS)
+        return {n: found.get(n, {}) for n in names}
+    all_data = {}
+    return {n: get_metadata(n, all_data) for n in names}
+
+def update_dependency_graph(G: nx.DiGraph, manifest: dict, package_names=None,
+                            store: PackageStore = None, popular: list[str] = None) -> tuple[nx.DiGraph, dict, dict]:
+    """Bring a graph built by build_dependency_graph up to date with the raw records.
+
+    Only records whose signature differs from `manifest` are re-read: changed or new
+    core packages get their node and out-edges rebuilt, changed dependency nodes get
+    their attributes refreshed, and core packages that disappeared lose their edges
+    (and their node, if nothing else depends on it). Dependency nodes left without
+    dependents are dropped, and `is_copycat` and the typosquat features (against
+    `popular`) are recomputed over the whole graph.
+
+    Returns the updated graph (modified in place), its new manifest and a summary of
+    what changed.
+    """
+    if package_names is None:
+        package_names = list_core_names(store)
+    requested = {normalize_name(n) for n in package_names}
+
+    non_core_nodes = {n for n, is_core in G.nodes(data="is_core") if not is_core}
+    sigs = record_signatures(requested | non_core_nodes, store)
+    old_sigs = manifest["records"]
+    changed = {n for n, sig in sigs.items() if sig != old_sigs.get(n)}
+
+    old_core = set(manifest["core"])
+    new_core = {n for n in requested if sigs[n][0] is not None}
+    dirty_core = (new_core & changed) | (new_core - old_core)
+    removed_core = old_core - new_core
+    changed_deps = (non_core_nodes & changed) - new_core
+
+    # Drop the out-edges of every core package that is re-read or gone
+    touched = set()
+    for name in dirty_core | removed_core:
+        if name in G:
+            touched.update(G.successors(name))
+            G.remove_edges_from(list(G.out_edges(name)))
+
+    # Re-read changed core packages
+    if store is not None:
+        metadata, all_data = load_metadata_from_store(store, dirty_core)
+    else:
+        metadata, all_data = load_metadata(dirty_core), {}
+    all_data.update(metadata)
+
+    for name, meta in metadata.items():
+        _set_node(G, name, node_attributes(meta, is_core=True))
+
+    for name, meta in metadata.items():
+        for dep_name, attrs in dependency_edge_attributes(meta):
+            if dep_name not in G:
+                dep_meta = all_data.get(dep_name)
+                if dep_meta is None:
+                    dep_meta = _dependency_metadata([dep_name], store)[dep_name]
+                G.add_node(dep_name, **node_attributes(dep_meta, is_core=dep_name in new_core))
+            G.add_edge(name, dep_name, **attrs)
+
+    # Former core packages and changed dependencies that are still dependencies
+    demoted = {n for n in removed_core | changed_deps if n in G and n not in new_core}
+    for name, meta in _dependency_metadata(demoted, store).items():
+        _set_node(G, name, node_attributes(meta, is_core=False))
+
+    # Remove dependency nodes that nothing depends on anymore
+    orphans = [
+        n for n in touched | removed_core
+        if n in G and n not in new_core and G.in_degree(n) == 0
+    ]
+    G.remove_nodes_from(orphans)
+
+    set_copycat_flags(G)
+    set_typosquat_features(G, popular)
+    G.graph["num_core_packages"] = len(new_core)
+
+    new_manifest = {
+        "version": MANIFEST_VERSION,
+        "source": "store" if store is not None else "json",
+        "core": sorted(new_core),
+        "records": {n: sigs[n] for n in G.nodes if n in sigs},
+    }
+    new_manifest["records"].update(
+        record_signatures([n for n in G.nodes if n not in sigs], store))
+
+    summary = {
+        "core_changed": len(dirty_core & old_core),
+        "core_added": len(new_core - old_core),
+        "core_removed": len(removed_core),
+        "dependencies_changed": len(changed_deps),
+        "nodes_removed": len(orphans),
+    }
+    return G, new_manifest, summary
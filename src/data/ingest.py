@@ -0,0 +1,130 @@
+import csv
+import json
+from pathlib import Path
+from datetime import datetime
+
+from data.cleaning import clean_metadata
+from data.requirements import normalize_name
+from data.fetch.pypi import requires_dist_dependencies
+from data.store import PackageStore
+
+BATCH_SIZE = 5000
+
+# Columns of bigquery-public-data.pypi.distribution_metadata used for ingestion
+DISTRIBUTION_COLUMNS = ["name", "version", "upload_time", "requires_dist"]
+
+def _timestamp(value) -> str | None:
+    """Upload time as an ISO 8601 string (BigQuery returns datetimes, exports may hold strings)."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _requires_dist(value) -> list[str]:
+    """`requires_dist` as a list; CSV exports hold it as a JSON array string."""
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        return json.loads(value) if value.startswith("[") else value.splitlines()
+    return list(value)
+
+def distribution_record(row: dict) -> dict:
+    """Turn a distribution_metadata row into a cleaned package record."""
+    meta = {
+        "name": row["name"],
+        "latest_release_number": row.get("version"),
+        "latest_release_published_at": _timestamp(row.get("upload_time")),
+        "dependencies": requires_dist_dependencies(_requires_dist(row.get("requires_dist"))),
+    }
+    clean = clean_metadata(meta)
+    # clean_metadata fills in licenses, which distribution_metadata does not have
+    clean.pop("licenses", None)
+    return clean
+
+def _export_rows(path: Path, columns=DISTRIBUTION_COLUMNS):
+    """Stream the rows of a Parquet, CSV or JSON Lines export as dicts."""
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=BATCH_SIZE, columns=columns):
+            yield from batch.to_pylist()
+    elif path.suffix == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+    elif path.suffix == ".jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        raise ValueError(f"Unsupported export format '{path.suffix}', expected .parquet, .csv or .jsonl")
+
+def _latest_uploads(rows) -> dict[str, str]:
+    """Latest upload time of each (PEP 503 normalized) project."""
+    latest = {}
+    for row in rows:
+        key = normalize_name(row["name"])
+        upload_time = _timestamp(row.get("upload_time")) or ""
+        if key not in latest or upload_time > latest[key]:
+            latest[key] = upload_time
+    return latest
+
+def read_distribution_export(path):
+    """Stream a Parquet, CSV or JSON Lines export of distribution_metadata, newest row per project.
+
+    Exports usually hold every release, so rows are reduced to the latest upload of
+    each (PEP 503 normalized) project, as the BigQuery query does. The file is read
+    twice: once for the upload times only, then again yielding the first row with
+    each project's latest upload, so only one timestamp per project is held in
+    memory.
+    """
+    path = Path(path)
+    latest = _latest_uploads(_export_rows(path, ["name", "upload_time"]))
+    for row in _export_rows(path):
+        key = normalize_name(row["name"])
+        if key in latest and (_timestamp(row.get("upload_time")) or "") == latest[key]:
+            del latest[key]
+            yield row
+
+def ingest_distributions(store: PackageStore, rows, names=None, merge=True,
+                         batch_size=BATCH_SIZE, progress=None) -> int:
+    """Write distribution rows into the package store in batches and return the count.
+
+    With `names`, only those projects are kept. With `merge`, fields of existing
+    records that distribution_metadata does not provide (stars, licenses, ...) are
+    kept and only the release and dependency fields are replaced.
+    """
+    wanted = None if names is None else {normalize_name(n) for n in names}
+    batch = []
+    written = 0
+
+    def flush():
+        nonlocal written
+        if not batch:
+            return
+        if merge:
+            existing = store.read_packages([record["name"] for record in batch])
+            for i, record in enumerate(batch):
+                key = normalize_name(record["name"])
+                if key in existing:
+                    batch[i] = {**existing[key], **record}
+        store.upsert_packages(batch)
+        written += len(batch)
+        if progress is not None:
+            progress(len(batch))
+        batch.clear()
+
+    for row in rows:
+        if wanted is not None and normalize_name(row["name"]) not in wanted:
+            continue
+        batch.append(distribution_record(row))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return written
+
+def query_distributions(names=None):
+    """Stream the newest distribution of each project from BigQuery."""
+    # Imported here so offline ingestion works without google-cloud-bigquery
+    from data.fetch.bigquery import iter_latest_distributions
+    return iter_latest_distributions(names)
@@ -3,8 +3,45 @@ import pickle
 import pandas as pd
 import networkx as nx
 
+from data.snapshot import GraphSnapshot, snapshot_path
+
+def print_graph_summary(G, graph_name, sample=5):
+    """Print counts and a few nodes and edges of a graph or GraphSnapshot."""
+    if isinstance(G, GraphSnapshot):
+        nodes = G.node_records(range(min(sample, G.number_of_nodes())))
+        edges = G.edge_records(range(min(sample, G.number_of_edges())))
+    else:
+        nodes = list(G.nodes(data=True))[:sample]
+        edges = list(G.edges(data=True))[:sample]
+
+    print(f"Graph '{graph_name}':")
+    print(f"  {G.number_of_nodes():,} nodes")
+    print(f"  {G.graph.get('num_core_packages', 'N/A')} core packages")
+    print(f"  {G.number_of_edges():,} dependencies")
+    print(f"  directed={G.is_directed()}")
+    print("\nSample node metadata:")
+    for node, data in nodes:
+        summary = ", ".join(f"{k}={v}" for k, v in list(data.items())[:3])
+        print(f"  {node}: {summary}")
+    print("\nSample edge metadata:")
+    for u, v, data in edges:
+        summary = ", ".join(f"{k}={v_}" for k, v_ in data.items())
+        print(f"  {u} -> {v}: {summary}")
+
 def load_and_verify_graph(graph_name, graph_dir, print_summary=True):
-    """Load a graph from a gpickle file and print its summary."""
+    """Load a saved graph and its edge list, printing a summary.
+
+    Reads the binary snapshot if there is one; the summary then comes from the
+    snapshot header and a few decoded rows. Graphs saved before snapshots are read
+    from their gpickle and edge CSV.
+    """
+    path = snapshot_path(graph_dir, graph_name)
+    if path.exists():
+        snapshot = GraphSnapshot(path)
+        if print_summary:
+            print_graph_summary(snapshot, graph_name)
+        return snapshot.to_networkx(), snapshot.edge_dataframe()
+
     gpickle_path = graph_dir / f"{graph_name}.gpickle"
     edges_path = graph_dir / f"{graph_name}_edges.csv"
 
@@ -13,57 +50,62 @@ def load_and_verify_graph(graph_name, graph_dir, print_summary=True):
     with open(gpickle_path, "rb") as f:
         G = pickle.load(f)
 
-    num_core_packages = G.graph.get("num_core_packages", "N/A")
-
-    # Print graph summary
     if print_summary:
-        print(f"Graph '{graph_name}':")
-        print(f"  {G.number_of_nodes():,} nodes")
-        print(f"  {num_core_packages} core packages")
-        print(f"  {G.number_of_edges():,} dependencies")
-        print(f"  directed={G.is_directed()}")
-        print("\nSample node metadata:")
-        for node, data in list(G.nodes(data=True))[:5]:
-            summary = ", ".join(f"{k}={v}" for k, v in list(data.items())[:3])
-            print(f"  {node}: {summary}")
-        print("\nSample edge metadata:")
-        for u, v, data in list(G.edges(data=True))[:5]:
-            summary = ", ".join(f"{k}={v_}" for k, v_ in data.items())
-            print(f"  {u} -> {v}: {summary}")
-    
+        print_graph_summary(G, graph_name)
+
     return G, df_edges
 
+def merge_graph_snapshots(graphs: dict, core_attr="is_core", snapshot_attr="snapshots") -> nx.DiGraph:
+    """Merge any number of graph snapshots into one graph in a single pass.
+
+    `graphs` maps a snapshot label (e.g. "graph_top_n500_20250729") to its graph, in
+    priority order: a node or edge takes its attributes from the first snapshot that
+    contains it. Every node gets `snapshot_attr`, the list of labels it appears in,
+    and `core_attr` is OR-ed across the snapshots that set it (nodes without it in
+    any snapshot are left without it). Inputs are not modified; attribute
+    dicts are copied shallowly, as in G.copy().
+    """
+    nodes = {}
+    edges = {}
+    for label, G in graphs.items():
+        for node, data in G.nodes(data=True):
+            merged = nodes.get(node)
+            if merged is None:
+                merged = nodes[node] = dict(data)
+                merged[snapshot_attr] = []
+            merged[snapshot_attr].append(label)
+            if core_attr in data:
+                merged[core_attr] = bool(merged.get(core_attr) or data[core_attr])
+
+        for u, v, data in G.edges(data=True):
+            if (u, v) not in edges:
+                edges[(u, v)] = data
+
+    G_merged = nx.DiGraph()
+    if graphs:
+        G_merged.graph.update(next(iter(graphs.values())).graph)
+    G_merged.graph[snapshot_attr] = list(graphs)
+    G_merged.add_nodes_from(nodes.items())
+    G_merged.add_edges_from((u, v, dict(data)) for (u, v), data in edges.items())
+    return G_merged
+
 def merge_top_and_recent_graphs(G_top, G_recent):
-    # Create a copy of G_top to avoid modifying the original
-    G_merged = G_top.copy()
-
-    # Set is_recent=False for all nodes in G_merged (from G_top)
-    nx.set_node_attributes(G_merged, False, "is_recent")
-
-    # Ensure 'core' is correct for all nodes in G_merged (from G_top)
-    for node in G_merged.nodes:
-        # If node is in G_recent, set 'core' to True if either graph has core True
-        if node in G_recent:
-            core_top = G_merged.nodes[node].get("core", False)
-            core_recent = G_recent.nodes[node].get("core", False)
-            G_merged.nodes[node]["core"] = bool(core_top or core_recent)
-
-    # Add nodes from G_recent, setting is_recent=True for those not already present
-    for node, data in G_recent.nodes(data=True):
-        if node not in G_merged:
-            G_merged.add_node(node, **data)
-            
-        # Set is_recent for all nodes from G_recent
-        G_merged.nodes[node]["is_recent"] = True
-
-        # Set core to True if either graph has core=True
-        core_merged = G_merged.nodes[node].get("core", False)
-        core_recent = data.get("core", False)
-        G_merged.nodes[node]["core"] = bool(core_merged or core_recent)
-
-    # Add edges from G_recent that are not already in G_merged
-    for u, v, data in G_recent.edges(data=True):
-        if not G_merged.has_edge(u, v):
-            G_merged.add_edge(u, v, **data)
+    """Merge a top and a recent snapshot, flagging nodes of the recent one with is_recent.
 
+    Nodes of the recent snapshot always get `core`; nodes only in the top one keep
+    theirs as is.
+    """
+    G_merged = merge_graph_snapshots({"top": G_top, "recent": G_recent}, core_attr="core")
+    for _, data in G_merged.nodes(data=True):
+        data["is_recent"] = "recent" in data.pop("snapshots")
+        if data["is_recent"]:
+            data.setdefault("core", False)
+    del G_merged.graph["snapshots"]
     return G_merged
+
+def load_graph_snapshots(graph_dir, names, print_summary=False) -> dict:
+    """Load several saved graphs as `{name: G}`, ready for merge_graph_snapshots."""
+    return {
+        name: load_and_verify_graph(name, graph_dir, print_summary=print_summary)[0]
+        for name in names
+    }
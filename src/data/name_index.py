@@ -0,0 +1,123 @@
+import os
+import json
+from pathlib import Path
+from datetime import datetime, timezone
+
+from data.fetch.pypi import stream_package_index, fetch_changelog_since
+from data.requirements import normalize_name
+
+NAMES_FILE = Path("data/pypi_package_names.txt")
+
+# Changelog actions that add or drop a whole project (not a single release or file)
+CREATE_ACTIONS = {"create"}
+REMOVE_ACTIONS = {"remove project"}
+
+def state_path(names_path) -> Path:
+    """Sync state (last PyPI serial, name count) stored next to the names file."""
+    names_path = Path(names_path)
+    return names_path.with_name(names_path.stem + "_state.json")
+
+def load_state(names_path) -> dict | None:
+    path = state_path(names_path)
+    if not path.exists() or not Path(names_path).exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _save_state(names_path, serial: int | None, count: int, mode: str):
+    state = {
+        "serial": serial,
+        "count": count,
+        "mode": mode,
+        "synced_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(state_path(names_path), "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    return state
+
+def read_names(names_path=NAMES_FILE):
+    """Yield the synced package names one at a time."""
+    with open(names_path, encoding="utf-8") as f:
+        for line in f:
+            if line := line.rstrip("\n"):
+                yield line
+
+def full_sync(names_path=NAMES_FILE, fixture=None, timeout=60) -> dict:
+    """Stream the whole PEP 691 project list into `names_path`, one name per line.
+
+    Names are written as they are parsed, so memory stays constant regardless of
+    the index size. The file is replaced atomically once the listing is complete.
+    """
+    names_path = Path(names_path)
+    names_path.parent.mkdir(parents=True, exist_ok=True)
+    serial, projects = stream_package_index(timeout=timeout, fixture=fixture)
+
+    tmp = names_path.with_suffix(names_path.suffix + ".tmp")
+    count = 0
+    max_serial = None
+    with open(tmp, "w", encoding="utf-8") as f:
+        for name, last_serial in projects:
+            f.write(normalize_name(name) + "\n")
+            count += 1
+            if last_serial is not None and (max_serial is None or last_serial > max_serial):
+                max_serial = last_serial
+    os.replace(tmp, names_path)
+
+    # Fixtures have no serial header; the newest project serial is the next best thing
+    return _save_state(names_path, serial if serial is not None else max_serial, count, "full")
+
+def _project_changes(events) -> tuple[int | None, dict]:
+    """Reduce changelog events to `{name: exists}` for projects created or removed."""
+    changes = {}
+    serial = None
+    for name, _, _, action, event_serial in sorted(events, key=lambda e: e[4]):
+        serial = event_serial
+        if action in CREATE_ACTIONS:
+            changes[normalize_name(name)] = True
+        elif action in REMOVE_ACTIONS:
+            changes[normalize_name(name)] = False
+    return serial, changes
+
+def incremental_sync(names_path=NAMES_FILE, state=None, fixture=None) -> dict:
+    """Apply the changelog since the last synced serial to `names_path`.
+
+    The existing file is streamed into a new one, dropping removed projects and
+    appending created ones, so only the changes are downloaded.
+    """
+    names_path = Path(names_path)
+    state = state or load_state(names_path)
+    serial, changes = _project_changes(fetch_changelog_since(state["serial"], fixture=fixture))
+    if serial is None:
+        return _save_state(names_path, state["serial"], state["count"], "incremental")
+
+    tmp = names_path.with_suffix(names_path.suffix + ".tmp")
+    count = 0
+    with open(tmp, "w", encoding="utf-8") as f:
+        for name in read_names(names_path):
+            if name in changes:
+                continue
+            f.write(name + "\n")
+            count += 1
+        for name, exists in sorted(changes.items()):
+            if exists:
+                f.write(name + "\n")
+                count += 1
+    os.replace(tmp, names_path)
+    return _save_state(names_path, serial, count, "incremental")
+
+def sync_package_names(names_path=NAMES_FILE, full=False, index_fixture=None,
+                       changelog_fixture=None, timeout=60) -> dict:
+    """Bring `names_path` up to date with PyPI and return the new sync state.
+
+    Runs a full listing the first time (or with `full`), otherwise applies only the
+    changelog since the stored serial. If the changelog cannot be fetched, falls
+    back to a full listing.
+    """
+    state = None if full else load_state(names_path)
+    if state is None or state.get("serial") is None:
+        return full_sync(names_path, fixture=index_fixture, timeout=timeout)
+    try:
+        return incremental_sync(names_path, state, fixture=changelog_fixture)
+    except Exception as e:
+        print(f"Warning: changelog sync failed ({e}), falling back to a full listing")
+        return full_sync(names_path, fixture=index_fixture, timeout=timeout)
@@ -0,0 +1,160 @@
+import numpy as np
+
+from data.requirements import normalize_name
+
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+# Names shorter than this are skipped as typosquat candidates: almost every two- or
+# three-letter name is close to some popular one
+MIN_NAME_LENGTH = 4
+# Names shorter than this are only matched at distance 1, as two edits turn most
+# short names into some other popular name
+LONG_NAME_LENGTH = 8
+
+def edit_distance(a: str, b: str, max_distance: int = MAX_DISTANCE) -> int:
+    """Optimal string alignment distance (Levenshtein plus adjacent transpositions).
+
+    Only the diagonal band of width `max_distance` is computed and the result is
+    capped at `max_distance + 1`, which is returned as soon as it is certain.
+    """
+    if a == b:
+        return 0
+    n, m = len(a), len(b)
+    k = max_distance
+    if abs(n - m) > k:
+        return k + 1
+
+    over = k + 1
+    prev2 = None
+    prev = [j if j <= k else over for j in range(m + 1)]
+    for i in range(1, n + 1):
+        cur = [over] * (m + 1)
+        if i <= k:
+            cur[0] = i
+        ca = a[i - 1]
+        row_min = cur[0]
+        for j in range(max(1, i - k), min(m, i + k) + 1):
+            value = prev[j - 1] + (ca != b[j - 1])
+            if prev[j] + 1 < value:
+                value = prev[j] + 1
+            if cur[j - 1] + 1 < value:
+                value = cur[j - 1] + 1
+            if prev2 is not None and j > 1 and ca == b[j - 2] and a[i - 2] == b[j - 1] and prev2[j - 2] + 1 < value:
+                value = prev2[j - 2] + 1
+            cur[j] = value if value < over else over
+            if value < row_min:
+                row_min = value
+        if row_min > k:
+            return over
+        prev2, prev = prev, cur
+    return prev[m]
+
+def deletes(word: str, max_distance: int) -> set[str]:
+    """All strings obtained by deleting up to `max_distance` characters from `word`."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - variants
+        variants |= frontier
+    return variants
+
+class NameIndex:
+    """Symmetric-delete (SymSpell) index for finding names within a small edit distance.
+
+    Every name contributes the deletion variants of its first `prefix_length`
+    characters. Two names within distance k share at least one such variant, so a
+    query only verifies the names found under its own variants instead of scanning
+    the whole list. Variants are stored as sorted 64-bit hashes next to name ids
+    (about 12 bytes each) rather than as strings in a dict, which keeps an index of
+    the full PyPI name list in a few hundred MB.
+
+    The hashes use Python's per-process salted `hash()`, so an index is rebuilt in
+    each process rather than saved.
+    """
+
+    def __init__(self, names, max_distance=MAX_DISTANCE, prefix_length=PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.names = list(dict.fromkeys(normalize_name(n) for n in names))
+
+        keys = []
+        ids = []
+        for i, name in enumerate(self.names):
+            variants = deletes(name[:prefix_length], max_distance)
+            keys.extend(map(hash, variants))
+            ids.extend([i] * len(variants))
+
+        keys = np.array(keys, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._ids = np.array(ids, dtype=np.int32)[order]
+
+    def __len__(self):
+        return len(self.names)
+
+    def _candidates(self, name: str) -> set[int]:
+        keys = np.fromiter(map(hash, deletes(name[:self.prefix_length], self.max_distance)), dtype=np.int64)
+        lo = np.searchsorted(self._keys, keys, side="left")
+        hi = np.searchsorted(self._keys, keys, side="right")
+        candidates = set()
+        for start, stop in zip(lo.tolist(), hi.tolist()):
+            if start != stop:
+                candidates.update(self._ids[start:stop].tolist())
+        return candidates
+
+    def query(self, name: str, max_distance: int = None) -> list[tuple[str, int]]:
+        """Return `(name, distance)` for every indexed name within `max_distance` of `name`.
+
+        Results are sorted by distance, then name. The query itself is included
+        (at distance 0) if it is indexed.
+        """
+        k = self.max_distance if max_distance is None else max_distance
+        if k > self.max_distance:
+            raise ValueError(f"Index was built for distances up to {self.max_distance}, got {k}")
+        name = normalize_name(name)
+
+        matches = []
+        for i in self._candidates(name):
+            candidate = self.names[i]
+            if abs(len(candidate) - len(name)) > k:
+                continue
+            distance = edit_distance(name, candidate, k)
+            if distance <= k:
+                matches.append((candidate, distance))
+        return sorted(matches, key=lambda m: (m[1], m[0]))
+
+    def nearest(self, name: str, max_distance: int = None) -> tuple[str | None, int | None]:
+        """Return the closest indexed name other than `name` itself, or `(None, None)`."""
+        for candidate, distance in self.query(name, max_distance):
+            if distance > 0:
+                return candidate, distance
+        return None, None
+
+def popular_names(G, n: int = 1000, attr: str = "dependent_projects") -> list[str]:
+    """The `n` nodes of `G` with the most dependents, a stand-in for a download ranking."""
+    ranked = sorted(G.nodes(data=attr), key=lambda item: (-(item[1] or 0), item[0]))
+    return [name for name, value in ranked[:n] if value]
+
+def set_typosquat_features(G, popular=None, max_distance: int = MAX_DISTANCE,
+                           min_length: int = MIN_NAME_LENGTH, index: NameIndex = None):
+    """Set the nearest-popular-name node attributes of every node in bulk.
+
+    `nearest_popular` is the closest popular name within `max_distance` (1 for
+    names shorter than LONG_NAME_LENGTH; empty if none), `nearest_popular_distance`
+    its distance (`max_distance + 1` if none) and `is_typosquat_candidate` flags
+    names that are close to, but not, a popular package. `popular` defaults to popular_names(G); pass a prebuilt `index` to
+    reuse it across graphs.
+    """
+    if index is None:
+        index = NameIndex(popular_names(G) if popular is None else popular, max_distance)
+    popular_set = set(index.names)
+
+    for name, data in G.nodes(data=True):
+        target, distance = None, None
+        if name not in popular_set and len(name) >= min_length:
+            k = max_distance if len(name) >= LONG_NAME_LENGTH else min(max_distance, 1)
+            target, distance = index.nearest(name, k)
+        data["nearest_popular"] = target or ""
+        data["nearest_popular_distance"] = distance if distance is not None else max_distance + 1
+        data["is_typosquat_candidate"] = target is not None
+    return index
@@ -0,0 +1,110 @@
+import re
+import sys
+from functools import lru_cache
+from typing import NamedTuple
+
+# PEP 508 name, optional [extras], then a version specifier or "@ url", then "; marker"
+REQUIREMENT_RE = re.compile(r"""
+    ^\s*(?P<name>[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)
+    \s*(?:\[(?P<extras>[^\]]*)\])?
+    \s*(?P<rest>[^;]*?)
+    \s*(?:;\s*(?P<marker>.*?))?\s*$
+""", re.VERBOSE)
+SPECIFIER_RE = re.compile(r"^\s*(~=|===|==|!=|<=|>=|<|>)\s*([^\s,;]+)\s*$")
+EXTRA_MARKER_RE = re.compile(r"""\bextra\s*==\s*(['"])([^'"]+)\1""")
+NAME_SEPARATORS_RE = re.compile(r"[-_.]+")
+
+class Requirement(NamedTuple):
+    """A parsed requirement string.
+
+    `name` is PEP 503 normalized and `specifier` holds `(operator, version)` pairs.
+    `extra` is the extra that pulls the requirement in (from an `extra == "..."`
+    marker), or None for runtime requirements.
+    """
+    name: str
+    extras: tuple
+    specifier: tuple
+    url: str | None
+    marker: str | None
+    extra: str | None
+
+    @property
+    def specifier_str(self) -> str:
+        return ",".join(op + version for op, version in self.specifier)
+
+    @property
+    def kind(self) -> str:
+        """Dependency kind in the format of the Libraries.io API."""
+        return f'extra == "{self.extra}"' if self.extra else "runtime"
+
+@lru_cache(maxsize=1 << 16)
+def normalize_name(name: str) -> str:
+    """Normalize a project name per PEP 503 (runs of -_. become -, lowercase)."""
+    return sys.intern(NAME_SEPARATORS_RE.sub("-", name).lower())
+
+def parse_specifier(text: str) -> tuple:
+    """Parse `>=1.0,<2` (optionally parenthesized) into `((">=", "1.0"), ("<", "2"))`.
+
+    Clauses that are not valid PEP 440 specifiers are dropped.
+    """
+    text = text.strip()
+    if text.startswith("(") and text.endswith(")"):
+        text = text[1:-1]
+    pairs = []
+    for clause in text.split(","):
+        match = SPECIFIER_RE.match(clause)
+        if match:
+            pairs.append((sys.intern(match.group(1)), sys.intern(match.group(2))))
+    return tuple(pairs)
+
+@lru_cache(maxsize=1 << 18)
+def parse_requirement(text: str) -> Requirement | None:
+    """Parse one `requires_dist` string, or return None if it has no valid name.
+
+    Results are cached: the same requirement strings recur across most of the
+    index, so a bulk parse mostly hits the cache. Field strings are interned.
+    """
+    match = REQUIREMENT_RE.match(text)
+    if not match:
+        return None
+
+    extras = tuple(sorted(
+        sys.intern(e.strip().lower()) for e in (match.group("extras") or "").split(",") if e.strip()))
+
+    rest = match.group("rest")
+    url = None
+    specifier = ()
+    if rest.startswith("@"):
+        url = rest[1:].strip() or None
+    elif rest:
+        specifier = parse_specifier(rest)
+
+    marker = match.group("marker") or None
+    extra = None
+    if marker:
+        marker = sys.intern(" ".join(marker.split()))
+        extra_match = EXTRA_MARKER_RE.search(marker)
+        if extra_match:
+            extra = sys.intern(extra_match.group(2).lower())
+
+    return Requirement(normalize_name(match.group("name")), extras, specifier, url, marker, extra)
+
+def parse_requirements(texts) -> list[Requirement]:
+    """Parse many requirement strings, skipping empty and invalid ones."""
+    parsed = (parse_requirement(text) for text in texts if text)
+    return [req for req in parsed if req is not None]
+
+@lru_cache(maxsize=1 << 12)
+def parse_extra(kind: str) -> str | None:
+    """Return the extra named by a Libraries.io dependency kind like `extra == "test"`."""
+    match = EXTRA_MARKER_RE.search(kind)
+    return sys.intern(match.group(2).lower()) if match else None
+
+def requirement_attributes(specifier: str, marker: str | None = None) -> dict:
+    """Edge attributes for a requirement, leaving out unconstrained parts."""
+    attrs = {}
+    if specifier and specifier != "*":
+        attrs["specifier"] = specifier
+    if marker:
+        attrs["marker"] = marker
+    return attrs
@@ -0,0 +1,245 @@
+import os
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import networkx as nx
+
+from data.csr import CSRGraph, Column, ABSENT
+
+SNAPSHOT_FORMAT = "pypi-anomaly-graph"
+# Version 2 added the `ints` mask of mixed int/float columns
+SNAPSHOT_VERSION = 2
+SNAPSHOT_SUFFIX = ".snapshot"
+HEADER_FILE = "header.json"
+
+# Topology arrays of a snapshot, all int64 and in CSR edge order (see CSRGraph)
+TOPOLOGY_ARRAYS = ["src", "indices", "indptr", "in_indices", "in_indptr", "in_edge_ids"]
+
+def snapshot_path(graph_dir, name: str) -> Path:
+    return Path(graph_dir) / f"{name}{SNAPSHOT_SUFFIX}"
+
+def _json_value(value):
+    """JSON fallback for NumPy scalars; other non-JSON values are rejected rather than stringified."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} value {value!r} cannot be stored in a snapshot (not a JSON type)")
+
+def _save_array(directory: Path, name: str, array):
+    np.save(directory / f"{name}.npy", np.ascontiguousarray(array), allow_pickle=False)
+
+def _save_strings(directory: Path, name: str, strings):
+    """Store strings as one UTF-8 byte blob plus int64 offsets, so they can be memory-mapped."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    _save_array(directory, f"{name}.offsets", offsets)
+    _save_array(directory, f"{name}.blob", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+def _column_kind(col: Column) -> str:
+    if col.categories is not None:
+        return "category"
+    if col.values.dtype == object:
+        return "json"
+    return col.values.dtype.name
+
+def _save_column(directory: Path, prefix: str, col: Column) -> dict:
+    kind = _column_kind(col)
+    if kind == "json":
+        # Values without a native array type (lists, dicts, ...) are kept as JSON text
+        _save_strings(directory, f"{prefix}.values", [json.dumps(v, default=_json_value) for v in col.values.tolist()])
+    else:
+        _save_array(directory, f"{prefix}.values", col.values)
+    if kind == "category":
+        _save_strings(directory, f"{prefix}.categories", col.categories)
+    if col.absent is not None:
+        _save_array(directory, f"{prefix}.absent", col.absent)
+    if col.null is not None:
+        _save_array(directory, f"{prefix}.null", col.null)
+    if col.ints is not None:
+        _save_array(directory, f"{prefix}.ints", col.ints)
+    return {"file": prefix, "kind": kind, "absent": col.absent is not None, "null": col.null is not None,
+            "ints": col.ints is not None}
+
+def save_snapshot(graph, path) -> Path:
+    """Write a networkx DiGraph (or CSRGraph) as a versioned binary snapshot directory.
+
+    The snapshot holds one `.npy` file per topology array and attribute column, plus
+    a JSON header with the format version, counts, column layout and `G.graph`.
+    Strings are stored as UTF-8 blobs with offsets, so every file can be
+    memory-mapped. The directory is written next to `path` and swapped in at the end.
+
+    `load_snapshot` returns the same nodes, edges and attribute values, with two
+    coercions: tuples come back as lists and NumPy scalars as Python numbers. Graph
+    and attribute values that are not JSON types (datetimes, sets, ...) raise a
+    TypeError instead of being stored.
+    """
+    csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    try:
+        for name in TOPOLOGY_ARRAYS:
+            _save_array(tmp, name, getattr(csr, name).astype(np.int64, copy=False))
+        _save_strings(tmp, "names", csr.names)
+
+        header = {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "num_nodes": csr.number_of_nodes(),
+            "num_edges": csr.number_of_edges(),
+            "graph": csr.graph,
+            "node_columns": {k: _save_column(tmp, f"node{i}", col) for i, (k, col) in enumerate(csr.node_attrs.items())},
+            "edge_columns": {k: _save_column(tmp, f"edge{i}", col) for i, (k, col) in enumerate(csr.edge_attrs.items())},
+        }
+        with open(tmp / HEADER_FILE, "w", encoding="utf-8") as f:
+            json.dump(header, f, indent=2, default=_json_value)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    if path.exists():
+        old = path.with_name(path.name + ".old")
+        os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old)
+    else:
+        os.replace(tmp, path)
+    return path
+
+class GraphSnapshot:
+    """A saved graph snapshot, opened lazily.
+
+    Opening reads only the JSON header, so counts, `graph` attributes and column
+    names are available at once. Arrays are memory-mapped on first access and
+    cached; strings (node names, categories) are decoded only when asked for.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / HEADER_FILE, encoding="utf-8") as f:
+            self.header = json.load(f)
+        if self.header.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"{self.path} is not a graph snapshot")
+        if self.header["version"] > SNAPSHOT_VERSION:
+            raise ValueError(
+                f"{self.path} has snapshot version {self.header['version']}, "
+                f"this code reads up to {SNAPSHOT_VERSION}")
+        self._arrays = {}
+        self._names = None
+
+    @property
+    def graph(self) -> dict:
+        return self.header["graph"]
+
+    @property
+    def node_columns(self) -> list[str]:
+        return list(self.header["node_columns"])
+
+    @property
+    def edge_columns(self) -> list[str]:
+        return list(self.header["edge_columns"])
+
+    def is_directed(self) -> bool:
+        return True
+
+    def number_of_nodes(self) -> int:
+        return self.header["num_nodes"]
+
+    def number_of_edges(self) -> int:
+        return self.header["num_edges"]
+
+    def array(self, name: str) -> np.ndarray:
+        """Memory-map one stored array (e.g. "indptr" or "node0.values")."""
+        if name not in self._arrays:
+            self._arrays[name] = np.load(self.path / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+        return self._arrays[name]
+
+    def _strings(self, name: str) -> list[str]:
+        data = self.array(f"{name}.blob").tobytes()
+        bounds = self.array(f"{name}.offsets").tolist()
+        return [data[a:b].decode("utf-8") for a, b in zip(bounds[:-1], bounds[1:])]
+
+    @property
+    def names(self) -> list[str]:
+        if self._names is None:
+            self._names = self._strings("names")
+        return self._names
+
+    def _column(self, spec: dict) -> Column:
+        prefix = spec["file"]
+        categories = None
+        if spec["kind"] == "json":
+            values = np.empty(self.header["num_nodes" if prefix.startswith("node") else "num_edges"], dtype=object)
+            values[:] = [json.loads(v) for v in self._strings(f"{prefix}.values")]
+        else:
+            values = self.array(f"{prefix}.values")
+        if spec["kind"] == "category":
+            categories = self._strings(f"{prefix}.categories")
+        return Column(
+            values, categories,
+            self.array(f"{prefix}.absent") if spec["absent"] else None,
+            self.array(f"{prefix}.null") if spec["null"] else None,
+            self.array(f"{prefix}.ints") if spec.get("ints") else None)
+
+    def node_column(self, attr: str) -> Column:
+        return self._column(self.header["node_columns"][attr])
+
+    def edge_column(self, attr: str) -> Column:
+        """An edge attribute column in CSR edge order (aligned with `array("src")`)."""
+        return self._column(self.header["edge_columns"][attr])
+
+    def node_values(self, attr: str, decode: bool = False):
+        """Return a node attribute array (or, with `decode`, a list of Python values)."""
+        col = self.node_column(attr)
+        return col.decode() if decode else col.values
+
+    def node_records(self, idx) -> list[tuple[str, dict]]:
+        """`(name, attrs)` for the nodes at positions `idx`, decoding only those rows."""
+        idx = np.asarray(idx, dtype=np.int64)
+        cols = {k: self.node_column(k).take(idx).decode() for k in self.node_columns}
+        names = self.names
+        return [
+            (names[i], {k: vals[j] for k, vals in cols.items() if vals[j] is not ABSENT})
+            for j, i in enumerate(idx.tolist())]
+
+    def edge_records(self, idx) -> list[tuple[str, str, dict]]:
+        """`(source, target, attrs)` for the edges at CSR positions `idx`."""
+        idx = np.asarray(idx, dtype=np.int64)
+        cols = {k: self.edge_column(k).take(idx).decode() for k in self.edge_columns}
+        names, src, dst = self.names, self.array("src"), self.array("indices")
+        return [
+            (names[src[e]], names[dst[e]], {k: vals[j] for k, vals in cols.items() if vals[j] is not ABSENT})
+            for j, e in enumerate(idx.tolist())]
+
+    def to_csr(self, node_attrs=None, edge_attrs=None) -> CSRGraph:
+        """Return a CSRGraph over the memory-mapped arrays, optionally with only some columns."""
+        node_attrs = self.node_columns if node_attrs is None else node_attrs
+        edge_attrs = self.edge_columns if edge_attrs is None else edge_attrs
+        return CSRGraph.from_parts(
+            self.names, *(self.array(name) for name in TOPOLOGY_ARRAYS),
+            node_attrs={k: self.node_column(k) for k in node_attrs},
+            edge_attrs={k: self.edge_column(k) for k in edge_attrs},
+            graph_attrs=self.graph)
+
+    def to_networkx(self) -> nx.DiGraph:
+        return self.to_csr().to_networkx()
+
+    def edge_dataframe(self):
+        """Edge list as a DataFrame with `source`, `target` and the edge attributes."""
+        import pandas as pd
+        names = np.array(self.names, dtype=object)
+        df = pd.DataFrame({
+            "source": names[self.array("src")],
+            "target": names[self.array("indices")],
+        })
+        for attr in self.edge_columns:
+            df[attr] = [None if v is ABSENT else v for v in self.edge_column(attr).decode()]
+        return df
+
+def load_snapshot(path) -> nx.DiGraph:
+    """Load a snapshot as a networkx DiGraph."""
+    return GraphSnapshot(path).to_networkx()
@@ -0,0 +1,256 @@
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+from data.requirements import normalize_name
+
+DEFAULT_STORE_PATH = Path("data/raw/packages.sqlite")
+
+# Fields stored in their own column so they can be projected without decoding the
+# whole record. Anything else a record carries goes to the `extra` column.
+PACKAGE_COLUMNS = [
+    "rank", "stars", "forks", "licenses", "normalized_licenses",
+    "latest_release_published_at", "latest_release_number", "repository_url",
+    "homepage", "description", "keywords", "funding_urls", "status",
+    "runtime_dependencies", "optional_dependencies", "dependency_requirements",
+]
+SOURCERANK_COLUMNS = [
+    "basic_info_present", "repository_present", "readme_present", "license_present",
+    "versions_present", "follows_semver", "recent_release", "not_brand_new",
+    "one_point_oh", "dependent_projects", "dependent_repositories", "contributors",
+    "subscribers", "all_prereleases", "any_outdated_dependencies", "is_deprecated",
+    "is_unmaintained", "is_removed", "stars",
+]
+TABLE_COLUMNS = {
+    "packages": PACKAGE_COLUMNS,
+    "sourcerank": SOURCERANK_COLUMNS,
+}
+
+# Columns read when building the dependency graph
+GRAPH_PACKAGE_COLUMNS = [
+    "rank", "stars", "forks", "normalized_licenses", "latest_release_published_at",
+    "repository_url", "keywords", "funding_urls",
+    "runtime_dependencies", "optional_dependencies", "dependency_requirements",
+]
+
+# Bumped (via PRAGMA user_version) when stored keys or columns need migrating
+STORE_VERSION = 3
+
+# SQLite's default limit on host parameters is 999 on older builds
+CHUNK_SIZE = 900
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+class PackageStore:
+    """Single-file store for raw package metadata and SourceRank records.
+
+    Records are keyed by PEP 503 normalized package name (normalize_name, as used
+    for graph nodes) and upserted as a whole; the name as written (e.g. `Foo.Bar`) is
+    kept in `display_name` and read back as the record's `name`. Every value
+    is kept JSON-encoded, with NULL meaning "field absent", so a record read back
+    is identical to the one written. Reads can be restricted to a subset of names
+    and columns so graph builds only decode the fields they use.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        for table, columns in TABLE_COLUMNS.items():
+            cols = ", ".join(f'"{c}" TEXT' for c in columns)
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    name TEXT PRIMARY KEY,
+                    display_name TEXT,
+                    {cols},
+                    extra TEXT,
+                    updated_at REAL NOT NULL
+                )""")
+        self.conn.commit()
+        self._migrate()
+
+    def _migrate(self):
+        """Bring a store written by an older version up to STORE_VERSION.
+
+        Columns added to the schema since the store was created are added and
+        filled from the `extra` blob of records that carried the field. Records keyed
+        by lowercase name (before version 1) are renamed to their normalized name,
+        keeping the old key as display name (see _rename_to_normalized).
+        """
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= STORE_VERSION:
+            return
+        with self.conn:
+            for table, columns in TABLE_COLUMNS.items():
+                existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+                added = [col for col in ["display_name", *columns] if col not in existing]
+                for col in added:
+                    self.conn.execute(f'ALTER TABLE {table} ADD COLUMN "{col}" TEXT')
+                self._move_from_extra(table, [col for col in added if col in columns])
+                self.conn.execute(f"UPDATE {table} SET display_name = name WHERE display_name IS NULL")
+                if version < 1:
+                    self._rename_to_normalized(table, columns)
+            self.conn.execute(f"PRAGMA user_version = {STORE_VERSION}")
+
+    def _rename_to_normalized(self, table: str, columns: list[str]):
+        """Re-key records by normalized name, keeping one record per normalized name.
+
+        When several stored names normalize alike (`foo_bar`, `foo.bar`, `foo-bar`),
+        the record with the latest `latest_release_published_at` wins, then the one
+        with the most fields set, then the most recently written one.
+        """
+        release = '"latest_release_published_at"' if "latest_release_published_at" in columns else "NULL"
+        filled = " + ".join(f'("{c}" IS NOT NULL)' for c in columns)
+        groups = {}
+        for name, published, n_filled, updated_at in self.conn.execute(
+                f"SELECT name, {release}, {filled}, updated_at FROM {table}"):
+            published = json.loads(published) if published is not None else None
+            groups.setdefault(normalize_name(name), []).append(
+                ((published or "", n_filled, updated_at), name))
+
+        deletes, renames = [], []
+        for key, members in groups.items():
+            if len(members) == 1 and members[0][1] == key:
+                continue
+            winner = max(members)[1]
+            deletes.extend((name,) for _, name in members if name != winner)
+            if winner != key:
+                renames.append((key, winner))
+        self.conn.executemany(f"DELETE FROM {table} WHERE name = ?", deletes)
+        self.conn.executemany(f"UPDATE {table} SET name = ? WHERE name = ?", renames)
+
+    def _move_from_extra(self, table: str, columns: list[str]):
+        """Move fields stored in the `extra` blob into their (new) columns."""
+        if not columns:
+            return
+        conditions = " OR ".join("extra LIKE ?" for _ in columns)
+        rows = self.conn.execute(
+            f"SELECT name, extra FROM {table} WHERE {conditions}", [f'%"{c}"%' for c in columns]).fetchall()
+        updates = []
+        for name, extra in rows:
+            extra = json.loads(extra)
+            values = [json.dumps(extra.pop(c)) if c in extra else None for c in columns]
+            updates.append((*values, json.dumps(extra), name))
+        assignments = ", ".join(f'"{c}" = ?' for c in columns)
+        self.conn.executemany(f"UPDATE {table} SET {assignments}, extra = ? WHERE name = ?", updates)
+
+    def _upsert(self, table: str, records: dict[str, dict]):
+        columns = TABLE_COLUMNS[table]
+        now = time.time()
+        rows = []
+        for name, record in records.items():
+            extra = {k: v for k, v in record.items() if k not in columns and k != "name"}
+            rows.append((
+                normalize_name(name),
+                name,
+                *(json.dumps(record[c]) if c in record else None for c in columns),
+                json.dumps(extra),
+                now,
+            ))
+
+        names = ", ".join(["name", "display_name", *(f'"{c}"' for c in columns), "extra", "updated_at"])
+        placeholders = ", ".join("?" * (len(columns) + 4))
+        with self.lock:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO {table} ({names}) VALUES ({placeholders})", rows)
+            self.conn.commit()
+
+    def upsert_packages(self, records: list[dict]):
+        """Insert or replace cleaned package metadata records (keyed by their `name`)."""
+        self._upsert("packages", {r["name"]: r for r in records})
+
+    def upsert_sourcerank(self, records: dict[str, dict]):
+        """Insert or replace SourceRank breakdowns, given as `{package_name: info}`."""
+        self._upsert("sourcerank", records)
+
+    def has(self, name: str, table: str = "packages") -> bool:
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT 1 FROM {table} WHERE name = ?", (normalize_name(name),)).fetchone()
+        return row is not None
+
+    def names(self, table: str = "packages") -> list[str]:
+        with self.lock:
+            return [row[0] for row in self.conn.execute(f"SELECT name FROM {table}")]
+
+    def updated_at(self, names, table: str = "packages") -> dict[str, float]:
+        """Return the last write time of each stored record among `names`."""
+        result = {}
+        with self.lock:
+            for chunk in _chunks({normalize_name(n) for n in names}):
+                marks = ", ".join("?" * len(chunk))
+                result.update(self.conn.execute(
+                    f"SELECT name, updated_at FROM {table} WHERE name IN ({marks})", chunk))
+        return result
+
+    def read(self, table: str, names=None, columns=None) -> dict[str, dict]:
+        """Read records as `{normalized_name: record}`, optionally only for some names and columns.
+
+        Package records carry their display name as `name`. Fields that were absent
+        when the record was written are absent here too.
+        """
+        all_columns = TABLE_COLUMNS[table]
+        wanted = all_columns if columns is None else [c for c in columns if c in all_columns]
+        # Columns outside the schema can only come from the `extra` blob
+        need_extra = columns is None or any(c not in all_columns and c != "name" for c in columns)
+
+        select = ", ".join(["name", "display_name", *(f'"{c}"' for c in wanted), "extra"] if need_extra
+                           else ["name", "display_name", *(f'"{c}"' for c in wanted)])
+        query = f"SELECT {select} FROM {table}"
+
+        with self.lock:
+            if names is None:
+                rows = self.conn.execute(query).fetchall()
+            else:
+                rows = []
+                for chunk in _chunks({normalize_name(n) for n in names}):
+                    marks = ", ".join("?" * len(chunk))
+                    rows.extend(self.conn.execute(f"{query} WHERE name IN ({marks})", chunk))
+
+        result = {}
+        for row in rows:
+            record = {"name": row[1] or row[0]} if table == "packages" else {}
+            for col, value in zip(wanted, row[2:]):
+                if value is not None:
+                    record[col] = json.loads(value)
+            if need_extra and row[-1]:
+                extra = json.loads(row[-1])
+                if columns is not None:
+                    extra = {k: v for k, v in extra.items() if k in columns}
+                record.update(extra)
+            result[row[0]] = record
+        return result
+
+    def read_packages(self, names=None, columns=None) -> dict[str, dict]:
+        return self.read("packages", names, columns)
+
+    def read_sourcerank(self, names=None, columns=None) -> dict[str, dict]:
+        return self.read("sourcerank", names, columns)
+
+    def read_metadata(self, names=None, columns=None) -> dict[str, dict]:
+        """Read package records merged with their SourceRank data.
+
+        Produces the same records as create_graph.load_metadata: the SourceRank `stars`
+        field is renamed to `stars_sr` and `sourcerank_missing` flags packages without
+        a SourceRank record.
+        """
+        packages = self.read_packages(names, columns)
+        sourcerank = self.read_sourcerank(list(packages))
+        for name, data in packages.items():
+            sr = sourcerank.get(name, {})
+            if "stars" in sr:
+                sr["stars_sr"] = sr.pop("stars")
+            data.update(sr)
+            data["sourcerank_missing"] = (sr == {})
+        return packages
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,338 @@
+import os
+import gzip
+import json
+import math
+import shutil
+from pathlib import Path
+from collections import Counter
+
+import networkx as nx
+
+from data.snapshot import save_snapshot, load_snapshot, _json_value
+
+TEMPORAL_VERSION = 1
+KEYFRAME_EVERY = 30
+
+def _same(a, b) -> bool:
+    return a == b or (isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b))
+
+def diff_attrs(old: dict, new: dict) -> dict:
+    """Attribute changes as `{attr: {"old": ..., "new": ...}}`; a side is left out when the attribute is absent."""
+    changes = {}
+    for attr in old.keys() | new.keys():
+        if attr in old and attr in new and _same(old[attr], new[attr]):
+            continue
+        change = {}
+        if attr in old:
+            change["old"] = old[attr]
+        if attr in new:
+            change["new"] = new[attr]
+        changes[attr] = change
+    return changes
+
+def _apply_attrs(attrs: dict, changes: dict, side: str) -> dict:
+    """Set each changed attribute to its `side` ("old" or "new") value, dropping absent ones."""
+    for attr, change in changes.items():
+        if side in change:
+            attrs[attr] = change[side]
+        else:
+            attrs.pop(attr, None)
+    return attrs
+
+def _diff_entities(old: dict, new: dict) -> dict:
+    """`{key: (kind, value)}` for entities added, removed or changed between two `{key: attrs}` maps."""
+    out = {}
+    for key, attrs in new.items():
+        if key not in old:
+            out[key] = ("added", dict(attrs))
+        else:
+            changes = diff_attrs(old[key], attrs)
+            if changes:
+                out[key] = ("changed", changes)
+    for key, attrs in old.items():
+        if key not in new:
+            out[key] = ("removed", dict(attrs))
+    return out
+
+def _compose_entity(first, second):
+    """Combine two consecutive entity changes into one (None if they cancel out)."""
+    kind1, value1 = first
+    kind2, value2 = second
+    if kind1 == "added":
+        return None if kind2 == "removed" else ("added", _apply_attrs(dict(value1), value2, "new"))
+    if kind1 == "removed":
+        changes = diff_attrs(value1, value2)
+        return ("changed", changes) if changes else None
+    if kind2 == "removed":
+        return ("removed", _apply_attrs(dict(value2), value1, "old"))
+
+    merged = dict(value1)
+    for attr, change in value2.items():
+        start = value1.get(attr, change)
+        combined = {}
+        if "old" in start:
+            combined["old"] = start["old"]
+        if "new" in change:
+            combined["new"] = change["new"]
+        if "old" in combined and "new" in combined and _same(combined["old"], combined["new"]):
+            merged.pop(attr, None)
+        elif "old" not in combined and "new" not in combined:
+            merged.pop(attr, None)
+        else:
+            merged[attr] = combined
+    return ("changed", merged) if merged else None
+
+def _compose_entities(first: dict, second: dict) -> dict:
+    out = dict(first)
+    for key, change in second.items():
+        if key in out:
+            combined = _compose_entity(out[key], change)
+            if combined is None:
+                del out[key]
+            else:
+                out[key] = combined
+        else:
+            out[key] = change
+    return out
+
+def _applied_order(order, nodes: dict) -> list:
+    """Node order after applying node changes: removed nodes dropped, added ones appended."""
+    removed = {key for key, (kind, _) in nodes.items() if kind == "removed"}
+    return [n for n in order if n not in removed] + [key for key, (kind, _) in nodes.items() if kind == "added"]
+
+def graph_delta(G_old: nx.DiGraph, G_new: nx.DiGraph) -> dict:
+    """Nodes, edges and graph attributes added, removed or changed from `G_old` to `G_new`.
+
+    Removed entities keep their old attributes and changes keep both values, so
+    deltas can be composed and applied in either direction. When `G_new`'s node
+    order is not simply `G_old`'s with added nodes appended, the delta also records
+    it under "order", so applying the delta reproduces `list(G_new)`.
+    """
+    delta = {
+        "nodes": _diff_entities(dict(G_old.nodes(data=True)), dict(G_new.nodes(data=True))),
+        "edges": _diff_entities(
+            {(u, v): d for u, v, d in G_old.edges(data=True)},
+            {(u, v): d for u, v, d in G_new.edges(data=True)}),
+        "graph": diff_attrs(G_old.graph, G_new.graph),
+    }
+    order = list(G_new)
+    if _applied_order(G_old, delta["nodes"]) != order:
+        delta["order"] = order
+    return delta
+
+def compose_deltas(first: dict, second: dict) -> dict:
+    """The single delta equivalent to applying `first`, then `second`.
+
+    A recorded node order is carried over. Without one in either delta, nodes
+    removed and then added again keep their old position when the result is applied.
+    """
+    graph = _compose_entity(("changed", first["graph"]), ("changed", second["graph"]))
+    delta = {
+        "nodes": _compose_entities(first["nodes"], second["nodes"]),
+        "edges": _compose_entities(first["edges"], second["edges"]),
+        "graph": graph[1] if graph else {},
+    }
+    if "order" in second:
+        delta["order"] = second["order"]
+    elif "order" in first:
+        delta["order"] = _applied_order(first["order"], second["nodes"])
+    return delta
+
+def apply_delta(G: nx.DiGraph, delta: dict) -> nx.DiGraph:
+    """Apply a delta to `G` in place.
+
+    Added nodes are appended after the existing ones, unless the delta records a node
+    order, in which case the nodes are put in that order. The out-edges of each node
+    keep their order, with added edges last.
+    """
+    edges = delta["edges"]
+    nodes = delta["nodes"]
+    G.remove_edges_from(key for key, (kind, _) in edges.items() if kind == "removed")
+    G.remove_nodes_from(key for key, (kind, _) in nodes.items() if kind == "removed")
+    for name, (kind, value) in nodes.items():
+        if kind == "added":
+            G.add_node(name, **value)
+        elif kind == "changed":
+            _apply_attrs(G.nodes[name], value, "new")
+    for (u, v), (kind, value) in edges.items():
+        if kind == "added":
+            G.add_edge(u, v, **value)
+        elif kind == "changed":
+            _apply_attrs(G.edges[u, v], value, "new")
+    _apply_attrs(G.graph, delta["graph"], "new")
+
+    order = delta.get("order")
+    if order is not None and order != list(G):
+        graph = dict(G.graph)
+        nodes = dict(G.nodes(data=True))
+        edges = list(G.edges(data=True))
+        G.clear()
+        G.graph.update(graph)
+        G.add_nodes_from((node, nodes[node]) for node in order)
+        G.add_edges_from(edges)
+    return G
+
+def summarize_delta(delta: dict) -> dict:
+    """Counts of added, removed and changed nodes and edges."""
+    summary = {}
+    for entity in ("nodes", "edges"):
+        counts = Counter(kind for kind, _ in delta[entity].values())
+        for kind in ("added", "removed", "changed"):
+            summary[f"{entity}_{kind}"] = counts.get(kind, 0)
+    return summary
+
+def _encode_delta(delta: dict) -> dict:
+    data = {
+        "nodes": [[name, kind, value] for name, (kind, value) in delta["nodes"].items()],
+        "edges": [[u, v, kind, value] for (u, v), (kind, value) in delta["edges"].items()],
+        "graph": delta["graph"],
+    }
+    if "order" in delta:
+        data["order"] = delta["order"]
+    return data
+
+def _decode_delta(data: dict) -> dict:
+    delta = {
+        "nodes": {name: (kind, value) for name, kind, value in data["nodes"]},
+        "edges": {(u, v): (kind, value) for u, v, kind, value in data["edges"]},
+        "graph": data["graph"],
+    }
+    if "order" in data:
+        delta["order"] = data["order"]
+    return delta
+
+class TemporalGraphStore:
+    """Dated graphs stored as periodic full snapshots plus per-date deltas.
+
+    Every date after the first gets a gzipped JSON delta against the previous
+    date, and every `keyframe_every`-th date (starting with the first) also gets a
+    full binary snapshot. Rebuilding a date loads the nearest earlier keyframe and
+    applies at most `keyframe_every - 1` deltas, while "what changed" queries only
+    read deltas.
+
+    Rebuilt graphs have the recorded node order (see graph_delta).
+
+    Layout under `root`: `index.json`, `keyframes/<date>.snapshot` and
+    `deltas/<date>.json.gz`. Dates are strings that sort chronologically, such as
+    the `YYYYMMDD` suffix of graph names.
+    """
+
+    def __init__(self, root, keyframe_every: int = KEYFRAME_EVERY):
+        self.root = Path(root)
+        index_path = self.root / "index.json"
+        if index_path.exists():
+            with open(index_path, encoding="utf-8") as f:
+                self.index = json.load(f)
+        else:
+            self.index = {"version": TEMPORAL_VERSION, "keyframe_every": keyframe_every,
+                          "dates": [], "keyframes": []}
+
+    @property
+    def dates(self) -> list[str]:
+        return list(self.index["dates"])
+
+    def _save_index(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / "index.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp, self.root / "index.json")
+
+    def _delta_path(self, date: str) -> Path:
+        return self.root / "deltas" / f"{date}.json.gz"
+
+    def _keyframe_path(self, date: str) -> Path:
+        return self.root / "keyframes" / f"{date}.snapshot"
+
+    def add(self, date: str, G: nx.DiGraph) -> dict:
+        """Record the graph of `date`, which must not be earlier than any stored date.
+
+        Recording the latest date again replaces it. New files are written next to
+        their final paths and swapped in before the index is saved, so a failure
+        leaves the previous recording intact. Returns a summary of the changes since
+        the previous date.
+        """
+        dates = self.index["dates"]
+        replace = bool(dates) and date == dates[-1]
+        previous = dates[:-1] if replace else dates
+        if previous and date <= previous[-1]:
+            raise ValueError(f"Date {date} is not after the latest stored date {previous[-1]}")
+
+        # The first date is only a keyframe; its delta would be the whole graph
+        delta = graph_delta(self.graph(previous[-1]) if previous else nx.DiGraph(), G)
+        is_keyframe = len(previous) % self.index["keyframe_every"] == 0
+        staged = []
+        try:
+            if previous:
+                path = self._delta_path(date)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(path.name + ".new")
+                # Staged before writing, so a failed dump is cleaned up too
+                staged.append((tmp, path))
+                with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                    json.dump(_encode_delta(delta), f, default=_json_value)
+            if is_keyframe:
+                path = self._keyframe_path(date)
+                staged.append((save_snapshot(G, path.with_name(path.name + ".new")), path))
+        except BaseException:
+            for tmp, _ in staged:
+                if tmp.is_dir():
+                    shutil.rmtree(tmp, ignore_errors=True)
+                else:
+                    tmp.unlink(missing_ok=True)
+            raise
+
+        for tmp, path in staged:
+            if path.is_dir():
+                old = path.with_name(path.name + ".old")
+                os.replace(path, old)
+                os.replace(tmp, path)
+                shutil.rmtree(old)
+            else:
+                os.replace(tmp, path)
+        if not replace:
+            if is_keyframe:
+                self.index["keyframes"].append(date)
+            dates.append(date)
+        self._save_index()
+        return summarize_delta(delta)
+
+    def delta(self, date: str) -> dict:
+        """The delta from the previous stored date to `date`."""
+        with gzip.open(self._delta_path(date), "rt", encoding="utf-8") as f:
+            return _decode_delta(json.load(f))
+
+    def _dates_between(self, start: str | None, end: str) -> list[str]:
+        dates = self.index["dates"]
+        if end not in dates or (start is not None and start not in dates):
+            raise KeyError(f"Unknown date: {end if end not in dates else start}")
+        return [d for d in dates if (start is None or d > start) and d <= end]
+
+    def graph(self, date: str) -> nx.DiGraph:
+        """Rebuild the graph of `date` from the nearest keyframe and the deltas after it."""
+        if date not in self.index["dates"]:
+            raise KeyError(f"Unknown date: {date}")
+        keyframe = max(d for d in self.index["keyframes"] if d <= date)
+        G = load_snapshot(self._keyframe_path(keyframe))
+        for d in self._dates_between(keyframe, date):
+            apply_delta(G, self.delta(d))
+        return G
+
+    def changes(self, start: str, end: str) -> dict:
+        """The composed delta from `start` to `end`, read from deltas only."""
+        delta = {"nodes": {}, "edges": {}, "graph": {}}
+        for d in self._dates_between(start, end):
+            delta = compose_deltas(delta, self.delta(d))
+        return delta
+
+    def dependency_churn(self, start: str, end: str) -> Counter:
+        """Per package, how many dependency edges were added or removed after `start` up to `end`.
+
+        Every individual event counts, so a dependency dropped and re-added counts twice.
+        """
+        churn = Counter()
+        for d in self._dates_between(start, end):
+            for (u, _), (kind, _) in self.delta(d)["edges"].items():
+                if kind != "changed":
+                    churn[u] += 1
+        return churn
@@ -0,0 +1,319 @@
+from collections import Counter, deque
+
+import networkx as nx
+
+import metrics
+from feature_engineering import (
+    detect_communities,
+    compute_inter_intra_ratios,
+    compute_betweenness_centrality,
+    compute_closeness_centrality,
+    node_closeness,
+    node_inter_intra_ratio,
+)
+
+# Largest tolerated staleness of each feature group before it is recomputed in full
+STALE_TOLERANCE = 0.05
+# Nodes visited when marking the region an edge change can affect; beyond this the
+# whole graph is treated as stale
+REGION_LIMIT = 10000
+
+CENTRALITY_FEATURES = ["betweenness_centrality", "closeness_centrality"]
+
+def _bounded_reach(neighbors, starts, limit):
+    """Nodes reachable from any of `starts` through `neighbors`, or None if more than `limit`."""
+    seen = set(starts)
+    if len(seen) > limit:
+        return None
+    queue = deque(seen)
+    while queue:
+        for nxt in neighbors(queue.popleft()):
+            if nxt not in seen:
+                seen.add(nxt)
+                if len(seen) > limit:
+                    return None
+                queue.append(nxt)
+    return seen
+
+def _scale_drift(nodes_then: int, nodes_now: int, feature: str) -> float:
+    """Relative change of a feature's normalization since it was computed for `nodes_then` nodes."""
+    if feature == "betweenness_centrality":
+        # nx.betweenness_centrality divides by (n - 1)(n - 2)
+        then, now = (nodes_then - 1) * (nodes_then - 2), (nodes_now - 1) * (nodes_now - 2)
+    else:
+        then, now = nodes_then - 1, nodes_now - 1
+    return abs(then / max(now, 1) - 1)
+
+class DynamicFeatureEngine:
+    """Keep the structural features of a graph fresh under edge insertions and deletions.
+
+    Each event updates, in place on `G`:
+
+    - `degree_centrality` of both endpoints in O(1). The other nodes are scaled by
+      1 / (n - 1) as of the last full pass; once the node count has drifted by more
+      than `tolerance` (relative), every node is rescaled.
+    - `clustering_coefficient` of both endpoints and their common neighbors,
+      exactly. Directed triangle counts and reciprocal degrees are kept per node,
+      so an event costs one neighbor-set intersection rather than a recount.
+    - `inter_intra_ratio` of the source node against the current partition. New
+      nodes join the most common community of their neighbors; the partition is
+      re-detected once the edges changed since detection exceed `tolerance` of
+      the graph's edges.
+    - Centralities are not updated per event. Every node whose value may change is
+      marked stale, and a feature is recomputed in full once its stale nodes exceed
+      `tolerance` of the graph. For closeness these are the descendants of the
+      target. For betweenness they are the nodes on some path from an ancestor of
+      the source to a descendant of the target (descendants of the ancestors that
+      are also ancestors of the descendants), which covers every shortest path the
+      edge adds or replaces. `refresh_closeness` recomputes a small stale region
+      exactly instead. Both centralities are normalized by the node count, so new
+      nodes make every value stale: like the degree bound, each feature also counts
+      the drift of its normalization since its last full pass, and the larger of
+      the two bounds decides the recompute.
+
+    Marking costs up to four BFS per event (two from the endpoints, two from the
+    regions they reach), each stopped after `region_limit` nodes. A feature that is
+    already stale everywhere is not marked again until it is recomputed, so once a
+    large region has been hit the remaining events of a batch skip the searches.
+
+    `staleness()` reports the current value of each bound. Centrality options (`k`,
+    `epsilon`, `n_jobs`, ...) are passed to the full recomputes.
+    """
+
+    def __init__(self, G, community_method="label_propagation", tolerance=STALE_TOLERANCE,
+                 region_limit=REGION_LIMIT, seed=None, compute=True, **centrality_options):
+        self.G = G
+        self.community_method = community_method
+        self.tolerance = tolerance
+        self.region_limit = region_limit
+        self.seed = seed
+        self.centrality_options = centrality_options
+        self.communities = {}
+        self.triangles = {}
+        self.reciprocal = {}
+        self.stale = {feature: set() for feature in CENTRALITY_FEATURES}
+        self.stale_everywhere = set()
+        self.changed_edges = 0
+        self.edges_at_detection = G.number_of_edges()
+        self.scaled_nodes = G.number_of_nodes()
+        # Node count each centrality was last computed (and normalized) for
+        self.centrality_nodes = dict.fromkeys(CENTRALITY_FEATURES, G.number_of_nodes())
+        if compute:
+            self.recompute()
+
+    # Full recomputes
+
+    def recompute(self, features=None):
+        """Recompute feature groups in full: "degree", "clustering", "communities" and the centralities."""
+        features = features or ["degree", "clustering", "communities"] + CENTRALITY_FEATURES
+        G = self.G
+        for feature in features:
+            with metrics.stage("dynamic_features.recompute", feature=feature):
+                if feature == "degree":
+                    self._rescale_degrees()
+                elif feature == "clustering":
+                    self._count_triangles()
+                elif feature == "communities":
+                    comms = detect_communities(G, self.community_method, seed=self.seed)
+                    self.communities = {node: i for i, comm in enumerate(comms) for node in comm}
+                    compute_inter_intra_ratios(G, communities=comms)
+                    self.changed_edges = 0
+                    self.edges_at_detection = G.number_of_edges()
+                elif feature == "betweenness_centrality":
+                    compute_betweenness_centrality(G, seed=self.seed, **self.centrality_options)
+                elif feature == "closeness_centrality":
+                    compute_closeness_centrality(G, seed=self.seed, **self.centrality_options)
+                else:
+                    raise ValueError(f"Unknown feature group '{feature}'")
+                if feature in self.stale:
+                    self.stale[feature].clear()
+                    self.stale_everywhere.discard(feature)
+                    self.centrality_nodes[feature] = len(G)
+
+    def _count_triangles(self):
+        """Set clustering for all nodes and derive the per-node counts updates start from."""
+        G = self.G
+        clustering = nx.clustering(G)
+        self.reciprocal = {node: len(self._neighbors(node, G.succ) & self._neighbors(node, G.pred)) for node in G}
+        self.triangles = {}
+        for node, value in clustering.items():
+            G.nodes[node]["clustering_coefficient"] = value
+            # nx.clustering divides the directed triangle count by twice this
+            self.triangles[node] = round(value * 2 * self._pairs(node))
+
+    @staticmethod
+    def _neighbors(node, adj) -> set:
+        return set(adj[node]) - {node}
+
+    def _pairs(self, node) -> int:
+        G = self.G
+        total = G.in_degree(node) + G.out_degree(node) - 2 * G.has_edge(node, node)
+        return total * (total - 1) - 2 * self.reciprocal.get(node, 0)
+
+    def _weight(self, a, b) -> int:
+        """Entry of A + A^T, the undirected multiplicity of a pair used by directed clustering."""
+        return self.G.has_edge(a, b) + self.G.has_edge(b, a)
+
+    def _update_triangles(self, u, v, sign) -> set:
+        """Adjust triangle counts for the edge u -> v being added (+1) or removed (-1).
+
+        Call before adding or after removing the edge. Every triangle through the
+        pair is counted twice per endpoint, as in nx.clustering. Returns the nodes
+        whose clustering changed.
+        """
+        G = self.G
+        if u == v:
+            return set()
+        common = (set(G.pred[u]) | set(G.succ[u])) & (set(G.pred[v]) | set(G.succ[v]))
+        common -= {u, v}
+        weights = {k: self._weight(k, u) * self._weight(k, v) for k in common}
+        through = 2 * sum(weights.values())
+        self.triangles[u] = self.triangles.get(u, 0) + sign * through
+        self.triangles[v] = self.triangles.get(v, 0) + sign * through
+        for k, w in weights.items():
+            self.triangles[k] = self.triangles.get(k, 0) + sign * 2 * w
+        if G.has_edge(v, u):
+            self.reciprocal[u] = self.reciprocal.get(u, 0) + sign
+            self.reciprocal[v] = self.reciprocal.get(v, 0) + sign
+        return {u, v} | common
+
+    def _set_clustering(self, nodes):
+        G = self.G
+        for node in nodes:
+            triangles = self.triangles.get(node, 0)
+            G.nodes[node]["clustering_coefficient"] = 0 if triangles == 0 else triangles / (self._pairs(node) * 2)
+
+    def _rescale_degrees(self):
+        G = self.G
+        scale = 1 / (len(G) - 1) if len(G) > 1 else 1
+        for node, degree in G.degree():
+            G.nodes[node]["degree_centrality"] = degree * scale
+        self.scaled_nodes = len(G)
+
+    # Events
+
+    def insert_edge(self, u, v, **attrs):
+        """Add the dependency `u -> v` (adding missing nodes) and update the features."""
+        G = self.G
+        if G.has_edge(u, v):
+            G.edges[u, v].update(attrs)
+            return
+        new_nodes = [node for node in (u, v) if node not in G]
+        affected = self._update_triangles(u, v, +1) if not new_nodes else {u, v}
+        G.add_edge(u, v, **attrs)
+        for node in new_nodes:
+            G.nodes[node].update(betweenness_centrality=0.0, closeness_centrality=0.0)
+        self._edge_changed(u, v, new_nodes, affected)
+
+    def delete_edge(self, u, v):
+        """Remove the dependency `u -> v` and update the features. Nodes are kept."""
+        if not self.G.has_edge(u, v):
+            return
+        # The stale region is the one the edge could reach, so mark it before removing
+        self._mark_centralities_stale(u, v)
+        self.G.remove_edge(u, v)
+        self._edge_changed(u, v, [], self._update_triangles(u, v, -1), mark=False)
+
+    def apply(self, events):
+        """Apply `("insert", u, v[, attrs])` and `("delete", u, v)` events in order."""
+        for event in events:
+            kind, u, v = event[:3]
+            if kind == "insert":
+                self.insert_edge(u, v, **(event[3] if len(event) > 3 else {}))
+            elif kind == "delete":
+                self.delete_edge(u, v)
+            else:
+                raise ValueError(f"Unknown event '{kind}', expected 'insert' or 'delete'")
+        self.enforce_bounds()
+
+    def _edge_changed(self, u, v, new_nodes, affected, mark=True):
+        G = self.G
+        metrics.incr("dynamic_features.events")
+
+        # Degree: exact for the endpoints; rescale everything once n has drifted
+        if new_nodes and abs((self.scaled_nodes - 1) / max(len(G) - 1, 1) - 1) > self.tolerance:
+            self._rescale_degrees()
+        scale = 1 / (len(G) - 1) if len(G) > 1 else 1
+        for node in (u, v):
+            G.nodes[node]["degree_centrality"] = G.degree(node) * scale
+
+        # Clustering: only triangles through the edge change
+        self._set_clustering(affected)
+
+        # Communities: label new nodes from their neighbors, then refresh ratios
+        for node in new_nodes:
+            labels = Counter(
+                self.communities[n] for n in nx.all_neighbors(G, node) if n in self.communities)
+            self.communities[node] = labels.most_common(1)[0][0] if labels else max(self.communities.values(), default=-1) + 1
+            G.nodes[node]["community"] = self.communities[node]
+            for pred in G.predecessors(node):
+                G.nodes[pred]["inter_intra_ratio"] = node_inter_intra_ratio(G, pred, self.communities)
+        G.nodes[u]["inter_intra_ratio"] = node_inter_intra_ratio(G, u, self.communities)
+        if v in new_nodes:
+            G.nodes[v]["inter_intra_ratio"] = node_inter_intra_ratio(G, v, self.communities)
+        self.changed_edges += 1
+
+        if mark:
+            self._mark_centralities_stale(u, v)
+
+    def _mark_centralities_stale(self, u, v):
+        """Mark the nodes whose centralities an edge `u -> v` can change; call while the edge exists."""
+        G = self.G
+        limit = self.region_limit
+        if self.stale_everywhere.issuperset(CENTRALITY_FEATURES):
+            return
+        downstream = _bounded_reach(G.successors, [v], limit)
+        if downstream is None:
+            self.stale_everywhere.update(CENTRALITY_FEATURES)
+            return
+        self.stale["closeness_centrality"] |= downstream
+        if "betweenness_centrality" in self.stale_everywhere:
+            return
+        upstream = _bounded_reach(G.predecessors, [u], limit)
+        if upstream is None:
+            self.stale_everywhere.add("betweenness_centrality")
+            return
+
+        # Shortest paths through the edge run from `upstream` to `downstream`; the
+        # paths they replace pass through nodes reachable from the one and reaching the other
+        below = _bounded_reach(G.successors, upstream, limit)
+        above = _bounded_reach(G.predecessors, downstream, limit)
+        if below is None or above is None:
+            self.stale_everywhere.add("betweenness_centrality")
+        else:
+            self.stale["betweenness_centrality"] |= below & above
+
+    # Bounds
+
+    def staleness(self) -> dict:
+        """Current value of each bound; a group is recomputed once its value exceeds `tolerance`."""
+        G = self.G
+        n = max(len(G), 1)
+        report = {
+            "degree": abs((self.scaled_nodes - 1) / max(len(G) - 1, 1) - 1),
+            "communities": self.changed_edges / max(self.edges_at_detection, 1),
+        }
+        for feature, nodes in self.stale.items():
+            stale = 1.0 if feature in self.stale_everywhere else len(nodes) / n
+            report[feature] = max(stale, _scale_drift(self.centrality_nodes[feature], len(G), feature))
+        return report
+
+    def enforce_bounds(self) -> list[str]:
+        """Recompute every feature group whose staleness exceeds `tolerance`; return them."""
+        over = [feature for feature, value in self.staleness().items() if value > self.tolerance]
+        if over:
+            self.recompute(over)
+        return over
+
+    def refresh_closeness(self, nodes=None):
+        """Recompute closeness exactly for stale `nodes` (default: all stale ones), one BFS each."""
+        if "closeness_centrality" in self.stale_everywhere:
+            self.recompute(["closeness_centrality"])
+            return
+        stale = self.stale["closeness_centrality"]
+        nodes = list(stale if nodes is None else stale & set(nodes))
+        reverse = self.G.reverse(copy=False)
+        for node in nodes:
+            if node in self.G:
+                self.G.nodes[node]["closeness_centrality"] = node_closeness(reverse, node, len(self.G))
+        stale.difference_update(nodes)
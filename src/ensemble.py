@@ -0,0 +1,180 @@
+import time
+import resource
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+from sklearn.model_selection import ParameterGrid
+
+import metrics
+from anomaly import anomaly_scores
+from feature_matrix import FeatureMatrix
+
+# Feature matrices attached in each worker process, by name
+_matrices = {}
+_blocks = []
+
+def model_grid(name: str, model_cls, grid: dict) -> list[tuple]:
+    """Expand a parameter grid into `(name, model_cls, params)` specs for run_ensemble.
+
+    Each spec is named `name[param=value,...]` after the parameters that vary.
+    """
+    varying = sorted(k for k, values in grid.items() if len(values) > 1)
+    specs = []
+    for params in ParameterGrid(grid):
+        label = ",".join(f"{k}={params[k]}" for k in varying)
+        specs.append((f"{name}[{label}]" if label else name, model_cls, params))
+    return specs
+
+def fit_and_score(model_cls, params, X):
+    """Fit a model and return `(scores, is_anomaly)`, lower scores being more anomalous.
+
+    Like run_anomaly_model, but also handles outlier detectors that only score the
+    data they were fitted on (LocalOutlierFactor without `novelty`).
+    """
+    model = model_cls(**params)
+    if hasattr(model, "predict"):
+        model.fit(X)
+        return anomaly_scores(model, X)
+    is_anomaly = model.fit_predict(X) == -1
+    if not hasattr(model, "negative_outlier_factor_"):
+        raise AttributeError(f"Cannot score {model_cls.__name__}: no predict or negative_outlier_factor_.")
+    # Same offset as LocalOutlierFactor.decision_function
+    return model.negative_outlier_factor_ - model.offset_, is_anomaly
+
+def _attach_matrices(layout):
+    """Worker initializer: map each shared block as a read-only array, without copying."""
+    for key, (shm_name, shape, dtype) in layout.items():
+        shm = SharedMemory(name=shm_name)
+        X = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        X.flags.writeable = False
+        _blocks.append(shm)
+        _matrices[key] = X
+
+def _run_job(job):
+    """Fit and score one model on an attached matrix; return its scores, labels and costs."""
+    matrix, name, model_cls, params, trace_memory = job
+    X = _matrices[matrix]
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        scores, is_anomaly = fit_and_score(model_cls, params, X)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    report = {
+        "matrix": matrix,
+        "model": name,
+        "params": params,
+        "seconds": seconds,
+        "n_anomalies": int(np.count_nonzero(is_anomaly)),
+        "peak_alloc_bytes": peak,
+        # ru_maxrss is in KiB on Linux: the worker's high-water mark so far
+        "worker_max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+    return np.asarray(scores, dtype=np.float64), np.asarray(is_anomaly, dtype=bool), report
+
+def rank_average(scores: dict) -> np.ndarray:
+    """Average of each score column's normalized rank, in [0, 1] (lower = more anomalous).
+
+    Ranking first puts models with different score scales on equal footing; ties
+    share their average rank.
+    """
+    columns = list(scores.values())
+    if not columns:
+        raise ValueError("No scores to combine")
+    n = len(columns[0])
+    total = np.zeros(n, dtype=np.float64)
+    for values in columns:
+        total += (rankdata(values) - 1) / max(n - 1, 1)
+    return total / len(columns)
+
+def _as_arrays(matrices):
+    """`{name: float32 array}` and the shared row labels from one or more matrices."""
+    if isinstance(matrices, (FeatureMatrix, np.ndarray)):
+        matrices = {"features": matrices}
+    arrays = {}
+    nodes = None
+    for key, X in matrices.items():
+        if isinstance(X, FeatureMatrix):
+            if nodes is not None and X.nodes != nodes:
+                raise ValueError(f"Matrix '{key}' has different rows; build all matrices with the same nodes")
+            nodes = X.nodes
+            X = X.values
+        arrays[key] = np.ascontiguousarray(X, dtype=np.float32)
+    lengths = {len(X) for X in arrays.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Matrices have different row counts: {sorted(lengths)}")
+    return arrays, nodes
+
+def run_ensemble(matrices, models, n_jobs: int = 1, trace_memory: bool = True):
+    """Fit and score many anomaly models, then combine their scores by rank averaging.
+
+    `matrices` is a FeatureMatrix (or array), or a dict of them with the same rows,
+    e.g. `{"plain": X, "structural": X_structural}`; every model in `models` (a list of
+    `(name, model_cls, params)` specs, see model_grid) runs on every matrix. With
+    `n_jobs` > 1, each matrix is copied once into shared memory and the models run
+    in a process pool whose workers map it read-only, so no worker gets its own copy.
+
+    Returns `(scores, report)`: a DataFrame with one score column per run (named
+    `matrix/model` when there are several matrices), the rank-averaged `ensemble`
+    score and `anomaly_votes`, the fraction of runs labelling a row an anomaly; and
+    a DataFrame with the time, anomaly count and memory of each run. With
+    `trace_memory`, `peak_alloc_bytes` is the peak of memory allocated through
+    Python and NumPy while fitting and scoring.
+    """
+    arrays, nodes = _as_arrays(matrices)
+    jobs = [(key, name, model_cls, params, trace_memory)
+            for key in arrays for name, model_cls, params in models]
+    if not jobs:
+        raise ValueError("No models to run")
+    multi = len(arrays) > 1
+    results = [None] * len(jobs)
+
+    if n_jobs is None or n_jobs <= 1:
+        _matrices.update(arrays)
+        try:
+            for i, job in enumerate(jobs):
+                with metrics.stage("ensemble.model", model=job[1]):
+                    results[i] = _run_job(job)
+        finally:
+            for key in arrays:
+                _matrices.pop(key, None)
+    else:
+        blocks = []
+        try:
+            layout = {}
+            for key, X in arrays.items():
+                shm = SharedMemory(create=True, size=max(X.nbytes, 1))
+                blocks.append(shm)
+                np.ndarray(X.shape, dtype=X.dtype, buffer=shm.buf)[:] = X
+                layout[key] = (shm.name, X.shape, X.dtype.str)
+            with metrics.stage("ensemble.pool", jobs=n_jobs):
+                with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach_matrices,
+                                         initargs=(layout,)) as pool:
+                    futures = {pool.submit(_run_job, job): i for i, job in enumerate(jobs)}
+                    for future in as_completed(futures):
+                        results[futures[future]] = future.result()
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+    scores = {}
+    votes = None
+    for (key, name, *_), (values, is_anomaly, _) in zip(jobs, results):
+        scores[f"{key}/{name}" if multi else name] = values
+        votes = is_anomaly.astype(np.float64) if votes is None else votes + is_anomaly
+
+    score_df = pd.DataFrame(scores, index=nodes)
+    score_df["ensemble"] = rank_average(scores)
+    score_df["anomaly_votes"] = votes / len(jobs)
+    report = pd.DataFrame([report for _, _, report in results])
+    metrics.incr("ensemble.models", len(jobs))
+    return score_df, report
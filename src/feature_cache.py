@@ -0,0 +1,98 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+import metrics
+
+DEFAULT_FEATURE_CACHE_DIR = Path("data/cache/features")
+
+def graph_fingerprint(G) -> str:
+    """Hash of a graph's node and edge sets, independent of insertion order."""
+    h = hashlib.sha256()
+    h.update(b"directed" if G.is_directed() else b"undirected")
+    for node in sorted(map(str, G.nodes())):
+        h.update(node.encode())
+        h.update(b"\x00")
+    h.update(b"\x01")
+    for u, v in sorted((str(u), str(v)) for u, v in G.edges()):
+        h.update(u.encode())
+        h.update(b"\x00")
+        h.update(v.encode())
+        h.update(b"\x00")
+    return h.hexdigest()
+
+def params_key(params: dict) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+class FeatureCache:
+    """On-disk cache of per-node feature columns.
+
+    Each entry holds one feature for one graph fingerprint and parameter set, stored
+    as a float array (an int array for integer features such as community labels)
+    aligned with the sorted node names, with None values masked.
+    Reading an entry refreshes its mtime, and the least recently used entries are
+    deleted once the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, path=DEFAULT_FEATURE_CACHE_DIR, max_bytes=1 << 30):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _entry(self, fingerprint: str, feature: str, params: dict) -> Path:
+        return self.path / f"{fingerprint[:24]}__{feature}__{params_key(params)[:16]}.npz"
+
+    def get(self, G, fingerprint: str, feature: str, params: dict) -> dict | None:
+        """Return `{node: value}` for a cached feature, or None on a miss."""
+        entry = self._entry(fingerprint, feature, params)
+        if not entry.exists():
+            self.stats["misses"] += 1
+            metrics.incr("feature_cache.lookups", feature=feature, outcome="misses")
+            return None
+
+        with np.load(entry) as data:
+            values, null = data["values"].tolist(), data["null"]
+        for i in np.flatnonzero(null).tolist():
+            values[i] = None
+        os.utime(entry)
+        self.stats["hits"] += 1
+        metrics.incr("feature_cache.lookups", feature=feature, outcome="hits")
+        return dict(zip(sorted(G.nodes(), key=str), values))
+
+    def put(self, G, fingerprint: str, feature: str, params: dict, values: dict):
+        nodes = sorted(G.nodes(), key=str)
+        column = [values.get(node) for node in nodes]
+        null = np.array([v is None for v in column], dtype=bool)
+        integer = all(type(v) is int for v in column if v is not None)
+        array = np.array([0 if v is None else v for v in column], dtype=np.int64 if integer else np.float64)
+
+        entry = self._entry(fingerprint, feature, params)
+        tmp_path = entry.with_suffix(".tmp.npz")
+        np.savez(tmp_path, values=array, null=null)
+        os.replace(tmp_path, entry)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in `max_bytes`."""
+        entries = [(p.stat(), p) for p in self.path.glob("*.npz")]
+        total = sum(st.st_size for st, _ in entries)
+        for st, p in sorted(entries, key=lambda e: e[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= st.st_size
+            self.stats["evictions"] += 1
+
+    def invalidate(self, fingerprint: str = None, feature: str = None) -> int:
+        """Delete entries for a graph fingerprint and/or feature (everything if neither)."""
+        prefix = fingerprint[:24] if fingerprint else "*"
+        pattern = f"{prefix}__{feature}__*.npz" if feature else f"{prefix}__*.npz"
+        removed = 0
+        for p in self.path.glob(pattern):
+            p.unlink(missing_ok=True)
+            removed += 1
+        return removed
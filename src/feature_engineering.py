@@ -1,26 +1,154 @@
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import networkx as nx
 from networkx.algorithms.community import greedy_modularity_communities
 
-def compute_inter_intra_ratios(G, feature_name="inter_intra_ratio"):
-    comms = list(greedy_modularity_communities(G))
-    node2comm = {n: i for i, c in enumerate(comms) for n in c}
-    for node in G.nodes():
-        comm = node2comm.get(node)
-        if comm is None:
-            ratio = None
-        else:
-            intra = sum(node2comm.get(nb) == comm for nb in G.neighbors(node))
-            inter = sum(node2comm.get(nb) != comm for nb in G.neighbors(node))
-            if intra == 0 and inter > 0:
-                ratio = float("inf")
-            elif intra:
-                ratio = inter / intra
-            else:
-                ratio = 0
+import metrics
+from feature_cache import FeatureCache, graph_fingerprint
+
+def _greedy_modularity(G, seed=None, **kwargs):
+    return greedy_modularity_communities(G, **kwargs)
+
+def _louvain(G, seed=None, **kwargs):
+    # Undirected modularity: the directed variant is much slower in networkx
+    return nx.community.louvain_communities(G.to_undirected(as_view=True), seed=seed, **kwargs)
+
+def _leiden_available() -> bool:
+    # networkx itself only dispatches leiden_communities to backends (e.g. nx-cugraph)
+    leiden = getattr(nx.community, "leiden_communities", None)
+    return leiden is not None and bool(getattr(leiden, "backends", None))
+
+def _leiden(G, seed=None, **kwargs):
+    # Undirected graphs only
+    return nx.community.leiden_communities(G.to_undirected(as_view=True), seed=seed, **kwargs)
+
+def _label_propagation(G, seed=None, max_iter=30):
+    """Semi-synchronous label propagation over edge arrays, ignoring edge direction.
+
+    Each round every node computes the most frequent label among its neighbors
+    (keeping its own on ties, otherwise breaking ties at random) and a random half
+    of the nodes adopt it, which avoids the oscillation of fully synchronous updates.
+    """
+    nodes = list(G.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    n = len(nodes)
+    src = np.fromiter((index[u] for u, _ in G.edges()), dtype=np.int64, count=G.number_of_edges())
+    dst = np.fromiter((index[v] for _, v in G.edges()), dtype=np.int64, count=G.number_of_edges())
+    keep = src != dst
+    u = np.concatenate([src[keep], dst[keep]])
+    v = np.concatenate([dst[keep], src[keep]])
+
+    rng = np.random.default_rng(seed)
+    labels = np.arange(n, dtype=np.int64)
+    has_neighbors = np.bincount(u, minlength=n) > 0
+
+    for _ in range(max_iter):
+        pairs, counts = np.unique(u * n + labels[v], return_counts=True)
+        node, label = pairs // n, pairs % n
+        score = 2 * counts + (label == labels[node]) + rng.random(len(pairs)) * 0.5
+        order = np.lexsort((score, node))
+        last = np.flatnonzero(np.append(node[order][1:] != node[order][:-1], True))
+        best = labels.copy()
+        best[node[order][last]] = label[order][last]
+
+        changed = (best != labels) & has_neighbors
+        if not changed.any():
+            break
+        update = changed & (rng.random(n) < 0.5)
+        labels[update] = best[update]
+
+    communities = {}
+    for node, label in zip(nodes, labels.tolist()):
+        communities.setdefault(label, set()).add(node)
+    return list(communities.values())
+
+COMMUNITY_METHODS = {
+    "greedy_modularity": _greedy_modularity,
+    "louvain": _louvain,
+    "label_propagation": _label_propagation,
+}
+if _leiden_available():
+    COMMUNITY_METHODS["leiden"] = _leiden
+
+def detect_communities(G, method="greedy_modularity", seed=None, **kwargs):
+    """Partition G into communities with one of COMMUNITY_METHODS (or a callable).
+
+    A callable is called as `method(G, seed=seed, **kwargs)`, like the built-in methods.
+    "leiden" is only available with a networkx backend that implements it.
+    """
+    if callable(method):
+        return list(method(G, seed=seed, **kwargs))
+    if method == "leiden" and method not in COMMUNITY_METHODS:
+        raise ValueError(
+            "Community method 'leiden' needs a networkx backend that implements "
+            "leiden_communities (e.g. nx-cugraph)")
+    if method not in COMMUNITY_METHODS:
+        raise ValueError(f"Unknown community method '{method}', expected one of {list(COMMUNITY_METHODS)}")
+    return list(COMMUNITY_METHODS[method](G, seed=seed, **kwargs))
+
+def compute_inter_intra_ratios(G, feature_name="inter_intra_ratio", method="greedy_modularity",
+                               seed=None, communities=None, community_attr="community", **community_kwargs):
+    """Ratio of neighbors outside vs. inside each node's community.
+
+    Neighbors are successors, as returned by G.neighbors. The ratio is
+    inter / max(intra, 1), so a node whose successors all lie in other communities
+    gets its inter count rather than an infinite value, and a node without
+    successors gets 0. Counts for all nodes are taken at once from edge arrays and
+    a community label array. Pass `communities` to reuse an existing partition
+    instead of detecting one. Each node's community label is stored under
+    `community_attr` (None for nodes outside the partition) so the partition can
+    be reused later, e.g. by AnomalyScorer.
+    """
+    comms = communities if communities is not None else detect_communities(G, method, seed=seed, **community_kwargs)
+    nodes = list(G.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+
+    labels = np.full(len(nodes), -1, dtype=np.int64)
+    for i, comm in enumerate(comms):
+        labels[[index[node] for node in comm]] = i
+
+    n_edges = G.number_of_edges()
+    src = np.fromiter((index[u] for u, _ in G.edges()), dtype=np.int64, count=n_edges)
+    dst = np.fromiter((index[v] for _, v in G.edges()), dtype=np.int64, count=n_edges)
+    same = labels[src] == labels[dst]
+    intra = np.bincount(src[same], minlength=len(nodes))
+    inter = np.bincount(src[~same], minlength=len(nodes))
+    ratios = inter / np.maximum(intra, 1)
+
+    no_neighbors = (intra + inter == 0).tolist()
+    for node, label, ratio, isolated in zip(nodes, labels.tolist(), ratios.tolist(), no_neighbors):
+        if label < 0:
+            label = ratio = None
+        elif isolated:
+            ratio = 0
         G.nodes[node][feature_name] = ratio
+        if community_attr is not None:
+            G.nodes[node][community_attr] = label
 
     return G
 
+def node_inter_intra_ratio(G, node, communities: dict):
+    """Inter/intra ratio of one node from a `{node: community label}` mapping.
+
+    Matches compute_inter_intra_ratios: None without a community, 0 without
+    successors and inter / max(intra, 1) otherwise.
+    """
+    label = communities.get(node)
+    if label is None:
+        return None
+    inter = intra = 0
+    for neighbor in G.successors(node):
+        if communities.get(neighbor) == label:
+            intra += 1
+        else:
+            inter += 1
+    if inter + intra == 0:
+        return 0
+    return inter / max(intra, 1)
+
 def compute_clustering_coefficient(G, feature_name="clustering_coefficient"):
     clustering = nx.clustering(G)
     for node, value in clustering.items():
@@ -33,22 +161,203 @@ def compute_degree_centrality(G, feature_name="degree_centrality"):
         G.nodes[node][feature_name] = value
     return G
 
-def compute_betweenness_centrality(G, feature_name="betweenness_centrality"):
-    betweenness = nx.betweenness_centrality(G)
+def sample_size(n, epsilon, delta=0.1):
+    """Number of pivots for an additive error of `epsilon` with probability 1 - `delta`.
+
+    Hoeffding bound for pivot sampling (Eppstein & Wang), capped at the node count.
+    """
+    return min(n, math.ceil(math.log(2 * n / delta) / (2 * epsilon ** 2)))
+
+def select_pivots(G, k=None, epsilon=None, delta=0.1, seed=None):
+    """Return every node (exact) or a reproducible sample of `k` pivot nodes."""
+    nodes = list(G.nodes())
+    if k is None and epsilon is not None:
+        k = sample_size(len(nodes), epsilon, delta)
+    if k is None or k >= len(nodes):
+        return nodes
+    return random.Random(seed).sample(nodes, k)
+
+_worker_graph = None
+
+def _init_worker(G):
+    global _worker_graph
+    _worker_graph = G
+
+def _betweenness_partial(sources):
+    G = _worker_graph
+    return nx.betweenness_centrality_subset(G, sources, list(G.nodes()), normalized=False)
+
+def _closeness_partial(sources):
+    # Distances from each source are incoming distances of the nodes it reaches
+    G = _worker_graph
+    index = {node: i for i, node in enumerate(G.nodes())}
+    reached = np.zeros(len(index))
+    total = np.zeros(len(index))
+    for source in sources:
+        for node, dist in nx.single_source_shortest_path_length(G, source).items():
+            if dist > 0:
+                reached[index[node]] += 1
+                total[index[node]] += dist
+    return reached, total
+
+def _map_sources(G, fn, sources, n_jobs):
+    """Run `fn` over chunks of `sources`, in a process pool when n_jobs > 1."""
+    if n_jobs is None or n_jobs <= 1:
+        _init_worker(G)
+        try:
+            return [fn(sources)]
+        finally:
+            _init_worker(None)
+
+    chunks = [sources[i::n_jobs * 4] for i in range(n_jobs * 4)]
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(G,)) as pool:
+        return list(pool.map(fn, [c for c in chunks if c]))
+
+def compute_betweenness_centrality(G, feature_name="betweenness_centrality",
+                                   k=None, epsilon=None, delta=0.1, n_jobs=1, seed=None):
+    """Betweenness centrality, exact or approximated from sampled pivots.
+
+    Pass `k` (number of pivots) or `epsilon` (additive error bound, see sample_size)
+    to approximate, and `n_jobs` > 1 to split the source nodes across processes.
+    Pivots always come from select_pivots, so the result does not depend on
+    `n_jobs`. With the defaults this is exactly nx.betweenness_centrality.
+    """
+    if k is None and epsilon is None and (n_jobs is None or n_jobs <= 1):
+        betweenness = nx.betweenness_centrality(G)
+    else:
+        n = G.number_of_nodes()
+        sources = select_pivots(G, k, epsilon, delta, seed)
+        betweenness = dict.fromkeys(G.nodes(), 0.0)
+        for partial in _map_sources(G, _betweenness_partial, sources, n_jobs):
+            for node, value in partial.items():
+                betweenness[node] += value
+
+        # Same scaling as nx.betweenness_centrality(normalized=True)
+        scale = n / len(sources) if sources else 1.0
+        if n > 2:
+            scale /= (n - 1) * (n - 2)
+            if not G.is_directed():
+                scale *= 2
+        betweenness = {node: value * scale for node, value in betweenness.items()}
+
     for node, value in betweenness.items():
         G.nodes[node][feature_name] = value
     return G
 
-def compute_closeness_centrality(G, feature_name="closeness_centrality"):
-    closeness = nx.closeness_centrality(G)
+def node_closeness(reverse, node, n, limit=None):
+    """Closeness of one node from incoming distances, as in nx.closeness_centrality.
+
+    Runs a single BFS on a reverse view, where nx.closeness_centrality(G, u=node)
+    would copy the whole graph first. With `limit`, gives up and returns None once
+    more than `limit` nodes reach `node`.
+    """
+    if limit is None:
+        distances = nx.single_source_shortest_path_length(reverse, node)
+        total, reached = sum(distances.values()), len(distances) - 1
+    else:
+        total = reached = 0
+        seen = {node}
+        level = [node]
+        depth = 0
+        while level:
+            depth += 1
+            nxt = []
+            for u in level:
+                for v in reverse[u]:
+                    if v not in seen:
+                        seen.add(v)
+                        nxt.append(v)
+            if len(seen) > limit + 1:
+                return None
+            total += depth * len(nxt)
+            reached += len(nxt)
+            level = nxt
+    if total <= 0 or n <= 1:
+        return 0.0
+    return (reached / total) * (reached / (n - 1))
+
+def compute_closeness_centrality(G, feature_name="closeness_centrality",
+                                 k=None, epsilon=None, delta=0.1, n_jobs=1, seed=None):
+    """Closeness centrality, exact or approximated from sampled pivots.
+
+    Uses incoming distances and the Wasserman-Faust correction like
+    nx.closeness_centrality. With `k` or `epsilon`, the number of nodes reaching each
+    node and their mean distance are estimated from BFS runs out of sampled pivots;
+    `n_jobs` > 1 splits those runs across processes.
+    """
+    if k is None and epsilon is None and (n_jobs is None or n_jobs <= 1):
+        closeness = nx.closeness_centrality(G)
+    else:
+        nodes = list(G.nodes())
+        index = {node: i for i, node in enumerate(nodes)}
+        sources = select_pivots(G, k, epsilon, delta, seed)
+
+        reached = np.zeros(len(nodes))
+        total = np.zeros(len(nodes))
+        for partial_reached, partial_total in _map_sources(G, _closeness_partial, sources, n_jobs):
+            reached += partial_reached
+            total += partial_total
+
+        # A node is never its own pivot, so it has one fewer candidate pivot if sampled
+        candidates = np.full(len(nodes), float(len(sources)))
+        candidates[[index[s] for s in sources]] -= 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.where(
+                total > 0, (reached / np.maximum(candidates, 1)) * (reached / total), 0.0)
+        closeness = dict(zip(nodes, values.tolist()))
+
     for node, value in closeness.items():
         G.nodes[node][feature_name] = value
     return G
 
-def add_structural_features(G):
-    G = compute_inter_intra_ratios(G)
-    G = compute_clustering_coefficient(G)
-    G = compute_betweenness_centrality(G)
-    G = compute_degree_centrality(G)
-    G = compute_closeness_centrality(G)
+def add_structural_features(G, k=None, epsilon=None, delta=0.1, n_jobs=1, seed=None,
+                            community_method="greedy_modularity", cache: FeatureCache = None):
+    """Add all structural features; centrality options are passed to both centralities.
+
+    With a FeatureCache, features already computed for the same node and edge sets
+    and parameters are read back instead of recomputed. Randomized features (sampled
+    centralities, louvain and label propagation communities) are only cached when
+    `seed` is set.
+    """
+    centrality_options = dict(k=k, epsilon=epsilon, delta=delta, seed=seed)
+    sampled = (k is not None or epsilon is not None) and seed is None
+    random_communities = community_method != "greedy_modularity" and seed is None
+    # (feature, function, parameters that define the result, execution-only options, cacheable)
+    steps = [
+        ("inter_intra_ratio", compute_inter_intra_ratios, dict(method=community_method, seed=seed), {},
+         not random_communities),
+        ("clustering_coefficient", compute_clustering_coefficient, {}, {}, True),
+        ("betweenness_centrality", compute_betweenness_centrality, centrality_options, {"n_jobs": n_jobs},
+         not sampled),
+        ("degree_centrality", compute_degree_centrality, {}, {}, True),
+        ("closeness_centrality", compute_closeness_centrality, centrality_options, {"n_jobs": n_jobs},
+         not sampled),
+    ]
+    # Node attributes a step sets besides its feature, cached along with it
+    companions = {"inter_intra_ratio": ["community"]}
+    fingerprint = graph_fingerprint(G) if cache is not None else None
+
+    for feature_name, compute, params, options, cacheable in steps:
+        use_cache = cache is not None and cacheable
+        columns = [feature_name, *companions.get(feature_name, [])]
+        with metrics.stage("structural_features", feature=feature_name):
+            if use_cache:
+                cached = {}
+                for column in columns:
+                    values = cache.get(G, fingerprint, column, params)
+                    if values is None:
+                        break
+                    cached[column] = values
+                else:
+                    for column, values in cached.items():
+                        for node, value in values.items():
+                            G.nodes[node][column] = value
+                    continue
+
+            G = compute(G, feature_name=feature_name, **params, **options)
+
+            if use_cache:
+                for column in columns:
+                    values = {node: value for node, value in G.nodes(data=column)}
+                    cache.put(G, fingerprint, column, params, values)
     return G
@@ -0,0 +1,180 @@
+import numpy as np
+
+# Base features from the graph nodes, excluding "SourceRank" and some redundant ones
+FEATURES = [
+    "stars", "forks", "contributors",
+    "dependent_projects", "dependent_repositories",
+    "subscribers", "num_keywords", "num_optional_deps",
+    "is_deprecated", "is_unmaintained", "is_removed", "is_copycat", "is_typosquat_candidate",
+    "any_outdated_dependencies", "is_recent", "all_prereleases",
+    "sourcerank_missing", "missing_metadata",
+    "has_repo", "has_funding", "basic_info_present", "repository_present",
+    "readme_present", "license_present", "versions_present", "recent_release",
+    "not_brand_new", "one_point_oh",
+    # Structural features
+    "inter_intra_ratio", "clustering_coefficient", "betweenness_centrality",
+    "degree_centrality", "closeness_centrality"
+]
+
+# Positive indicators: more = better established
+POSITIVE_FEATURES = [
+    "stars", "forks", "contributors", "dependent_projects", "dependent_repositories",
+    "subscribers", "num_keywords", "num_optional_deps",
+]
+
+# Negative indicators: inverted so that good repos have HIGH values
+NEGATIVE_FEATURES = [
+    "is_deprecated", "is_unmaintained", "is_removed", "is_copycat", "is_typosquat_candidate",
+    "any_outdated_dependencies", "is_recent", "all_prereleases",
+    "sourcerank_missing", "missing_metadata"
+]
+
+# Binary indicators that are positive if present
+BINARY_POSITIVE_FEATURES = [
+    "has_repo", "has_funding", "core", "basic_info_present", "repository_present",
+    "readme_present", "license_present", "versions_present", "recent_release",
+    "not_brand_new", "one_point_oh"
+]
+
+STRUCTURAL_FEATURES = [
+    "inter_intra_ratio", "clustering_coefficient", "betweenness_centrality",
+    "degree_centrality", "closeness_centrality"
+]
+
+LOG_RECIPROCAL_EPS = 1e-10
+
+class FeatureMatrix:
+    """Node feature matrix as one C-contiguous float32 array.
+
+    Row `i` belongs to `nodes[i]`. When built with `core_first`, core packages occupy
+    the first `num_core` rows, so `core()` and `non_core()` are views rather than
+    copies. `global_max` holds the maxima used for log-reciprocal columns, to be
+    passed back when transforming other graphs consistently.
+    """
+
+    def __init__(self, values, columns, nodes, is_core, num_core=None, global_max=None):
+        self.values = values
+        self.columns = list(columns)
+        self.nodes = list(nodes)
+        self.is_core = is_core
+        self.num_core = num_core
+        self.global_max = dict(global_max or {})
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def core(self) -> np.ndarray:
+        if self.num_core is not None:
+            return self.values[:self.num_core]
+        return self.values[self.is_core]
+
+    def non_core(self) -> np.ndarray:
+        if self.num_core is not None:
+            return self.values[self.num_core:]
+        return self.values[~self.is_core]
+
+    def core_nodes(self) -> list:
+        if self.num_core is not None:
+            return self.nodes[:self.num_core]
+        return [node for node, core in zip(self.nodes, self.is_core.tolist()) if core]
+
+    def non_core_nodes(self) -> list:
+        if self.num_core is not None:
+            return self.nodes[self.num_core:]
+        return [node for node, core in zip(self.nodes, self.is_core.tolist()) if not core]
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, self.columns.index(name)]
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self.values, index=self.nodes, columns=self.columns, copy=False)
+
+def feature_layout(features=FEATURES, with_structural=False, log_reciprocal=()) -> list[tuple]:
+    """Return the matrix columns as contiguous `(transform, [(column, source)])` blocks.
+
+    A source is a node attribute, or for ratios the two log columns they divide.
+    The column order matches prepare_feature_matrix: binary indicators, log
+    features, inverted features, the two ratios, then log-reciprocal and structural
+    columns.
+    """
+    selected = set(features)
+    blocks = [
+        ("int", [(f, f) for f in features if f in BINARY_POSITIVE_FEATURES]),
+        ("log", [(f"{f}_log", f) for f in POSITIVE_FEATURES if f in selected]),
+        ("invert", [(f"{f}_invert", f) for f in NEGATIVE_FEATURES if f in selected]),
+        ("ratio", [(name, (f"{a}_log", f"{b}_log")) for name, (a, b) in
+                   (("engagement_ratio", ("forks", "stars")),
+                    ("maintenance_ratio", ("contributors", "dependent_projects")))
+                   if a in selected and b in selected]),
+        ("log_reciprocal", [(f"{f}_log_reciprocal", f) for f in log_reciprocal]),
+        ("log", [(f"{f}_log", f) for f in STRUCTURAL_FEATURES if with_structural and f in selected]),
+    ]
+    return [(transform, cols) for transform, cols in blocks if cols]
+
+def _read_column(node_data, attr, out):
+    """Fill `out` with an attribute of every node, None/missing as 0."""
+    out[:] = np.fromiter((data.get(attr) or 0 for data in node_data), dtype=np.float64,
+                         count=len(node_data))
+
+def build_feature_matrix(G, features=FEATURES, with_structural=False, nodes=None,
+                         log_reciprocal=(), global_max=None, core_first=True) -> FeatureMatrix:
+    """Build the anomaly-model feature matrix straight from node attribute columns.
+
+    Produces the same columns and values as prepare_feature_matrix (in float32),
+    without building per-node dicts or a DataFrame. Each attribute is read once into
+    its column of a preallocated array and every transform runs in place over a
+    contiguous block of columns. `log_reciprocal` adds `log1p(max / (x + eps))`
+    columns, with maxima from `global_max` or else from this graph's nodes.
+    """
+    if nodes is None:
+        nodes = list(G.nodes)
+    else:
+        nodes = list(nodes)
+    node_data = [G.nodes[node] for node in nodes]
+    is_core = np.fromiter((bool(data.get("is_core")) for data in node_data), dtype=bool, count=len(nodes))
+
+    num_core = None
+    if core_first:
+        order = np.argsort(~is_core, kind="stable")
+        nodes = [nodes[i] for i in order.tolist()]
+        node_data = [node_data[i] for i in order.tolist()]
+        is_core = is_core[order]
+        num_core = int(is_core.sum())
+
+    layout = feature_layout(features, with_structural, log_reciprocal)
+    columns = [name for _, cols in layout for name, _ in cols]
+    X = np.empty((len(nodes), len(columns)), dtype=np.float32)
+    global_max = dict(global_max or {})
+
+    start = 0
+    position = {}
+    for transform, cols in layout:
+        stop = start + len(cols)
+        block = X[:, start:stop]
+        for j, (name, attr) in enumerate(cols):
+            position[name] = start + j
+            if transform != "ratio":
+                _read_column(node_data, attr, block[:, j])
+
+        if transform == "int":
+            np.trunc(block, out=block)
+        elif transform == "log":
+            np.log1p(block, out=block)
+        elif transform == "invert":
+            np.subtract(1, block, out=block)
+        elif transform == "ratio":
+            for j, (_, (a, b)) in enumerate(cols):
+                np.divide(X[:, position[a]], X[:, position[b]] + np.float32(0.1), out=block[:, j])
+        elif transform == "log_reciprocal":
+            maxima = np.array([
+                global_max.setdefault(attr, float(block[:, j].max()) if len(nodes) else 0.0)
+                for j, (_, attr) in enumerate(cols)
+            ], dtype=np.float32)
+            block += np.float32(LOG_RECIPROCAL_EPS)
+            np.divide(maxima, block, out=block)
+            np.log1p(block, out=block)
+        start = stop
+
+    return FeatureMatrix(X, columns, nodes, is_core, num_core, global_max)
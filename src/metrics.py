@@ -0,0 +1,149 @@
+import json
+import time
+import bisect
+import threading
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+_enabled = False
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_stages = {}
+_gauges = {}
+_started = None
+_NULL_STAGE = nullcontext()
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+def enable():
+    """Start recording counters, histograms and stage timers (clearing earlier ones).
+
+    Recording is off by default; every call then returns after one flag check and
+    `stage()` hands back a shared no-op context manager.
+    """
+    global _enabled, _started
+    reset()
+    _started = time.time()
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def is_enabled() -> bool:
+    return _enabled
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _stages.clear()
+        _gauges.clear()
+
+def incr(name: str, value: float = 1, **labels):
+    """Add `value` to a counter."""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def gauge(name: str, value: float, **labels):
+    """Set a value that is reported as-is (e.g. a cache hit ratio)."""
+    if not _enabled:
+        return
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+def observe(name: str, value: float, **labels):
+    """Record one sample in a histogram with LATENCY_BUCKETS."""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    bucket = bisect.bisect_left(LATENCY_BUCKETS, value)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {
+                "count": 0, "sum": 0.0, "min": value, "max": value,
+                "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+        hist["count"] += 1
+        hist["sum"] += value
+        hist["min"] = min(hist["min"], value)
+        hist["max"] = max(hist["max"], value)
+        hist["buckets"][bucket] += 1
+
+class _Stage:
+    def __init__(self, key):
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            stage = _stages.get(self.key)
+            if stage is None:
+                stage = _stages[self.key] = {"calls": 0, "seconds": 0.0, "errors": 0}
+            stage["calls"] += 1
+            stage["seconds"] += elapsed
+            stage["errors"] += exc_type is not None
+        return False
+
+def stage(name: str, **labels):
+    """Context manager timing a named pipeline stage (accumulated over calls)."""
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(_key(name, labels))
+
+def _quantile(hist: dict, q: float) -> float:
+    """Approximate quantile: upper bound of the bucket holding the q-th sample."""
+    target = q * hist["count"]
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS + [hist["max"]], hist["buckets"]):
+        seen += count
+        if seen >= target:
+            return min(bound, hist["max"])
+    return hist["max"]
+
+def _entries(table: dict, render) -> list[dict]:
+    return [{"name": name, "labels": dict(labels), **render(value)}
+            for (name, labels), value in sorted(table.items(), key=lambda item: str(item[0]))]
+
+def snapshot() -> dict:
+    """Return everything recorded so far as plain JSON-serializable data."""
+    with _lock:
+        return {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "uptime_seconds": round(time.time() - _started, 3) if _started else 0.0,
+            "stages": _entries(_stages, lambda s: {**s, "seconds": round(s["seconds"], 6)}),
+            "counters": _entries(_counters, lambda v: {"value": v}),
+            "gauges": _entries(_gauges, lambda v: {"value": v}),
+            "histograms": _entries(_histograms, lambda h: {
+                "count": h["count"], "sum": round(h["sum"], 6), "min": h["min"], "max": h["max"],
+                "mean": h["sum"] / h["count"], "p50": _quantile(h, 0.5), "p95": _quantile(h, 0.95),
+                "p99": _quantile(h, 0.99), "buckets": dict(zip(map(str, LATENCY_BUCKETS + ["inf"]), h["buckets"])),
+            }),
+        }
+
+def write_snapshot(path, append: bool = False):
+    """Write a snapshot as JSON, or append it as one JSON line to build a time series."""
+    if not _enabled:
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if append:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(snapshot()) + "\n")
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(snapshot(), f, indent=2)
@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# Modules live under src/ and are imported as top-level modules (`data.x`, `metrics`)
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+# Synthetic records and the stub server are shared with the benchmarks
+sys.path.insert(0, str(ROOT / "benchmarks"))
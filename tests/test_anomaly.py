@@ -0,0 +1,63 @@
+import numpy as np
+import networkx as nx
+import pytest
+
+from anomaly import AnomalyScorer
+from data.graph import build_dependency_graph, node_attributes
+from feature_engineering import add_structural_features, node_closeness, node_inter_intra_ratio
+from synthetic import make_metadata
+
+@pytest.fixture(scope="module")
+def graph():
+    G = build_dependency_graph(make_metadata(150, seed=1))
+    return add_structural_features(G, community_method="label_propagation", seed=0)
+
+def test_fit_reuses_the_feature_partition(graph):
+    scorer = AnomalyScorer(with_structural=True, community_method="louvain").fit(graph)
+    assert scorer.communities == dict(graph.nodes(data="community"))
+    # Every stored ratio is reproduced from the reused partition
+    for node in graph:
+        assert node_inter_intra_ratio(graph, node, scorer.communities) == \
+            pytest.approx(graph.nodes[node]["inter_intra_ratio"])
+
+    partition = [set(list(graph)[:10]), set(list(graph)[10:])]
+    scorer = AnomalyScorer(with_structural=True).fit(graph, communities=partition)
+    assert set(scorer.communities.values()) == {0, 1}
+
+def test_score_new_packages(graph):
+    G = graph.copy()
+    scorer = AnomalyScorer(with_structural=True).fit(G)
+    targets = list(G)[:3]
+    G.add_node("brand-new", **node_attributes({"stars": 0}))
+    G.add_edges_from(("brand-new", t) for t in targets)
+    # A new package that depends on the first one
+    G.add_node("newer", **node_attributes({}))
+    G.add_edge("newer", "brand-new")
+
+    scores = scorer.score_new(G, ["brand-new", "newer"])
+    assert list(scores.index) == ["brand-new", "newer"]
+    assert np.isfinite(scores["score"]).all()
+
+    reverse = G.reverse(copy=False)
+    assert G.nodes["newer"]["closeness_centrality"] == 0.0
+    assert G.nodes["brand-new"]["closeness_centrality"] == pytest.approx(node_closeness(reverse, "brand-new", len(G)))
+    assert G.nodes["newer"]["betweenness_centrality"] == 0.0
+    # Neighbors and the depended-on new package wait for a full pass
+    assert scorer.stale == set(targets) | {"brand-new"}
+    assert G.nodes["brand-new"]["community"] == scorer.communities["brand-new"]
+
+def test_bounded_closeness():
+    G = nx.path_graph(6, create_using=nx.DiGraph)
+    reverse = G.reverse(copy=False)
+    assert node_closeness(reverse, 5, 6, limit=5) == pytest.approx(nx.closeness_centrality(G, 5))
+    assert node_closeness(reverse, 5, 6, limit=4) is None
+    assert node_closeness(reverse, 0, 6, limit=0) == 0.0
+
+def test_inter_intra_ratio_is_finite():
+    G = nx.DiGraph([("a", "b"), ("a", "c"), ("b", "c")])
+    G.add_node("d")
+    communities = {"a": 0, "b": 1, "c": 1, "d": 2}
+    # No successor of "a" shares its community: the ratio is its inter count
+    assert node_inter_intra_ratio(G, "a", communities) == 2
+    assert node_inter_intra_ratio(G, "b", communities) == 0
+    assert node_inter_intra_ratio(G, "d", communities) == 0
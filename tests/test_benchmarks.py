@@ -0,0 +1,39 @@
+import sys
+import json
+
+import data.graph
+from data.fetch import pypi, librariesio
+import run_benchmarks
+from synthetic import make_records, merge_records, package_names
+
+def test_synthetic_records_are_deterministic():
+    packages, sourcerank = make_records(50, seed=3)
+    assert (packages, sourcerank) == make_records(50, seed=3)
+    assert list(packages) == package_names(50)
+    assert len(set(packages)) == 50
+    for record in packages.values():
+        assert all(dep in packages for dep in record["runtime_dependencies"])
+
+    metadata = merge_records(packages, sourcerank)
+    for name, meta in metadata.items():
+        assert meta["sourcerank_missing"] == (name not in sourcerank)
+        assert "stars" not in sourcerank.get(name, {}) or meta["stars_sr"] == sourcerank[name]["stars"]
+
+def test_every_stage_runs(tmp_path, monkeypatch):
+    # The run repoints these module globals; monkeypatch restores them afterwards
+    for module, attr in ((data.graph, "RAW_DATA_DIR"), (data.graph, "SOURCERANK_DIR"),
+                         (pypi, "PYPI_URL"), (librariesio, "LIBRARIESIO_API_URL")):
+        monkeypatch.setattr(module, attr, getattr(module, attr))
+    out = tmp_path / "bench.json"
+    monkeypatch.setattr(sys, "argv", [
+        "run_benchmarks.py", "--sizes", "80", "--pivots", "16", "--fetch-packages", "5",
+        "--latency", "0", "--out", str(out)])
+    run_benchmarks.main()
+
+    with open(out, encoding="utf-8") as f:
+        results = json.load(f)["results"]
+    assert {r["stage"] for r in results} == set(run_benchmarks.STAGES) | {"merge_snapshots_nway"}
+    assert all(r["size"] == 80 and r["seconds"] >= 0 for r in results)
+    fetch = results[-1]
+    assert fetch["packages"] >= 5
+    assert fetch["server"]["200"] > 0
@@ -0,0 +1,77 @@
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import data.fetch.ratelimit as ratelimit
+from data.fetch.cache import ResponseCache, cache_key
+from data.fetch.client import HttpClient
+from stub_server import StubServer
+from synthetic import make_records
+
+def response(body: bytes, **headers) -> requests.Response:
+    res = requests.Response()
+    res.status_code = 200
+    res.headers = CaseInsensitiveDict(headers)
+    res._content = body
+    return res
+
+def test_cache_key_drops_api_key():
+    assert cache_key("https://Libraries.io/api/x?api_key=secret&b=2", {"a": 1}) == \
+        "https://libraries.io/api/x?a=1&b=2"
+
+def test_eviction_keeps_running_total(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite", max_bytes=250)
+    for i in range(3):
+        cache.store(f"k{i}", response(b"x" * 100))
+    # The oldest entry goes once the third store passes the budget
+    assert cache.total_bytes == 200
+    assert cache.stats["evictions"] == 1
+    assert cache.lookup("k0") is None
+
+    cache.lookup("k1")
+    cache.store("k2", response(b"x" * 40))
+    assert cache.total_bytes == 140
+    cache.store("k3", response(b"x" * 150))
+    # k2 was replaced after k1's lookup, so k1 is now the least recently used
+    assert cache.lookup("k1") is None
+    assert cache.total_bytes == 190
+    cache.close()
+
+    # The total is rebuilt from the table on reopen
+    reopened = ResponseCache(tmp_path / "cache.sqlite", max_bytes=250)
+    assert reopened.total_bytes == 190
+    reopened.clear()
+    assert reopened.total_bytes == 0
+    reopened.close()
+
+def test_304_revalidation(tmp_path, monkeypatch):
+    monkeypatch.setattr(ratelimit, "_buckets", {})
+    with StubServer(*make_records(2), script=[(304, {"ETag": '"v2"'})]) as server:
+        url = f"{server.url}/pypi/anything/json"
+        cache = ResponseCache(tmp_path / "cache.sqlite", ttl=0)
+        cache.store(cache_key(url), response(b'{"v": 1}', ETag='"v1"'))
+        entry = cache.lookup(cache_key(url))
+        assert not entry["fresh"]
+        assert cache.conditional_headers(entry) == {"If-None-Match": '"v1"'}
+
+        client = HttpClient(cache=cache)
+        res = client.get(url)
+        assert res.status_code == 200
+        assert res.content == b'{"v": 1}'
+        assert res.from_cache
+        assert cache.stats["revalidated"] == 1
+        assert cache.lookup(cache_key(url))["headers"]["ETag"] == '"v2"'
+        client.close()
+    assert server.stats[304] == 1
+
+def test_fresh_entries_skip_the_network(tmp_path, monkeypatch):
+    monkeypatch.setattr(ratelimit, "_buckets", {})
+    with StubServer(*make_records(2)) as server:
+        url = f"{server.url}/pypi/anything/json"
+        cache = ResponseCache(tmp_path / "cache.sqlite", ttl=3600)
+        cache.store(cache_key(url), response(b"{}"))
+        client = HttpClient(cache=cache)
+        assert client.get(url).content == b"{}"
+        assert cache.hit_ratio() == pytest.approx(1.0)
+        client.close()
+    assert server.stats["requests"] == 0
@@ -0,0 +1,47 @@
+import networkx as nx
+import pytest
+
+from feature_engineering import (
+    compute_betweenness_centrality,
+    compute_closeness_centrality,
+    node_closeness,
+    sample_size,
+    select_pivots,
+)
+
+@pytest.fixture(scope="module")
+def graph():
+    return nx.gnp_random_graph(60, 0.05, seed=7, directed=True)
+
+def feature(G, name):
+    return dict(G.nodes(data=name))
+
+@pytest.mark.parametrize("compute, reference", [
+    (compute_betweenness_centrality, nx.betweenness_centrality),
+    (compute_closeness_centrality, nx.closeness_centrality),
+])
+def test_exact_matches_networkx(graph, compute, reference):
+    expected = reference(graph)
+    serial = feature(compute(graph.copy(), feature_name="c"), "c")
+    parallel = feature(compute(graph.copy(), feature_name="c", n_jobs=2), "c")
+    assert serial == pytest.approx(expected)
+    assert parallel == pytest.approx(expected)
+
+@pytest.mark.parametrize("compute", [compute_betweenness_centrality, compute_closeness_centrality])
+def test_sampled_does_not_depend_on_n_jobs(graph, compute):
+    serial = feature(compute(graph.copy(), feature_name="c", k=20, seed=1), "c")
+    parallel = feature(compute(graph.copy(), feature_name="c", k=20, seed=1, n_jobs=2), "c")
+    assert serial == pytest.approx(parallel)
+    assert serial != pytest.approx(feature(compute(graph.copy(), feature_name="c"), "c"))
+
+def test_node_closeness(graph):
+    expected = nx.closeness_centrality(graph)
+    reverse = graph.reverse(copy=False)
+    n = graph.number_of_nodes()
+    assert {u: node_closeness(reverse, u, n) for u in graph} == pytest.approx(expected)
+
+def test_pivots(graph):
+    assert select_pivots(graph) == list(graph)
+    assert select_pivots(graph, k=10, seed=3) == select_pivots(graph, k=10, seed=3)
+    assert len(select_pivots(graph, epsilon=0.5)) == sample_size(60, 0.5)
+    assert sample_size(60, 0.01) == 60
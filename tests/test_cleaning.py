@@ -0,0 +1,26 @@
+from data.cleaning import clean_metadata, dependency_names
+from data.fetch.pypi import requires_dist_dependencies
+
+def clean(requires_dist):
+    return clean_metadata({"dependencies": requires_dist_dependencies(requires_dist)})
+
+def test_requirement_pairs_keep_their_conditions():
+    meta = clean(["requests>=2", "requests<3; python_version<'3.8'", "Requests>=2",
+                  "pytest; extra == 'test'", "numpy", "idna (>=2.5)"])
+
+    assert meta["runtime_dependencies"] == ["idna", "numpy", "requests"]
+    assert meta["optional_dependencies"] == ["test:pytest"]
+    assert meta["dependency_requirements"] == {
+        "idna": [{"specifier": ">=2.5"}],
+        "requests": [
+            {"specifier": ">=2"},
+            {"specifier": "<3", "marker": "python_version<'3.8'"},
+        ],
+        "test:pytest": [{"marker": "extra == 'test'"}],
+    }
+    assert dependency_names(meta) == {"idna", "numpy", "pytest", "requests"}
+
+def test_unconstrained_entry_is_kept_next_to_conditional_ones():
+    meta = clean(["six", "six>=1.16; python_version<'3'"])
+    assert meta["dependency_requirements"] == {
+        "six": [{}, {"specifier": ">=1.16", "marker": "python_version<'3'"}]}
@@ -0,0 +1,83 @@
+import time
+import threading
+
+import pytest
+
+import data.fetch.ratelimit as ratelimit
+from data.fetch.client import HttpClient, parse_retry_after
+from stub_server import StubServer
+from synthetic import make_records
+
+@pytest.fixture(scope="module")
+def records():
+    return make_records(5, seed=0)
+
+@pytest.fixture(autouse=True)
+def no_rate_limits(monkeypatch):
+    # The stub server's host has no default limit; tests set their own
+    monkeypatch.setattr(ratelimit, "_buckets", {})
+
+def package_url(server, records):
+    name = next(iter(records[0]))
+    return f"{server.url}/pypi/{name}/json"
+
+def test_retries_429_and_503(records):
+    script = [(429, {"Retry-After": "0"}), (503, {}), (503, {})]
+    with StubServer(*records, script=script) as server:
+        client = HttpClient(backoff_base=0.01, backoff_max=0.05)
+        res = client.get(package_url(server, records))
+        client.close()
+    assert res.status_code == 200
+    assert server.stats["requests"] == 4
+    assert (server.stats[429], server.stats[503], server.stats[200]) == (1, 2, 1)
+
+def test_gives_up_after_max_retries(records):
+    with StubServer(*records, script=[(503, {})] * 5) as server:
+        client = HttpClient(max_retries=2, backoff_base=0.01, backoff_max=0.05)
+        res = client.get(package_url(server, records))
+        client.close()
+    assert res.status_code == 503
+    assert server.stats["requests"] == 3
+
+def test_honors_retry_after(records):
+    with StubServer(*records, script=[(429, {"Retry-After": "0.4"})]) as server:
+        client = HttpClient(backoff_base=0.001, backoff_max=5.0)
+        start = time.perf_counter()
+        res = client.get(package_url(server, records))
+        elapsed = time.perf_counter() - start
+        client.close()
+    assert res.status_code == 200
+    assert elapsed >= 0.4
+
+def test_parse_retry_after():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+
+def test_rate_limit(records):
+    with StubServer(*records) as server:
+        ratelimit.set_rate_limit(server.url, rate=20, capacity=1)
+        client = HttpClient()
+        start = time.perf_counter()
+        for _ in range(6):
+            assert client.get(package_url(server, records)).status_code == 200
+        elapsed = time.perf_counter() - start
+        client.close()
+    # One free request, then five spaced 1/20 s apart
+    assert elapsed >= 5 / 20 - 0.02
+
+def test_host_concurrency(records):
+    with StubServer(*records, latency=0.1) as server:
+        host = ratelimit.host_of(server.url)
+        client = HttpClient(host_concurrency={host: 2})
+        url = package_url(server, records)
+        threads = [threading.Thread(target=client.get, args=(url,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        client.close()
+    assert server.stats["requests"] == 8
+    assert server.stats["max_in_flight"] == 2
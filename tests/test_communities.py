@@ -0,0 +1,52 @@
+import networkx as nx
+import pytest
+
+import feature_engineering
+from feature_engineering import (
+    COMMUNITY_METHODS,
+    detect_communities,
+    compute_inter_intra_ratios,
+    node_inter_intra_ratio,
+)
+
+@pytest.fixture(scope="module")
+def graph():
+    G = nx.gnp_random_graph(80, 0.04, seed=2, directed=True)
+    G.add_node("isolated")
+    return G
+
+@pytest.mark.parametrize("method", sorted(COMMUNITY_METHODS))
+def test_methods_partition_every_node(graph, method):
+    communities = detect_communities(graph, method, seed=0)
+    assert sorted(n for comm in communities for n in map(str, comm)) == sorted(map(str, graph))
+
+def test_vectorized_ratios_match_per_node(graph):
+    communities = detect_communities(graph, "label_propagation", seed=0)
+    # Leave one node without a community
+    left_out = next(iter(communities[0]))
+    communities[0] = set(communities[0]) - {left_out}
+    G = compute_inter_intra_ratios(graph.copy(), communities=communities)
+
+    labels = {node: i for i, comm in enumerate(communities) for node in comm}
+    expected = {node: node_inter_intra_ratio(graph, node, labels) for node in graph}
+    assert dict(G.nodes(data="inter_intra_ratio")) == expected
+    assert expected[left_out] is None
+    assert expected["isolated"] == 0
+
+def test_label_propagation_is_reproducible(graph):
+    first = detect_communities(graph, "label_propagation", seed=5)
+    assert detect_communities(graph, "label_propagation", seed=5) == first
+
+def test_callable_and_unknown_methods(graph):
+    def one_community(G, seed=None):
+        return [set(G)]
+
+    G = compute_inter_intra_ratios(graph.copy(), method=one_community)
+    assert all(ratio == 0 for ratio in dict(G.nodes(data="inter_intra_ratio")).values())
+    with pytest.raises(ValueError):
+        detect_communities(graph, "no-such-method")
+
+def test_leiden_needs_a_backend(graph, monkeypatch):
+    monkeypatch.delitem(feature_engineering.COMMUNITY_METHODS, "leiden", raising=False)
+    with pytest.raises(ValueError, match="backend"):
+        detect_communities(graph, "leiden")
@@ -0,0 +1,66 @@
+import pytest
+
+from data.fetch.crawler import DependencyCrawler
+
+DEPENDENCIES = {
+    "a": ["b", "c"],
+    "b": ["d"],
+    "c": ["d", "e"],
+    "d": ["f"],
+    "e": ["b"],
+    "f": [],
+}
+
+EXPECTED = {"a": 0, "b": 1, "c": 1, "d": 2, "e": 2}
+
+class Fetcher:
+    """Returns DEPENDENCIES and records calls, interrupting the crawl after `stop_after`."""
+
+    def __init__(self, stop_after=None):
+        self.calls = []
+        self.stop_after = stop_after
+
+    def __call__(self, name):
+        if self.stop_after is not None and len(self.calls) == self.stop_after:
+            raise KeyboardInterrupt
+        self.calls.append(name)
+        return DEPENDENCIES[name]
+
+def test_crawl_levels():
+    fetch = Fetcher()
+    visited = DependencyCrawler(fetch, max_depth=2, workers=3).crawl(["a"])
+    assert visited == EXPECTED
+    assert sorted(fetch.calls) == sorted(EXPECTED)
+    # Level by level: nothing deeper starts before the shallower level is done
+    depths = [EXPECTED[name] for name in fetch.calls]
+    assert depths == sorted(depths)
+
+def test_resume(tmp_path):
+    state_path = tmp_path / "crawl.json"
+    first = Fetcher(stop_after=3)
+    with pytest.raises(KeyboardInterrupt):
+        DependencyCrawler(first, max_depth=2, workers=1, state_path=state_path,
+                          save_every=1).crawl(["a"])
+    assert state_path.exists()
+
+    second = Fetcher()
+    crawler = DependencyCrawler(second, max_depth=5, workers=1, state_path=state_path)
+    assert crawler.load_state()
+    # The saved depth wins, so the resumed crawl covers the same packages
+    assert crawler.max_depth == 2
+    assert crawler.crawl() == EXPECTED
+    assert not set(first.calls) & set(second.calls)
+    assert sorted(first.calls + second.calls) == sorted(EXPECTED)
+
+def test_errors_are_reported_and_not_expanded():
+    seen = []
+
+    def fetch(name):
+        if name == "b":
+            raise ValueError("boom")
+        return DEPENDENCIES[name]
+
+    visited = DependencyCrawler(fetch, max_depth=2, workers=1).crawl(
+        ["a"], progress=lambda name, deps, error: seen.append((name, error is not None)))
+    assert visited == EXPECTED
+    assert ("b", True) in seen
@@ -0,0 +1,61 @@
+import numpy as np
+import networkx as nx
+
+from data.csr import CSRGraph, Column, ABSENT
+
+def make_graph():
+    G = nx.DiGraph()
+    G.graph["num_core_packages"] = 2
+    G.add_node("pkg-b", is_core=True, license="MIT", stars=10, score=0.5)
+    G.add_node("pkg-a", is_core=False, license=None, stars=3, score=2)
+    G.add_node("pkg-c", keywords=["x", "y"])
+    G.add_edge("pkg-b", "pkg-c", kind="runtime", optional=False)
+    G.add_edge("pkg-b", "pkg-a", kind="test", optional=True, marker="python_version < '3.9'")
+    G.add_edge("pkg-c", "pkg-a")
+    G.add_edge("pkg-a", "pkg-b", kind="runtime")
+    return G
+
+def test_round_trip_keeps_order_and_attributes():
+    G = make_graph()
+    csr = CSRGraph.from_networkx(G)
+    H = csr.to_networkx()
+
+    assert list(H.nodes(data=True)) == list(G.nodes(data=True))
+    assert list(H.edges(data=True)) == list(G.edges(data=True))
+    assert H.graph == G.graph
+    assert type(H.nodes["pkg-a"]["score"]) is int
+
+def test_adjacency_arrays():
+    G = make_graph()
+    csr = CSRGraph.from_networkx(G)
+    names = csr.names
+
+    assert (csr.number_of_nodes(), csr.number_of_edges()) == (3, 4)
+    for name, i in csr.index.items():
+        assert [names[j] for j in csr.successors(i)] == list(G.successors(name))
+        assert sorted(names[j] for j in csr.predecessors(i)) == sorted(G.predecessors(name))
+    assert csr.out_degree().tolist() == [G.out_degree(n) for n in names]
+    assert csr.in_degree().tolist() == [G.in_degree(n) for n in names]
+
+    # Every CSC slot maps back to the CSR edge it came from
+    for i in range(len(names)):
+        for slot in range(csr.in_indptr[i], csr.in_indptr[i + 1]):
+            assert csr.indices[csr.in_edge_ids[slot]] == i
+            assert csr.src[csr.in_edge_ids[slot]] == csr.in_indices[slot]
+
+    assert csr.edge_values("kind", decode=True) == [
+        G.edges[names[u], names[v]].get("kind", ABSENT)
+        for u, v in zip(csr.src.tolist(), csr.indices.tolist())]
+
+def test_column_encoding():
+    strings = Column.encode(["b", None, ABSENT, "a", "b"])
+    assert strings.values.dtype == np.int32
+    assert strings.categories == ["a", "b"]
+    assert strings.decode() == ["b", None, ABSENT, "a", "b"]
+
+    numbers = Column.encode([1, 2.5, None])
+    assert numbers.values.dtype == np.float64
+    assert [type(v) for v in numbers.decode()] == [int, float, type(None)]
+
+    assert Column.encode([True, False]).values.dtype == bool
+    assert Column.encode([["x"], {"a": 1}]).values.dtype == object
@@ -0,0 +1,100 @@
+import random
+
+import networkx as nx
+import pytest
+
+from dynamic_features import DynamicFeatureEngine
+
+def random_events(G, rng, n):
+    """Random inserts (some reciprocal, some to new nodes) and deletes, drawn from the current G."""
+    for i in range(n):
+        roll = rng.random()
+        if roll < 0.3 and G.number_of_edges():
+            yield ("delete", *rng.choice(list(G.edges)))
+        elif roll < 0.5 and G.number_of_edges():
+            u, v = rng.choice(list(G.edges))
+            yield ("insert", v, u)
+        elif roll < 0.6:
+            yield ("insert", rng.choice(list(G)), f"new{i}")
+        else:
+            yield ("insert", *rng.sample(list(G), 2))
+
+@pytest.fixture
+def graph():
+    G = nx.gnp_random_graph(40, 0.08, seed=3, directed=True)
+    return nx.relabel_nodes(G, {i: f"pkg{i}" for i in G})
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_clustering_matches_full_recount(graph, seed):
+    engine = DynamicFeatureEngine(graph, seed=0)
+    rng = random.Random(seed)
+    for kind, u, v in random_events(graph, rng, 150):
+        if kind == "insert":
+            engine.insert_edge(u, v)
+        else:
+            engine.delete_edge(u, v)
+        expected = nx.clustering(graph)
+        actual = dict(graph.nodes(data="clustering_coefficient"))
+        assert actual == pytest.approx(expected, abs=1e-12)
+
+def test_betweenness_stale_region_covers_replaced_paths():
+    G = nx.DiGraph([("s", "x"), ("x", "y"), ("y", "t"), ("s", "u"), ("v", "t")])
+    engine = DynamicFeatureEngine(G, seed=0)
+    engine.insert_edge("u", "v")
+    assert {"x", "y"} <= engine.stale["betweenness_centrality"]
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_stale_sets_cover_every_changed_centrality(graph, seed):
+    engine = DynamicFeatureEngine(graph, seed=0)
+    rng = random.Random(seed)
+    for kind, u, v in random_events(graph, rng, 60):
+        before = {
+            "betweenness_centrality": nx.betweenness_centrality(graph),
+            "closeness_centrality": nx.closeness_centrality(graph),
+        }
+        for stale in engine.stale.values():
+            stale.clear()
+        if kind == "insert":
+            engine.insert_edge(u, v)
+        else:
+            engine.delete_edge(u, v)
+        if len(graph) != len(before["closeness_centrality"]):
+            # A new node changes the normalization of every value
+            continue
+        after = {
+            "betweenness_centrality": nx.betweenness_centrality(graph),
+            "closeness_centrality": nx.closeness_centrality(graph),
+        }
+        for feature, values in after.items():
+            if feature in engine.stale_everywhere:
+                continue
+            changed = {node for node, value in values.items() if abs(value - before[feature][node]) > 1e-12}
+            assert changed <= engine.stale[feature], (kind, u, v, feature)
+
+def test_node_count_drift_recomputes_centralities(graph):
+    graph.add_node("root")
+    engine = DynamicFeatureEngine(graph, seed=0, tolerance=0.3)
+    # Edges into a sink only make the sink's closeness stale, however many nodes are added
+    for i in range(4):
+        engine.insert_edge(f"new{i}", "root")
+    report = engine.staleness()
+    # Closeness is scaled by n - 1 and betweenness by (n - 1)(n - 2)
+    assert report["closeness_centrality"] == pytest.approx(1 - 40 / 44)
+    assert report["betweenness_centrality"] == pytest.approx(1 - 40 * 39 / (44 * 43))
+    assert engine.enforce_bounds() == []
+
+    for i in range(4, 12):
+        engine.insert_edge(f"new{i}", "root")
+    assert engine.enforce_bounds() == ["betweenness_centrality"]
+    for i in range(12, 20):
+        engine.insert_edge(f"new{i}", "root")
+    assert engine.stale["closeness_centrality"] == {"root"}
+    assert engine.enforce_bounds() == ["closeness_centrality"]
+    assert dict(graph.nodes(data="closeness_centrality")) == pytest.approx(nx.closeness_centrality(graph))
+
+def test_fully_stale_features_skip_marking(graph):
+    engine = DynamicFeatureEngine(graph, seed=0, region_limit=1)
+    u, v = next((u, v) for u in graph for v in graph if u != v and not graph.has_edge(u, v) and graph.out_degree(v))
+    engine.insert_edge(u, v)
+    assert engine.stale_everywhere == set(engine.stale)
+    assert all(not nodes for nodes in engine.stale.values())
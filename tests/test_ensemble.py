@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+from sklearn.neighbors import LocalOutlierFactor
+
+from data.graph import build_dependency_graph
+from ensemble import model_grid, rank_average, run_ensemble, fit_and_score
+from feature_matrix import build_feature_matrix
+from synthetic import make_metadata
+
+@pytest.fixture(scope="module")
+def matrix():
+    return build_feature_matrix(build_dependency_graph(make_metadata(120, seed=5)))
+
+MODELS = (model_grid("iforest", IsolationForest, {"n_estimators": [20, 40], "random_state": [0]})
+          + model_grid("lof", LocalOutlierFactor, {"n_neighbors": [10]}))
+
+def test_model_grid_names_varying_params():
+    assert [name for name, _, _ in MODELS] == ["iforest[n_estimators=20]", "iforest[n_estimators=40]", "lof"]
+    assert MODELS[1][2] == {"n_estimators": 40, "random_state": 0}
+
+def test_rank_average():
+    combined = rank_average({"a": np.array([3.0, 1.0, 2.0]), "b": np.array([30.0, 20.0, 20.0])})
+    np.testing.assert_allclose(combined, [1.0, 0.125, 0.375])
+    with pytest.raises(ValueError):
+        rank_average({})
+
+def test_pool_matches_serial_run(matrix):
+    serial, report = run_ensemble(matrix, MODELS, n_jobs=1)
+    pooled, pooled_report = run_ensemble(matrix, MODELS, n_jobs=2, trace_memory=False)
+
+    assert list(serial.index) == matrix.nodes
+    assert list(serial.columns) == [name for name, _, _ in MODELS] + ["ensemble", "anomaly_votes"]
+    # Runs are deterministic, so where they ran does not change the result
+    np.testing.assert_array_equal(pooled.to_numpy(), serial.to_numpy())
+    np.testing.assert_allclose(serial["ensemble"], rank_average({n: serial[n] for n, _, _ in MODELS}))
+    assert list(report["model"]) == list(pooled_report["model"])
+    assert report["peak_alloc_bytes"].notna().all() and pooled_report["peak_alloc_bytes"].isna().all()
+
+    # LOF has no predict, so it is scored from the outlier factors of its training data
+    scores, _ = fit_and_score(LocalOutlierFactor, {"n_neighbors": 10}, matrix.values)
+    np.testing.assert_allclose(serial["lof"], scores)
+
+def test_several_matrices(matrix):
+    plain = matrix.values
+    scores, report = run_ensemble({"a": matrix, "b": plain}, MODELS[:1])
+    assert list(scores.columns[:2]) == ["a/iforest[n_estimators=20]", "b/iforest[n_estimators=20]"]
+    np.testing.assert_array_equal(scores.iloc[:, 0], scores.iloc[:, 1])
+    assert len(report) == 2
+    with pytest.raises(ValueError):
+        run_ensemble({"a": plain, "b": plain[:-1]}, MODELS[:1])
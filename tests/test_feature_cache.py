@@ -0,0 +1,59 @@
+import networkx as nx
+import pytest
+
+from feature_cache import FeatureCache, graph_fingerprint
+from feature_engineering import add_structural_features
+
+FEATURES = ["inter_intra_ratio", "community", "clustering_coefficient", "betweenness_centrality",
+            "degree_centrality", "closeness_centrality"]
+
+@pytest.fixture
+def graph():
+    return nx.gnp_random_graph(40, 0.08, seed=4, directed=True)
+
+def features(G):
+    return {name: dict(G.nodes(data=name)) for name in FEATURES}
+
+def test_fingerprint_ignores_insertion_order(graph):
+    shuffled = nx.DiGraph()
+    shuffled.add_nodes_from(reversed(list(graph)))
+    shuffled.add_edges_from(reversed(list(graph.edges)))
+    assert graph_fingerprint(shuffled) == graph_fingerprint(graph)
+    shuffled.add_edge(0, 39)
+    assert graph_fingerprint(shuffled) != graph_fingerprint(graph)
+
+def test_second_run_is_served_from_cache(graph, tmp_path):
+    cache = FeatureCache(tmp_path)
+    expected = features(add_structural_features(graph.copy(), cache=cache))
+    # Community labels are cached along with the ratios
+    assert cache.stats == {"hits": 0, "misses": 5, "evictions": 0}
+
+    cached = features(add_structural_features(graph.copy(), cache=cache))
+    assert cached == expected
+    assert cache.stats["hits"] == 6
+    assert all(type(label) is int for label in cached["community"].values())
+
+def test_unseeded_sampling_is_not_cached(graph, tmp_path):
+    cache = FeatureCache(tmp_path)
+    add_structural_features(graph.copy(), k=10, cache=cache)
+    add_structural_features(graph.copy(), k=10, cache=cache)
+    # Only the deterministic features (and community labels) are looked up
+    assert cache.stats["hits"] == 4
+    add_structural_features(graph.copy(), k=10, seed=1, cache=cache)
+    add_structural_features(graph.copy(), k=10, seed=1, cache=cache)
+    # The seed is part of the community parameters, so only two features hit on the first seeded run
+    assert cache.stats["hits"] == 4 + 2 + 6
+
+def test_none_values_and_eviction(graph, tmp_path):
+    cache = FeatureCache(tmp_path, max_bytes=1)
+    fingerprint = graph_fingerprint(graph)
+    values = {node: (None if node % 3 == 0 else node / 2) for node in graph}
+    cache.put(graph, fingerprint, "f", {"a": 1}, values)
+    # A single entry over budget is evicted right away
+    assert cache.get(graph, fingerprint, "f", {"a": 1}) is None
+
+    cache.max_bytes = 1 << 20
+    cache.put(graph, fingerprint, "f", {"a": 1}, values)
+    assert cache.get(graph, fingerprint, "f", {"a": 1}) == values
+    assert cache.get(graph, fingerprint, "f", {"a": 2}) is None
+    assert cache.invalidate(fingerprint) == 1
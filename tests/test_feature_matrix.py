@@ -0,0 +1,48 @@
+import numpy as np
+import networkx as nx
+import pytest
+
+from anomaly import prepare_feature_matrix
+from data.graph import build_dependency_graph
+from feature_engineering import add_structural_features, compute_inter_intra_ratios
+from feature_matrix import build_feature_matrix
+from synthetic import make_metadata
+
+@pytest.fixture(scope="module")
+def graph():
+    G = build_dependency_graph(make_metadata(120, seed=2))
+    return add_structural_features(G, community_method="label_propagation", seed=0)
+
+@pytest.mark.parametrize("with_structural", [False, True])
+def test_matches_prepare_feature_matrix(graph, with_structural):
+    expected = prepare_feature_matrix(graph, with_structural=with_structural)
+    X = build_feature_matrix(graph, with_structural=with_structural, core_first=False)
+
+    assert X.columns == list(expected.columns)
+    assert X.nodes == list(expected.index)
+    assert X.values.dtype == np.float32 and X.values.flags.c_contiguous
+    np.testing.assert_allclose(X.values, expected.to_numpy(dtype=np.float64), rtol=1e-5, atol=1e-6)
+
+def test_core_rows_first(graph):
+    X = build_feature_matrix(graph)
+    core = [node for node, is_core in graph.nodes(data="is_core") if is_core]
+    assert X.core_nodes() == core
+    assert X.num_core == len(core)
+    assert np.shares_memory(X.core(), X.values)
+
+    subset = list(graph)[::7]
+    np.testing.assert_allclose(
+        build_feature_matrix(graph, nodes=subset, core_first=False).values,
+        prepare_feature_matrix(graph, nodes=subset).to_numpy(dtype=np.float64), rtol=1e-5, atol=1e-6)
+
+def test_structural_columns_are_finite():
+    # Every successor of "a" is in another community
+    G = nx.DiGraph([("a", "b"), ("a", "c"), ("b", "c")])
+    for node in G:
+        G.nodes[node]["is_core"] = True
+    compute_inter_intra_ratios(G, communities=[{"a"}, {"b", "c"}])
+    assert G.nodes["a"]["inter_intra_ratio"] == 2
+
+    X = build_feature_matrix(G, with_structural=True)
+    assert np.isfinite(X.values).all()
+    assert X.column("inter_intra_ratio_log")[X.nodes.index("a")] == pytest.approx(np.log1p(2))
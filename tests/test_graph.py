@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import data.graph as graph
+from data.graph import build_dependency_graph, node_attributes
+from synthetic import make_records, write_raw_records
+
+@pytest.fixture
+def raw_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(graph, "RAW_DATA_DIR", tmp_path / "packages")
+    monkeypatch.setattr(graph, "SOURCERANK_DIR", tmp_path / "sourcerank")
+    (tmp_path / "packages").mkdir()
+    (tmp_path / "sourcerank").mkdir()
+    return tmp_path
+
+METADATA = {
+    "app": {
+        "rank": 5, "stars": 10, "forks": 1, "normalized_licenses": ["MIT"],
+        "repository_url": "https://github.com/org/shared",
+        "runtime_dependencies": ["Requests", "lib"],
+        "optional_dependencies": ["test:pytest"],
+        "dependency_requirements": {
+            "requests": [{"specifier": "<3", "marker": "python_version < '3.8'"}, {"specifier": ">=2"}],
+        },
+    },
+    "lib": {
+        "rank": 3, "repository_url": "https://github.com/org/shared",
+        "runtime_dependencies": ["requests"],
+        # Written before every requirement pair was kept
+        "dependency_requirements": {"requests": {"specifier": ">=1", "marker": "os_name == 'nt'"}},
+    },
+}
+
+def test_bulk_build(raw_dirs):
+    with open(raw_dirs / "packages" / "pytest.json", "w", encoding="utf-8") as f:
+        json.dump({"name": "pytest", "stars": 42}, f)
+    G = build_dependency_graph(METADATA, dependency_metadata={"requests": {"stars": 7}})
+
+    # Core packages first, then dependencies in first-seen order
+    assert list(G) == ["app", "lib", "requests", "pytest"]
+    assert G.graph["num_core_packages"] == 2
+    # The unconditional requirement applies to the edge
+    assert G.edges["app", "requests"] == {"kind": "runtime", "optional": False, "specifier": ">=2"}
+    assert G.edges["lib", "requests"] == {"kind": "runtime", "optional": False,
+                                          "specifier": ">=1", "marker": "os_name == 'nt'"}
+    assert G.edges["app", "pytest"] == {"kind": "test", "optional": True}
+    assert sorted(G.edges) == [("app", "lib"), ("app", "pytest"), ("app", "requests"), ("lib", "requests")]
+
+    # Typosquat features are added on top of the metadata attributes
+    expected = node_attributes({"stars": 7})
+    assert {k: G.nodes["requests"][k] for k in expected} == expected
+    assert G.nodes["pytest"]["stars"] == 42
+    assert G.nodes["app"]["is_core"] and not G.nodes["requests"]["is_core"]
+    # Both core packages share a repository
+    assert G.nodes["app"]["is_copycat"] and G.nodes["lib"]["is_copycat"]
+    assert not G.nodes["pytest"]["is_copycat"]
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_parallel_build_matches_sequential(raw_dirs, n_jobs):
+    packages, sourcerank = make_records(60, seed=4)
+    write_raw_records(raw_dirs, packages, sourcerank)
+    # Only part of the packages are core, so the rest are loaded as dependencies
+    names = list(packages)[::3]
+
+    expected = build_dependency_graph(graph.load_metadata(names))
+    G = graph.build_dependency_graph_parallel(names, n_jobs=n_jobs, shards_per_job=3)
+    assert G.number_of_nodes() > len(names)
+    assert list(G.nodes(data=True)) == list(expected.nodes(data=True))
+    assert list(G.edges(data=True)) == list(expected.edges(data=True))
+    assert G.graph == expected.graph
@@ -0,0 +1,48 @@
+import networkx as nx
+
+from data.graph import build_dependency_graph, load_metadata_from_store
+from data.incremental import make_manifest, update_dependency_graph
+from data.store import PackageStore
+from synthetic import make_records
+
+def full_build(store, names):
+    metadata, dependency_metadata = load_metadata_from_store(store, names)
+    return build_dependency_graph(metadata, dependency_metadata)
+
+def graph_state(G):
+    return (dict(G.nodes(data=True)),
+            {(u, v): data for u, v, data in G.edges(data=True)},
+            G.graph)
+
+def test_incremental_update_equals_full_rebuild(tmp_path):
+    packages, sourcerank = make_records(80, seed=3)
+    names = list(packages)
+    store = PackageStore(tmp_path / "store.sqlite")
+    store.upsert_packages([packages[n] for n in names[:70]])
+    store.upsert_sourcerank({n: sourcerank[n] for n in names[:70] if n in sourcerank})
+
+    core = names[5:70]
+    G = full_build(store, core)
+    manifest = make_manifest(G, set(core), store)
+
+    # Change core records and a dependency-only record, add packages and drop some
+    changed = dict(packages[names[10]], stars=12345, runtime_dependencies=[names[75], names[0]])
+    store.upsert_packages([changed, dict(packages[names[2]], forks=99)])
+    store.upsert_packages([packages[n] for n in names[70:]])
+    store.upsert_sourcerank({names[20]: {"stars": 1}})
+    core = names[8:60] + names[70:]
+
+    H, manifest, summary = update_dependency_graph(G, manifest, core, store)
+    expected = full_build(store, core)
+
+    assert graph_state(H) == graph_state(expected)
+    assert summary["core_added"] == 10
+    assert summary["core_removed"] == 13
+    assert summary["core_changed"] == 2
+
+    # A second update with nothing changed is a no-op
+    before = graph_state(nx.DiGraph(H))
+    H, _, summary = update_dependency_graph(H, manifest, core, store)
+    assert graph_state(H) == before
+    assert summary["core_changed"] == summary["core_added"] == summary["dependencies_changed"] == 0
+    store.close()
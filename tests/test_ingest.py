@@ -0,0 +1,61 @@
+import csv
+import json
+import types
+
+import pytest
+
+from data.ingest import read_distribution_export, ingest_distributions
+from data.store import PackageStore
+
+# Several releases per project, under names that normalize alike
+ROWS = [
+    {"name": "Foo.Bar", "version": "1.0", "upload_time": "2023-01-01 00:00:00", "requires_dist": ["requests>=2"]},
+    {"name": "foo_bar", "version": "2.0", "upload_time": "2024-06-01 00:00:00", "requires_dist": ["numpy"]},
+    # A second file of the same release
+    {"name": "foo-bar", "version": "2.0", "upload_time": "2024-06-01 00:00:00", "requires_dist": ["scipy"]},
+    {"name": "foo.bar", "version": "1.5", "upload_time": "2023-09-01 00:00:00", "requires_dist": []},
+    {"name": "Baz", "version": "0.1", "upload_time": "2022-01-01 00:00:00",
+     "requires_dist": ["pytest; extra == 'test'"]},
+]
+
+def write_export(path):
+    if path.suffix == ".jsonl":
+        with open(path, "w", encoding="utf-8") as f:
+            for row in ROWS:
+                f.write(json.dumps(row) + "\n")
+    else:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(ROWS[0]))
+            writer.writeheader()
+            for row in ROWS:
+                writer.writerow({**row, "requires_dist": json.dumps(row["requires_dist"])})
+    return path
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl"])
+def test_export_keeps_latest_row_per_project(tmp_path, suffix):
+    rows = read_distribution_export(write_export(tmp_path / f"export{suffix}"))
+    # Rows are streamed rather than collected
+    assert isinstance(rows, types.GeneratorType)
+    rows = list(rows)
+    assert [(row["name"], row["version"]) for row in rows] == [("foo_bar", "2.0"), ("Baz", "0.1")]
+
+def test_unsupported_export(tmp_path):
+    with pytest.raises(ValueError):
+        list(read_distribution_export(tmp_path / "export.xlsx"))
+
+def test_ingest_merges_into_existing_records(tmp_path):
+    store = PackageStore(tmp_path / "store.sqlite")
+    store.upsert_packages([{"name": "Foo.Bar", "stars": 12, "latest_release_number": "0.9"}])
+    rows = read_distribution_export(write_export(tmp_path / "export.jsonl"))
+
+    assert ingest_distributions(store, rows, batch_size=1) == 2
+    records = store.read_packages()
+    assert records["foo-bar"]["stars"] == 12
+    assert records["foo-bar"]["latest_release_number"] == "2.0"
+    assert records["foo-bar"]["runtime_dependencies"] == ["numpy"]
+    assert records["foo-bar"]["name"] == "foo_bar"
+    assert records["baz"]["optional_dependencies"] == ["test:pytest"]
+
+    assert ingest_distributions(store, read_distribution_export(tmp_path / "export.jsonl"),
+                                names=["BAZ"], merge=False) == 1
+    store.close()
@@ -0,0 +1,59 @@
+import networkx as nx
+
+from data.load import merge_graph_snapshots, merge_top_and_recent_graphs
+
+def snapshots():
+    first = nx.DiGraph(num_core_packages=2)
+    first.add_node("a", is_core=True, stars=1)
+    first.add_node("b", is_core=False, stars=2)
+    first.add_edge("a", "b", kind="runtime")
+
+    second = nx.DiGraph(num_core_packages=1)
+    second.add_node("b", is_core=True, stars=20)
+    second.add_node("c", stars=3)
+    second.add_edge("a", "b", kind="test")
+    second.add_edge("b", "c", kind="runtime")
+
+    third = nx.DiGraph()
+    third.add_node("d")
+    third.add_edge("c", "d")
+    return {"first": first, "second": second, "third": third}
+
+def test_merge_priority_and_flags():
+    graphs = snapshots()
+    G = merge_graph_snapshots(graphs)
+
+    assert list(G) == ["a", "b", "c", "d"]
+    # Attributes come from the first snapshot holding the node or edge
+    assert G.nodes["b"]["stars"] == 2
+    assert G.edges["a", "b"] == {"kind": "runtime"}
+    assert G.edges["c", "d"] == {}
+    # Core is OR-ed where set and left unset elsewhere
+    assert G.nodes["b"]["is_core"] is True
+    assert "is_core" not in G.nodes["c"]
+    assert G.nodes["b"]["snapshots"] == ["first", "second"]
+    assert G.graph == {"num_core_packages": 2, "snapshots": ["first", "second", "third"]}
+
+    # Same node and edge sets as composing the graphs one by one
+    composed = nx.compose_all(list(graphs.values()))
+    assert set(G) == set(composed) and set(G.edges) == set(composed.edges)
+    # Inputs are untouched
+    assert "snapshots" not in graphs["first"].nodes["a"]
+    G.edges["c", "d"]["kind"] = "x"
+    assert graphs["third"].edges["c", "d"] == {}
+
+def test_top_and_recent():
+    top = nx.DiGraph()
+    top.add_node("a", core=True)
+    top.add_node("b")
+    recent = nx.DiGraph()
+    recent.add_node("b")
+    recent.add_node("c", core=True)
+
+    G = merge_top_and_recent_graphs(top, recent)
+    assert dict(G.nodes(data=True)) == {
+        "a": {"core": True, "is_recent": False},
+        "b": {"core": False, "is_recent": True},
+        "c": {"core": True, "is_recent": True},
+    }
+    assert "snapshots" not in G.graph
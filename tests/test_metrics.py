@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+import metrics
+
+@pytest.fixture(autouse=True)
+def recording():
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+def entry(table, name, **labels):
+    return next(e for e in metrics.snapshot()[table] if e["name"] == name and e["labels"] == labels)
+
+def test_disabled_calls_record_nothing():
+    metrics.disable()
+    metrics.incr("c")
+    metrics.observe("h", 1.0)
+    with metrics.stage("s"):
+        pass
+    snap = metrics.snapshot()
+    assert snap["counters"] == snap["histograms"] == snap["stages"] == []
+
+def test_counters_gauges_and_labels():
+    metrics.incr("http.responses", host="a", status=200)
+    metrics.incr("http.responses", 2, status=200, host="a")
+    metrics.incr("http.responses", host="b", status=429)
+    metrics.gauge("ratio", 0.5)
+    metrics.gauge("ratio", 0.75)
+
+    assert entry("counters", "http.responses", host="a", status=200)["value"] == 3
+    assert entry("counters", "http.responses", host="b", status=429)["value"] == 1
+    assert entry("gauges", "ratio")["value"] == 0.75
+
+def test_histogram_quantiles():
+    for value in [0.002] * 90 + [0.2] * 9 + [20.0]:
+        metrics.observe("latency", value)
+    hist = entry("histograms", "latency")
+    assert hist["count"] == 100
+    assert hist["min"] == 0.002 and hist["max"] == 20.0
+    assert hist["p50"] == 0.0025
+    assert hist["p95"] == 0.25
+    assert hist["p99"] == 0.25
+    assert sum(hist["buckets"].values()) == 100
+
+def test_stages_count_calls_and_errors():
+    with metrics.stage("build", part="a"):
+        pass
+    with pytest.raises(ValueError):
+        with metrics.stage("build", part="a"):
+            raise ValueError
+    stage = entry("stages", "build", part="a")
+    assert (stage["calls"], stage["errors"]) == (2, 1)
+    assert stage["seconds"] >= 0
+
+def test_write_snapshot_appends_json_lines(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    metrics.incr("c")
+    metrics.write_snapshot(path, append=True)
+    metrics.incr("c")
+    metrics.write_snapshot(path, append=True)
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["counters"][0]["value"] for line in lines] == [1, 2]
@@ -0,0 +1,69 @@
+import random
+
+import networkx as nx
+import pytest
+
+from data.requirements import normalize_name
+from data.name_similarity import NameIndex, edit_distance, set_typosquat_features
+from synthetic import package_names
+
+def osa_distance(a, b):
+    """Unbounded optimal string alignment distance, computed over the full table."""
+    d = [[i + j if i == 0 or j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[len(a)][len(b)]
+
+def typo(name, rng):
+    """Apply one random insertion, deletion, substitution or transposition."""
+    i = rng.randrange(len(name))
+    c = rng.choice("abcdefghijklmnopqrstuvwxyz-")
+    edit = rng.randrange(4)
+    if edit == 0:
+        return name[:i] + c + name[i:]
+    if edit == 1 and len(name) > 1:
+        return name[:i] + name[i + 1:]
+    if edit == 3 and i + 1 < len(name):
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + c + name[i + 1:]
+
+@pytest.fixture(scope="module")
+def names():
+    rng = random.Random(0)
+    base = package_names(150)
+    # Near-duplicates at distance one and two, with edits inside and past the prefix
+    names = base + [typo(rng.choice(base), rng) for _ in range(150)] + \
+        [typo(typo(rng.choice(base), rng), rng) for _ in range(150)]
+    return list(dict.fromkeys(normalize_name(name) for name in names))
+
+def test_edit_distance_matches_full_table(names):
+    rng = random.Random(1)
+    for _ in range(2000):
+        a, b = rng.choice(names), rng.choice(names)
+        expected = osa_distance(a, b)
+        assert edit_distance(a, b, 2) == min(expected, 3)
+    assert edit_distance("requests", "reqeusts", 2) == 1
+
+@pytest.mark.parametrize("max_distance", [1, 2])
+def test_index_matches_brute_force(names, max_distance):
+    index = NameIndex(names[::2], max_distance=max_distance)
+    for name in names:
+        expected = sorted(((other, d) for other in index.names
+                           if (d := osa_distance(name, other)) <= max_distance),
+                          key=lambda m: (m[1], m[0]))
+        assert index.query(name) == expected
+
+def test_typosquat_features():
+    G = nx.DiGraph()
+    G.add_nodes_from(["requests", "reqeusts", "requestz-extra", "six", "numpy", "nunpy"])
+    set_typosquat_features(G, popular=["requests", "numpy", "six"])
+    assert G.nodes["reqeusts"]["nearest_popular"] == "requests"
+    assert G.nodes["reqeusts"]["nearest_popular_distance"] == 1
+    # Short names are only matched at distance one
+    assert G.nodes["nunpy"]["is_typosquat_candidate"]
+    assert not G.nodes["requests"]["is_typosquat_candidate"]
+    assert G.nodes["requestz-extra"]["nearest_popular"] == ""
+    assert G.nodes["requestz-extra"]["nearest_popular_distance"] == 3
@@ -0,0 +1,47 @@
+import json
+import xmlrpc.client
+
+import pytest
+
+import data.fetch.ratelimit as ratelimit
+from data.fetch import client, pypi
+from data.fetch.client import HttpClient
+from stub_server import StubServer
+
+EVENTS = [
+    ("foo", "1.0", 100, "new release", 10),
+    ("bar", "0.1", 101, "create", 11),
+    ("foo", "1.1", 102, "new release", 12),
+    ("baz", None, 103, "remove project", 13),
+]
+
+@pytest.fixture(autouse=True)
+def stub_client(monkeypatch):
+    monkeypatch.setattr(ratelimit, "_buckets", {})
+    monkeypatch.setattr(pypi, "PYPI_URL", pypi.PYPI_URL)
+    http = HttpClient(backoff_base=0.01, backoff_max=0.05)
+    client.set_client(http)
+    yield
+    client.set_client(None)
+    http.close()
+
+def test_changelog_from_fixture(tmp_path):
+    path = tmp_path / "changelog.json"
+    path.write_text(json.dumps(EVENTS))
+    assert pypi.fetch_changelog_since(11, fixture=path) == EVENTS[2:]
+    assert pypi.fetch_changelog_since(13, fixture=path) == []
+
+def test_changelog_pages_and_retries():
+    script = [(503, {}), (429, {"Retry-After": "0"})]
+    with StubServer({}, {}, script=script, changelog=EVENTS, changelog_page=2) as server:
+        pypi.PYPI_URL = server.url
+        events = pypi.fetch_changelog_since(10)
+    assert events == EVENTS[1:]
+    # Both throttled calls were retried, then three pages were read (the last one empty)
+    assert (server.stats[503], server.stats[429], server.stats[200]) == (1, 1, 3)
+
+def test_xmlrpc_fault():
+    with StubServer({}, {}) as server:
+        pypi.PYPI_URL = server.url
+        with pytest.raises(xmlrpc.client.Fault):
+            pypi.xmlrpc_call("list_packages")
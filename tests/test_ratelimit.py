@@ -0,0 +1,50 @@
+import time
+import threading
+
+import pytest
+
+import data.fetch.ratelimit as ratelimit
+from data.fetch.ratelimit import TokenBucket
+
+def test_burst_then_rate():
+    bucket = TokenBucket(rate=20, capacity=5)
+    start = time.monotonic()
+    waits = [bucket.acquire() for _ in range(10)]
+    elapsed = time.monotonic() - start
+
+    # The first `capacity` tokens are free, the next five wait 1/rate each
+    assert waits[:5] == [0.0] * 5
+    assert all(w > 0 for w in waits[5:])
+    assert elapsed == pytest.approx(5 / 20, abs=0.1)
+
+def test_concurrent_callers_queue_up():
+    bucket = TokenBucket(rate=50, capacity=1)
+    waits = []
+    start = time.monotonic()
+    threads = [threading.Thread(target=lambda: waits.append(bucket.acquire())) for _ in range(11)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Ten tokens beyond the burst at 50/s: about 0.2 s however the threads interleave
+    assert time.monotonic() - start == pytest.approx(10 / 50, abs=0.1)
+    # Each caller reserved its own token, so no two woke up for the same one
+    assert sorted(waits) == pytest.approx([i / 50 for i in range(11)], abs=0.05)
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+def test_hosts(monkeypatch):
+    monkeypatch.setattr(ratelimit, "_buckets", {})
+    assert ratelimit.host_of("https://PyPI.org/pypi/x/json") == "pypi.org"
+    assert ratelimit.acquire("http://unlimited.example/x") == 0.0
+    assert ratelimit.get_bucket("unlimited.example") is None
+
+    ratelimit.set_rate_limit("https://unlimited.example", rate=10, capacity=1)
+    assert ratelimit.acquire("http://unlimited.example/x") == 0.0
+    assert ratelimit.acquire("http://unlimited.example/y") > 0
+
+    bucket = ratelimit.get_bucket("libraries.io")
+    assert (bucket.rate, bucket.capacity) == ratelimit.DEFAULT_RATES["libraries.io"]
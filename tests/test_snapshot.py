@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import numpy as np
+import networkx as nx
+import pytest
+
+from data.snapshot import save_snapshot, load_snapshot, GraphSnapshot
+
+def make_graph():
+    G = nx.DiGraph()
+    G.graph.update(num_core_packages=2, snapshots=["top", "recent"], note=None)
+    G.add_node("b", downloads=10, score=0.5, license="MIT", is_core=True, keywords=["x", "y"])
+    G.add_node("a", downloads=2.5, score=np.float64(1.5), license=None, is_core=False, big=2 ** 60)
+    G.add_node("c", downloads=None, stars=np.int64(7), mixed="text")
+    G.add_node("d", mixed=3, downloads=-4)
+    G.add_edge("b", "a", kind="runtime", optional=False, weight=1)
+    G.add_edge("b", "c", kind="test", optional=True, weight=0.25, marker="python_version < '3.9'")
+    G.add_edge("a", "c")
+    G.add_edge("d", "b", weight=2)
+    return G
+
+def test_round_trip_is_lossless(tmp_path):
+    G = make_graph()
+    H = load_snapshot(save_snapshot(G, tmp_path / "g.snapshot"))
+
+    assert list(H.nodes(data=True)) == list(G.nodes(data=True))
+    assert list(H.edges(data=True)) == list(G.edges(data=True))
+    assert H.graph == G.graph
+    # Mixed int/float columns keep the type of every value
+    assert type(H.nodes["b"]["downloads"]) is int
+    assert type(H.nodes["a"]["downloads"]) is float
+    assert type(H.edges["b", "a"]["weight"]) is int
+    assert H.nodes["a"]["big"] == 2 ** 60
+
+def test_lazy_access_matches_graph(tmp_path):
+    G = make_graph()
+    snap = GraphSnapshot(save_snapshot(G, tmp_path / "g.snapshot"))
+
+    assert snap.number_of_nodes() == 4 and snap.number_of_edges() == 4
+    assert snap.names == list(G.nodes)
+    assert snap.node_records([0, 3]) == [("b", G.nodes["b"]), ("d", G.nodes["d"])]
+
+def test_rejects_non_json_graph_attributes(tmp_path):
+    G = make_graph()
+    G.graph["created"] = datetime(2024, 1, 1)
+    path = tmp_path / "g.snapshot"
+
+    with pytest.raises(TypeError):
+        save_snapshot(G, path)
+    assert not path.exists()
+    assert list(tmp_path.iterdir()) == []
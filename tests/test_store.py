@@ -0,0 +1,117 @@
+import json
+import sqlite3
+
+from data.store import PackageStore, PACKAGE_COLUMNS, SOURCERANK_COLUMNS, GRAPH_PACKAGE_COLUMNS
+
+RECORD = {
+    "name": "Foo.Bar",
+    "rank": 7,
+    "stars": None,
+    "normalized_licenses": ["MIT"],
+    "runtime_dependencies": ["requests"],
+    "dependency_requirements": {"requests": [{"specifier": ">=2"}]},
+    "custom_field": {"nested": [1, 2]},
+}
+
+def old_package_columns():
+    """Package columns before dependency_requirements got its own."""
+    return [c for c in PACKAGE_COLUMNS if c != "dependency_requirements"]
+
+def test_round_trip_keeps_display_name(tmp_path):
+    store = PackageStore(tmp_path / "store.sqlite")
+    store.upsert_packages([RECORD])
+    store.upsert_sourcerank({"Foo.Bar": {"stars": 3, "readme_present": True}})
+
+    assert store.has("foo_bar")
+    assert store.names() == ["foo-bar"]
+    # Keyed by the normalized name, with the record exactly as written
+    assert store.read_packages() == {"foo-bar": RECORD}
+    assert store.read_packages(["FOO-bar"], columns=["rank", "stars"]) == \
+        {"foo-bar": {"name": "Foo.Bar", "rank": 7, "stars": None}}
+
+    metadata = store.read_metadata()["foo-bar"]
+    assert metadata["name"] == "Foo.Bar"
+    assert metadata["stars_sr"] == 3
+    assert not metadata["sourcerank_missing"]
+    store.close()
+
+def test_migrates_version_0_store(tmp_path):
+    path = tmp_path / "store.sqlite"
+    conn = sqlite3.connect(path)
+    for table, columns in (("packages", PACKAGE_COLUMNS), ("sourcerank", SOURCERANK_COLUMNS)):
+        cols = ", ".join(f'"{c}" TEXT' for c in columns)
+        conn.execute(f"CREATE TABLE {table} (name TEXT PRIMARY KEY, {cols}, extra TEXT, updated_at REAL NOT NULL)")
+    conn.execute('INSERT INTO packages (name, rank, extra, updated_at) VALUES (?, ?, ?, ?)',
+                 ("zope.interface", json.dumps(5), json.dumps({}), 1.0))
+    conn.commit()
+    conn.close()
+
+    store = PackageStore(path)
+    assert store.read_packages() == {"zope-interface": {"name": "zope.interface", "rank": 5}}
+    store.close()
+
+def test_graph_columns_skip_the_extra_blob(tmp_path):
+    # Graph builds read only real columns, so the `extra` blob is never decoded
+    assert set(GRAPH_PACKAGE_COLUMNS) <= set(PACKAGE_COLUMNS)
+    store = PackageStore(tmp_path / "store.sqlite")
+    store.upsert_packages([RECORD])
+    record = store.read_packages(columns=GRAPH_PACKAGE_COLUMNS)["foo-bar"]
+    assert "custom_field" not in record
+    assert record["dependency_requirements"] == RECORD["dependency_requirements"]
+    store.close()
+
+def test_new_columns_are_filled_from_extra(tmp_path):
+    path = tmp_path / "store.sqlite"
+    conn = sqlite3.connect(path)
+    for table, columns in (("packages", old_package_columns()), ("sourcerank", SOURCERANK_COLUMNS)):
+        cols = ", ".join(f'"{c}" TEXT' for c in columns)
+        conn.execute(f"CREATE TABLE {table} (name TEXT PRIMARY KEY, display_name TEXT, {cols}, "
+                     "extra TEXT, updated_at REAL NOT NULL)")
+    extra = {"dependency_requirements": {"six": [{"specifier": ">=1"}]}, "custom": 1}
+    conn.execute("INSERT INTO packages (name, display_name, rank, extra, updated_at) VALUES (?, ?, ?, ?, ?)",
+                 ("six", "six", json.dumps(2), json.dumps(extra), 1.0))
+    conn.execute("PRAGMA user_version = 2")
+    conn.commit()
+    conn.close()
+
+    store = PackageStore(path)
+    assert store.read_packages() == {"six": {"name": "six", "rank": 2, "custom": 1, **extra}}
+    assert store.read_packages(columns=["dependency_requirements"])["six"] == \
+        {"name": "six", "dependency_requirements": extra["dependency_requirements"]}
+    row = store.conn.execute("SELECT extra FROM packages").fetchone()
+    assert json.loads(row[0]) == {"custom": 1}
+    store.close()
+
+def test_version_0_conflicts_keep_the_latest_release(tmp_path):
+    path = tmp_path / "store.sqlite"
+    conn = sqlite3.connect(path)
+    for table, columns in (("packages", old_package_columns()), ("sourcerank", SOURCERANK_COLUMNS)):
+        cols = ", ".join(f'"{c}" TEXT' for c in columns)
+        conn.execute(f"CREATE TABLE {table} (name TEXT PRIMARY KEY, {cols}, extra TEXT, updated_at REAL NOT NULL)")
+    rows = [
+        # Newest release, although written first
+        ("foo_bar", "2024-05-01", None, 1.0),
+        ("foo.bar", "2023-01-01", 100, 3.0),
+        ("foo-bar", None, 5, 2.0),
+        # Same release: the record with more fields wins over the newer write
+        ("a.b", "2022-01-01", 7, 1.0),
+        ("a_b", "2022-01-01", None, 2.0),
+    ]
+    conn.executemany(
+        "INSERT INTO packages (name, latest_release_published_at, stars, extra, updated_at) VALUES (?, ?, ?, '{}', ?)",
+        [(name, json.dumps(published) if published else None, json.dumps(stars) if stars else None, updated_at)
+         for name, published, stars, updated_at in rows])
+    conn.executemany("INSERT INTO sourcerank (name, stars, extra, updated_at) VALUES (?, ?, '{}', ?)",
+                     [("foo.bar", json.dumps(1), 1.0), ("foo_bar", json.dumps(2), 2.0)])
+    conn.commit()
+    conn.close()
+
+    store = PackageStore(path)
+    records = store.read_packages()
+    assert records == {
+        "foo-bar": {"name": "foo_bar", "latest_release_published_at": "2024-05-01"},
+        "a-b": {"name": "a.b", "latest_release_published_at": "2022-01-01", "stars": 7},
+    }
+    # Without release dates, the most recent write wins
+    assert store.read_sourcerank() == {"foo-bar": {"stars": 2}}
+    store.close()
@@ -0,0 +1,101 @@
+import random
+
+import numpy as np
+import networkx as nx
+import pytest
+
+import data.temporal as temporal
+from data.temporal import TemporalGraphStore, graph_delta, compose_deltas, apply_delta
+
+def evolve(G, rng, day):
+    """Return a copy of G with edges, nodes and attributes changed and nodes reshuffled."""
+    H = G.copy()
+    for _ in range(10):
+        u, v = rng.sample(list(H), 2)
+        H.add_edge(u, v, kind="runtime")
+    H.remove_edges_from(rng.sample(list(H.edges), 5))
+    for node in rng.sample(list(H), 5):
+        H.nodes[node]["stars"] = rng.randint(0, 99)
+    H.remove_nodes_from(rng.sample(list(H), 3))
+    H.add_nodes_from((f"new{day}_{i}", {"stars": i}) for i in range(3))
+    if day % 2:
+        # Rebuilds do not keep the old node order
+        order = list(H)
+        rng.shuffle(order)
+        shuffled = nx.DiGraph(H.graph)
+        shuffled.add_nodes_from((n, H.nodes[n]) for n in order)
+        shuffled.add_edges_from(H.edges(data=True))
+        H = shuffled
+    return H
+
+def snapshot_state(G):
+    return list(G.nodes(data=True)), sorted((u, v, sorted(d.items())) for u, v, d in G.edges(data=True)), G.graph
+
+@pytest.fixture
+def history():
+    rng = random.Random(0)
+    G = nx.gnp_random_graph(60, 0.05, seed=1, directed=True)
+    G = nx.relabel_nodes(G, {i: f"pkg{i}" for i in G})
+    graphs = {}
+    for day in range(7):
+        if day:
+            G = evolve(G, rng, day)
+        graphs[f"202507{day + 10:02d}"] = G
+    return graphs
+
+def test_rebuilt_graphs_match_in_node_order(tmp_path, history):
+    store = TemporalGraphStore(tmp_path, keyframe_every=3)
+    for date, G in history.items():
+        store.add(date, G)
+    for date, G in history.items():
+        assert snapshot_state(store.graph(date)) == snapshot_state(G)
+
+def test_composed_changes_apply_like_direct_delta(tmp_path, history):
+    dates = list(history)
+    composed = {"nodes": {}, "edges": {}, "graph": {}}
+    for a, b in zip(dates, dates[1:]):
+        composed = compose_deltas(composed, graph_delta(history[a], history[b]))
+    G = apply_delta(history[dates[0]].copy(), composed)
+    assert snapshot_state(G) == snapshot_state(history[dates[-1]])
+
+def test_failed_replace_keeps_previous_recording(tmp_path, history, monkeypatch):
+    store = TemporalGraphStore(tmp_path, keyframe_every=3)
+    dates = list(history)[:4]
+    for date in dates:
+        store.add(date, history[date])
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    # Replacing the latest date (a keyframe) fails while writing its snapshot
+    monkeypatch.setattr(temporal, "save_snapshot", fail)
+    with pytest.raises(OSError):
+        store.add(dates[-1], history[dates[0]])
+    monkeypatch.undo()
+
+    reopened = TemporalGraphStore(tmp_path)
+    assert reopened.dates == dates
+    assert snapshot_state(reopened.graph(dates[-1])) == snapshot_state(history[dates[-1]])
+    assert not list(tmp_path.rglob("*.new"))
+
+    reopened.add(dates[-1], history[dates[0]])
+    assert snapshot_state(reopened.graph(dates[-1])) == snapshot_state(history[dates[0]])
+
+def test_delta_values_must_be_json(tmp_path, history):
+    store = TemporalGraphStore(tmp_path, keyframe_every=3)
+    first, second, third = list(history)[:3]
+    store.add(first, history[first])
+
+    # NumPy scalars are stored as plain numbers
+    G = history[second].copy()
+    G.nodes["pkg0"]["stars"] = np.int64(5)
+    store.add(second, G)
+    assert store.graph(second).nodes["pkg0"]["stars"] == 5
+
+    # Anything else is rejected rather than silently stringified
+    H = history[third].copy()
+    H.nodes["pkg0"]["licenses"] = {"MIT"}
+    with pytest.raises(TypeError):
+        store.add(third, H)
+    assert store.dates == [first, second]
+    assert not list(tmp_path.rglob("*.new"))